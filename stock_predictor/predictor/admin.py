@@ -1,5 +1,28 @@
 from django.contrib import admin
+from .models import PrecomputedForecast, StockPrediction
 
 # Регистрация моделей в административной панели Django
-# В данном проекте модели не используются, поэтому файл остается пустым
-# Для добавления моделей в Админ-панель используйте: admin.site.register(YourModel)
+
+
+@admin.register(StockPrediction)
+class StockPredictionAdmin(admin.ModelAdmin):
+    """
+    Административная панель истории прогнозов.
+    """
+    list_display = ('ticker', 'method', 'created_at', 'current_price', 'predicted_price', 'target_date',
+                    'actual_price')
+    list_filter = ('method',)
+    search_fields = ('ticker',)
+    date_hierarchy = 'created_at'
+    # Точный подсчет строк на миллионах записей дорог - показываем навигацию без него
+    show_full_result_count = False
+
+
+@admin.register(PrecomputedForecast)
+class PrecomputedForecastAdmin(admin.ModelAdmin):
+    """
+    Административная панель заранее рассчитанных прогнозов.
+    """
+    list_display = ('ticker', 'method', 'computed_at', 'window_end', 'current_price', 'predicted_price')
+    list_filter = ('method',)
+    search_fields = ('ticker',)
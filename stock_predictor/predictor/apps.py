@@ -1,4 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    # WAL: чтение не блокирует запись истории прогнозов из нескольких процессов-воркеров,
+    # synchronous=NORMAL в режиме WAL безопасен и не выполняет fsync на каждую транзакцию
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
 
 
 class PredictorConfig(AppConfig):
@@ -14,3 +24,19 @@ class PredictorConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictor'
+
+    def ready(self):
+        """
+        Настраивает соединения SQLite и выполняет необязательный прогрев приложения.
+
+        Каждое новое соединение с базой SQLite переводится в режим WAL (см. configure_sqlite).
+        При PREDICTOR_WARMUP = True заранее загружает тяжелые зависимости и
+        прогревает построение графиков (см. services.warm_up). По умолчанию
+        выключено, чтобы команды manage.py запускались быстро.
+        """
+        connection_created.connect(configure_sqlite, dispatch_uid='predictor.configure_sqlite')
+
+        from django.conf import settings
+        if getattr(settings, 'PREDICTOR_WARMUP', False):
+            from .services import warm_up
+            warm_up()
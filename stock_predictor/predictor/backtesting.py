@@ -0,0 +1,118 @@
+import numpy as np
+
+from .forecasting import FORECAST_METHODS, HORIZON_DAYS, MA_WINDOW, TREND_WINDOW
+
+
+def _prefix_sums(values):
+    # Префиксные суммы с ведущим нулем: сумма values[a:b] = sums[b] - sums[a]
+    return np.concatenate(([0.0], np.cumsum(values)))
+
+
+def rolling_forecasts(prices, methods=FORECAST_METHODS, horizon=HORIZON_DAYS):
+    """
+    Рассчитывает прогнозы каждого метода для каждого дня истории.
+
+    Прогноз в день t совпадает с moving_average(prices[:t + 1], method), но все
+    дни считаются за один проход: скользящее среднее - через префиксные суммы,
+    тренд - через скользящую регрессию в замкнутой форме по суммам y и i*y.
+
+    Аргументы:
+        prices (numpy.ndarray): Исторические цены формы (n,) или (n, 1).
+        methods (iterable, опционально): Методы из FORECAST_METHODS. По умолчанию все.
+        horizon (int, опционально): Горизонт прогноза в днях. По умолчанию 30.
+
+    Возвращает:
+        dict: Словарь {метод: numpy.ndarray формы (n,)} с прогнозом, сделанным в каждый день.
+    """
+    y = np.asarray(prices, dtype=float).ravel()
+    n = len(y)
+    days = np.arange(n)
+
+    # Центрируем цены: это уменьшает ошибку округления в разностях больших префиксных сумм
+    offset = y.mean() if n else 0.0
+    centered = y - offset
+    sums = _prefix_sums(centered)
+
+    results = {}
+    for method in methods:
+        if method == 'moving_average':
+            start = np.maximum(days - MA_WINDOW + 1, 0)
+            results[method] = (sums[days + 1] - sums[start]) / (days + 1 - start) + offset
+
+        elif method == 'recent_trend':
+            # Окно из последних 90 цен с локальными днями 0..w-1; прогноз в точке w + horizon
+            width = TREND_WINDOW
+            forecast = y.copy()
+            origins = days[days >= width]
+            if len(origins):
+                weighted_sums = _prefix_sums(days * centered)
+                start = origins - width + 1
+                sum_y = sums[origins + 1] - sums[start]
+                sum_xy = weighted_sums[origins + 1] - weighted_sums[start] - start * sum_y
+                sum_x = width * (width - 1) / 2
+                sum_xx = (width - 1) * width * (2 * width - 1) / 6
+                slope = (width * sum_xy - sum_x * sum_y) / (width * sum_xx - sum_x ** 2)
+                intercept = (sum_y - slope * sum_x) / width
+                forecast[origins] = intercept + slope * (width + horizon) + offset
+            results[method] = forecast
+
+        elif method == 'last_price':
+            results[method] = y.copy()
+
+        else:
+            raise ValueError(f'Неизвестный метод прогнозирования: {method}')
+
+    return results
+
+
+def backtest(prices, methods=FORECAST_METHODS, horizon=HORIZON_DAYS, min_history=TREND_WINDOW + 1):
+    """
+    Пошаговое (walk-forward) тестирование методов прогнозирования на истории.
+
+    Для каждого дня t, у которого известна цена через horizon торговых дней,
+    прогноз по данным до дня t включительно сравнивается с фактической ценой
+    prices[t + horizon]. Горизонт измеряется в торговых днях, как и в регрессии
+    метода 'recent_trend'.
+
+    Аргументы:
+        prices (numpy.ndarray): Исторические цены формы (n,) или (n, 1).
+        methods (iterable, опционально): Методы из FORECAST_METHODS. По умолчанию все.
+        horizon (int, опционально): Горизонт прогноза в днях. По умолчанию 30.
+        min_history (int, опционально): Минимум цен до дня прогноза. По умолчанию 91,
+            чтобы все методы сравнивались на одних и тех же днях.
+
+    Возвращает:
+        dict: Словарь {метод: {'mae', 'mape', 'directional_accuracy', 'samples'}}.
+            MAE - средняя абсолютная ошибка, MAPE - средняя абсолютная ошибка в процентах,
+            directional_accuracy - доля дней (в процентах), когда знак изменения цены угадан,
+            среди дней, в которые метод предсказал изменение. Прогноз без изменения
+            (метод 'last_price') направления не задает и не учитывается; если таких дней
+            нет совсем, метрика равна NaN, а не 0%.
+
+    Пример:
+        >>> prices, dates = get_stock_data('AAPL', years=10)
+        >>> backtest(prices)['recent_trend']['mape']
+    """
+    y = np.asarray(prices, dtype=float).ravel()
+    forecasts = rolling_forecasts(y, methods, horizon)
+    origins = np.arange(max(min_history - 1, 0), len(y) - horizon)
+
+    report = {}
+    for method, forecast in forecasts.items():
+        if not len(origins):
+            report[method] = {'mae': np.nan, 'mape': np.nan, 'directional_accuracy': np.nan, 'samples': 0}
+            continue
+        predicted = forecast[origins]
+        actual = y[origins + horizon]
+        current = y[origins]
+        errors = np.abs(predicted - actual)
+        predicted_direction = np.sign(predicted - current)
+        directed = predicted_direction != 0
+        hits = predicted_direction[directed] == np.sign(actual - current)[directed]
+        report[method] = {
+            'mae': float(errors.mean()),
+            'mape': float(np.mean(errors / np.abs(actual)) * 100),
+            'directional_accuracy': float(hits.mean() * 100) if len(hits) else np.nan,
+            'samples': int(len(origins)),
+        }
+    return report
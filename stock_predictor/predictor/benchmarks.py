@@ -0,0 +1,334 @@
+import json
+import math
+import platform
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from os import path, makedirs
+
+import numpy as np
+
+from .forecasting import batch_forecast
+
+# Наборы размеров: длина истории в торговых днях (от месяца до 30 лет) и количество тикеров
+PROFILES = {
+    'quick': {'days': (30, 252, 2520), 'tickers': (1, 100)},
+    'full': {'days': (30, 252, 1260, 2520, 7560), 'tickers': (1, 10, 100, 1000, 5000)},
+}
+
+# Этапы прогноза. train_model и plot измеряются только для одного тикера:
+# в приложении они выполняются по одному разу на запрос
+STAGES = ('fetch', 'moving_average', 'recent_trend', 'batch_forecast', 'train_model', 'plot')
+SINGLE_TICKER_STAGES = ('train_model', 'plot')
+
+# Метрики, которые можно сравнивать с базовой линией
+COMPARABLE_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_kb')
+
+
+def summarize(samples, items, elapsed):
+    """
+    Сводит замеры одного случая в перцентили задержки и пропускную способность.
+
+    Аргументы:
+        samples (list): Длительности отдельных вызовов в секундах.
+        items (int): Количество обработанных тикеров за все вызовы.
+        elapsed (float): Общее время всех вызовов в секундах.
+
+    Возвращает:
+        dict: Словарь с ключами 'calls', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms' и 'throughput'
+        (тикеров в секунду).
+    """
+    values = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'calls': len(samples),
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(values.mean()), 4),
+        'throughput': round(items / elapsed, 2) if elapsed > 0 else None,
+    }
+
+
+def peak_memory(fn):
+    """
+    Возвращает пиковый объем памяти, выделенной при вызове fn (по tracemalloc).
+
+    Выполняется отдельным вызовом: под tracemalloc код заметно медленнее,
+    поэтому он не смешивается с замерами задержки.
+
+    Возвращает:
+        int: Пиковый объем в байтах.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def synthetic_matrix(n_tickers, n_days, seed=0):
+    """
+    Генерирует матрицу цен закрытия (геометрическое броуновское движение) формы (тикеры, дни).
+    """
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(20, 500, (n_tickers, 1))
+    return start * np.exp(np.cumsum(rng.normal(0.0003, 0.015, (n_tickers, n_days)), axis=1))
+
+
+@contextmanager
+def isolated_environment(frames, directory=None):
+    """
+    Подменяет хранилище истории, кэш графиков и провайдер временными на время замеров.
+
+    Объединение загрузок (services.history_flight) создается заново с блокировками
+    в той же директории, а реестр моделей - пустым и только в памяти процесса:
+    оба объекта создаются при импорте или первом обращении, поэтому одной подмены
+    настроек для них недостаточно. После выхода восстанавливаются прежние объекты.
+
+    Аргументы:
+        frames (dict): Синтетическая история {тикер: DataFrame} для InMemoryProvider.
+        directory (str, опционально): Существующая директория хранилища и графиков, общая
+            для нескольких процессов (нагрузочный тест). По умолчанию - временная директория,
+            удаляемая после замеров.
+    """
+    from django.conf import settings
+    from django.test.utils import override_settings
+
+    from . import model_cache, plot_cache, services, storage
+    from .providers import InMemoryProvider, get_provider, set_provider
+    from .singleflight import SingleFlight
+
+    with nullcontext(directory) if directory else tempfile.TemporaryDirectory() as directory:
+        previous_provider, previous_cache = get_provider(), plot_cache._cache
+        previous_flight, previous_registry = services.history_flight, model_cache._registry
+        store_path = path.join(directory, 'prices.sqlite3')
+        overrides = override_settings(
+            PRICE_STORE_PATH=store_path,
+            PRICE_STORE_REFRESH_INTERVAL=10 ** 9,
+            SHARED_PRICES_DIR=None,
+            FETCH_LOCK_DIR=path.join(directory, 'locks'),
+            MODEL_CACHE_BACKEND=None,
+        )
+        overrides.enable()
+        set_provider(InMemoryProvider(frames))
+        plot_cache._cache = plot_cache.PlotCache(
+            path.join(directory, 'plots'), '/benchmark/plots/', max_bytes=10 ** 9, max_age=10 ** 9)
+        services.history_flight = SingleFlight(settings.FETCH_LOCK_DIR)
+        model_cache._registry = model_cache.ModelRegistry(settings.MODEL_CACHE_SIZE)
+        try:
+            yield directory
+        finally:
+            model_cache._registry = previous_registry
+            services.history_flight = previous_flight
+            plot_cache._cache = previous_cache
+            set_provider(previous_provider)
+            overrides.disable()
+            # Соединения временного хранилища закрываются вместе с ним
+            with storage._stores_lock:
+                storage._stores.pop(store_path, None)
+
+
+def _timed(samples, fn, *args, **kwargs):
+    # Выполняет fn и, если передан список samples, добавляет в него длительность вызова
+    if samples is None:
+        return fn(*args, **kwargs)
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def _case(stage, n_days, n_tickers, seed):
+    # Подготавливает данные случая: (подготовка, прогон run(samples=None), тикеров за прогон, окружение).
+    # Прогон обрабатывает все тикеры случая и записывает длительность каждого вызова этапа
+    from . import services
+    from .synthetic import synthetic_history, synthetic_prices
+
+    if stage == 'fetch':
+        tickers = [f'B{i:05d}' for i in range(n_tickers)]
+        frames = {ticker: synthetic_history(n_days, seed=seed + i) for i, ticker in enumerate(tickers)}
+        years = math.ceil(n_days / 252) + 1
+
+        def setup():
+            services.prefetch_history(tickers, years=years)
+
+        def run(samples=None):
+            for ticker in tickers:
+                _timed(samples, services.get_stock_data, ticker, years=years)
+        return setup, run, n_tickers, isolated_environment(frames)
+
+    if stage in ('moving_average', 'recent_trend'):
+        series = [row.reshape(-1, 1) for row in synthetic_matrix(n_tickers, n_days, seed)]
+
+        def run(samples=None):
+            for prices in series:
+                _timed(samples, services.moving_average, prices, method=stage)
+        return None, run, n_tickers, None
+
+    if stage == 'batch_forecast':
+        matrix = synthetic_matrix(n_tickers, n_days, seed)
+        return None, lambda samples=None: _timed(samples, batch_forecast, matrix), n_tickers, None
+
+    if stage == 'train_model':
+        prices = synthetic_matrix(1, n_days, seed)[0].reshape(-1, 1)
+        days = np.arange(n_days).reshape(-1, 1)
+        return None, lambda samples=None: _timed(samples, services.train_model, days, prices), 1, None
+
+    if stage == 'plot':
+        prices, dates = synthetic_prices(n_days, seed=seed)
+        future_price = services.moving_average(prices)
+        calls = iter(range(10 ** 9))
+
+        def run(samples=None):
+            # Прогноз немного меняется, чтобы каждый вызов строил график, а не попадал в кэш
+            _timed(samples, services.create_prediction_plot, 'BENCH', prices, dates,
+                   future_price + next(calls) * 1e-3, 'moving_average')
+        return None, run, 1, isolated_environment({})
+
+    raise ValueError(f'Неизвестный этап: {stage}')
+
+
+def run_case(stage, n_days, n_tickers, repeat=5, seed=0):
+    """
+    Измеряет один этап для истории n_days дней и n_tickers тикеров.
+
+    Каждый прогон обрабатывает все тикеры случая. Перцентили считаются по
+    отдельным вызовам этапа (на тикер; для batch_forecast - на весь пакет),
+    пропускная способность - в тикерах в секунду. Первый прогон (прогрев:
+    импорты, создание фигуры) в статистику не входит.
+
+    Аргументы:
+        stage (str): Этап из STAGES.
+        n_days (int): Длина истории в торговых днях.
+        n_tickers (int): Количество тикеров.
+        repeat (int, опционально): Количество измеряемых прогонов. По умолчанию 5.
+        seed (int, опционально): Зерно синтетических данных.
+
+    Возвращает:
+        dict: Результат summarize() с добавленным пиковым объемом памяти 'peak_kb'.
+    """
+    setup, run, items, environment = _case(stage, n_days, n_tickers, seed)
+    with environment or nullcontext():
+        if setup is not None:
+            setup()
+        run()
+
+        samples = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run(samples)
+        elapsed = time.perf_counter() - started
+        peak = peak_memory(run)
+
+    result = summarize(samples, items * repeat, elapsed)
+    result['peak_kb'] = round(peak / 1024, 1)
+    return result
+
+
+def case_key(stage, n_days, n_tickers):
+    return f'{stage}/{n_days}d/{n_tickers}t'
+
+
+def run_suite(profile='quick', stages=STAGES, repeat=5, max_bars=2_000_000, seed=0, progress=None):
+    """
+    Выполняет набор замеров для всех сочетаний размеров профиля.
+
+    Аргументы:
+        profile (str, опционально): Профиль из PROFILES ('quick' или 'full').
+        stages (iterable, опционально): Измеряемые этапы. По умолчанию все.
+        repeat (int, опционально): Количество прогонов каждого случая.
+        max_bars (int, опционально): Пропускать случаи, где дни x тикеры больше этого числа.
+        seed (int, опционально): Зерно синтетических данных.
+        progress (callable, опционально): Вызывается с (ключ случая, результат) после каждого случая.
+
+    Возвращает:
+        dict: Отчет {'meta': {...}, 'results': {ключ случая: результат}}.
+
+    Пример:
+        >>> report = run_suite('quick', stages=['moving_average', 'batch_forecast'])
+    """
+    sizes = PROFILES[profile]
+    results = {}
+    for stage in stages:
+        tickers_list = (1,) if stage in SINGLE_TICKER_STAGES else sizes['tickers']
+        for n_days in sizes['days']:
+            for n_tickers in tickers_list:
+                if n_days * n_tickers > max_bars:
+                    continue
+                key = case_key(stage, n_days, n_tickers)
+                results[key] = run_case(stage, n_days, n_tickers, repeat=repeat, seed=seed)
+                if progress is not None:
+                    progress(key, results[key])
+
+    return {
+        'meta': {
+            'profile': profile,
+            'repeat': repeat,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold=0.2, metrics=('p50_ms', 'peak_kb')):
+    """
+    Сравнивает отчет с базовой линией.
+
+    Случаи, которых нет в одном из отчетов, пропускаются. Очень короткие
+    замеры (меньше 0.05 мс) не сравниваются: их разброс больше порога.
+
+    Аргументы:
+        report (dict): Текущий отчет run_suite().
+        baseline (dict): Сохраненный отчет базовой линии.
+        threshold (float, опционально): Допустимое ухудшение (0.2 = на 20%).
+        metrics (iterable, опционально): Сравниваемые метрики из COMPARABLE_METRICS.
+
+    Возвращает:
+        list: Регрессии в виде кортежей (ключ случая, метрика, базовое значение, текущее значение).
+    """
+    regressions = []
+    for key, result in report['results'].items():
+        reference = baseline.get('results', {}).get(key)
+        if reference is None:
+            continue
+        for metric in metrics:
+            before, after = reference.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            if metric.endswith('_ms') and before < 0.05:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append((key, metric, before, after))
+    return regressions
+
+
+def save_report(report, file_path):
+    """
+    Сохраняет отчет в JSON (например, как новую базовую линию).
+    """
+    directory = path.dirname(str(file_path))
+    if directory:
+        makedirs(directory, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False, sort_keys=True)
+
+
+def load_report(file_path):
+    """
+    Загружает отчет из JSON.
+
+    Возвращает:
+        dict | None: Отчет или None, если файла нет.
+    """
+    try:
+        with open(file_path, encoding='utf-8') as report_file:
+            return json.load(report_file)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,141 @@
+import json
+from datetime import timedelta
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .forecasting import HORIZON_DAYS
+
+# Режимы графика прогноза: растровое изображение matplotlib (PLOT_RENDERER, PLOT_FORMAT),
+# JSON с рядами для отрисовки в браузере или компактный SVG без matplotlib
+PLOT_MODES = ('image', 'json', 'svg')
+
+# Типы содержимого файлов графиков, которые отдает представление chart_file
+CHART_CONTENT_TYPES = {
+    'json': 'application/json',
+    'svg': 'image/svg+xml',
+}
+
+# Версия формата JSON графика (поле 'v'); увеличивается при несовместимых изменениях
+CHART_PAYLOAD_VERSION = 1
+
+# Оформление компактного SVG (те же цвета, что у графиков matplotlib)
+SVG_WIDTH, SVG_HEIGHT = 800, 400
+SVG_MARGIN = {'left': 70, 'right': 20, 'top': 40, 'bottom': 30}
+HISTORY_COLOR = '#2962FF'
+CURRENT_COLOR = '#00E676'
+FORECAST_COLOR = '#FF6D00'
+BACKGROUND_COLOR = '#121212'
+GRID_COLOR = '#424242'
+TEXT_COLOR = '#BDBDBD'
+
+
+def chart_payload(ticker, historical_prices, historical_dates, future_price, method_used, n_points=None):
+    """
+    Формирует данные графика прогноза для отрисовки на стороне клиента.
+
+    Содержит (как правило, уже прореженную) историю цен, текущую точку и
+    отрезок прогноза. Даты передаются строками ГГГГ-ММ-ДД, цены округляются
+    до 4 знаков: такой JSON хорошо сжимается gzip и в десятки раз меньше PNG.
+
+    Аргументы:
+        ticker (str): Тикер акции.
+        historical_prices (numpy.ndarray): Цены истории формы (n,) или (n, 1).
+        historical_dates (pandas.DatetimeIndex): Даты цен.
+        future_price (float): Прогнозируемая цена.
+        method_used (str): Метод прогнозирования.
+        n_points (int, опционально): Количество точек исходной истории, если historical_prices
+            прорежены. По умолчанию len(historical_prices).
+
+    Возвращает:
+        dict: Данные графика с ключами 'v', 'ticker', 'method', 'dates', 'prices', 'current',
+        'forecast', 'change_percent' и 'n_points'.
+
+    Пример:
+        >>> payload = chart_payload('AAPL', prices, dates, 150.5, 'moving_average')
+        >>> payload['forecast']
+        {'date': '2025-02-01', 'price': 150.5}
+    """
+    prices = np.asarray(historical_prices, dtype=float).ravel()
+    last_date = historical_dates[-1]
+    current_price, future_price = float(prices[-1]), float(future_price)
+    return {
+        'v': CHART_PAYLOAD_VERSION,
+        'ticker': ticker,
+        'method': method_used,
+        'dates': [date.strftime('%Y-%m-%d') for date in historical_dates],
+        'prices': [round(float(price), 4) for price in prices],
+        'current': {'date': last_date.strftime('%Y-%m-%d'), 'price': round(current_price, 4)},
+        'forecast': {'date': (last_date + timedelta(days=HORIZON_DAYS)).strftime('%Y-%m-%d'),
+                     'price': round(future_price, 4)},
+        'change_percent': round((future_price - current_price) / current_price * 100, 2),
+        'n_points': n_points or len(prices),
+    }
+
+
+def chart_json(payload):
+    """
+    Сериализует данные графика в компактный JSON (без пробелов).
+    """
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def chart_svg(payload, width=SVG_WIDTH, height=SVG_HEIGHT):
+    """
+    Строит небольшой векторный график прогноза по данным chart_payload() без matplotlib.
+
+    История рисуется одной ломаной, прогноз - пунктирным отрезком от текущей
+    точки; ось Y подписана четырьмя уровнями цены. Размер - несколько
+    килобайт даже для тысячи точек.
+
+    Аргументы:
+        payload (dict): Данные графика из chart_payload().
+        width (int, опционально): Ширина в пикселях (viewBox). По умолчанию 800.
+        height (int, опционально): Высота в пикселях (viewBox). По умолчанию 400.
+
+    Возвращает:
+        str: Документ SVG.
+    """
+    dates = np.array(payload['dates'] + [payload['forecast']['date']], dtype='datetime64[D]').astype(np.int64)
+    prices = np.array(payload['prices'] + [payload['forecast']['price']], dtype=float)
+
+    left, top = SVG_MARGIN['left'], SVG_MARGIN['top']
+    plot_width = width - left - SVG_MARGIN['right']
+    plot_height = height - top - SVG_MARGIN['bottom']
+    low, high = float(prices.min()), float(prices.max())
+    padding = (high - low) * 0.05 or max(abs(high) * 0.05, 1.0)
+    low, high = low - padding, high + padding
+    span = max(int(dates[-1] - dates[0]), 1)
+
+    xs = left + (dates - dates[0]) / span * plot_width
+    ys = top + (high - prices) / (high - low) * plot_height
+    history = ' '.join(f'{x:.1f},{y:.1f}' for x, y in zip(xs[:-1], ys[:-1]))
+    (current_x, future_x), (current_y, future_y) = xs[-2:], ys[-2:]
+
+    ticker = escape(payload['ticker'])
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+        f'font-family="sans-serif" font-size="12">',
+        f'<rect width="{width}" height="{height}" fill="{BACKGROUND_COLOR}"/>',
+    ]
+    for level in np.linspace(low + padding, high - padding, 4):
+        y = top + (high - level) / (high - low) * plot_height
+        parts.append(f'<line x1="{left}" x2="{width - SVG_MARGIN["right"]}" y1="{y:.1f}" y2="{y:.1f}" '
+                     f'stroke="{GRID_COLOR}" stroke-dasharray="4 4"/>')
+        parts.append(f'<text x="{left - 6}" y="{y + 4:.1f}" fill="{TEXT_COLOR}" text-anchor="end">'
+                     f'${level:,.2f}</text>')
+    parts += [
+        f'<polyline points="{history}" fill="none" stroke="{HISTORY_COLOR}" stroke-width="2"/>',
+        f'<line x1="{current_x:.1f}" y1="{current_y:.1f}" x2="{future_x:.1f}" y2="{future_y:.1f}" '
+        f'stroke="{FORECAST_COLOR}" stroke-width="2" stroke-dasharray="6 4"/>',
+        f'<circle cx="{current_x:.1f}" cy="{current_y:.1f}" r="5" fill="{CURRENT_COLOR}" stroke="white"/>',
+        f'<circle cx="{future_x:.1f}" cy="{future_y:.1f}" r="5" fill="{FORECAST_COLOR}" stroke="white"/>',
+        f'<text x="{left}" y="{top - 16}" fill="white" font-size="16" font-weight="bold">{ticker} - '
+        f'Текущая: ${payload["current"]["price"]:,.2f} | Прогноз: ${payload["forecast"]["price"]:,.2f} '
+        f'({payload["change_percent"]:+.2f}%)</text>',
+        f'<text x="{left}" y="{height - 10}" fill="{TEXT_COLOR}">{payload["dates"][0]}</text>',
+        f'<text x="{width - SVG_MARGIN["right"]}" y="{height - 10}" fill="{TEXT_COLOR}" text-anchor="end">'
+        f'{payload["forecast"]["date"]}</text>',
+        '</svg>',
+    ]
+    return ''.join(parts)
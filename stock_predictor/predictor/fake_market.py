@@ -0,0 +1,155 @@
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .synthetic import synthetic_history
+
+
+class FakeMarketServer(ThreadingHTTPServer):
+    """
+    Локальный HTTP-сервер рыночных данных для офлайн-проверки провайдеров.
+
+    Отдает синтетическую историю (synthetic_history) в формате HTTPJSONProvider.
+    История тикера детерминирована: зерно генератора вычисляется по имени тикера.
+    Задержка, доля ошибок 503 и ограничение частоты (ответ 429 с Retry-After)
+    настраиваются, что позволяет измерять пропускную способность и проверять
+    повторы без доступа к сети.
+
+    Атрибуты:
+        latency (float): Задержка каждого ответа в секундах.
+        error_rate (float): Доля запросов, завершающихся ответом 503.
+        rate_limit (float | None): Максимум запросов в секунду, сверх него - ответ 429.
+        years (int): Глубина синтетической истории в годах.
+        counters (dict): Счетчики 'requests', 'errors', 'throttled' и 'not_found'.
+
+    Пример:
+        >>> server = FakeMarketServer(('127.0.0.1', 0), error_rate=0.1)
+        >>> server.serve_in_thread()
+        >>> provider = HTTPJSONProvider(server.url)
+    """
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 8765), latency=0.0, error_rate=0.0, rate_limit=None, years=30):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.years = years
+        self.counters = {'requests': 0, 'errors': 0, 'throttled': 0, 'not_found': 0}
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def serve_in_thread(self):
+        """
+        Запускает сервер в фоновом потоке.
+
+        Возвращает:
+            threading.Thread: Поток сервера (остановка - shutdown()).
+        """
+        thread = threading.Thread(target=self.serve_forever, name='fake-market', daemon=True)
+        thread.start()
+        return thread
+
+    def frame(self, ticker):
+        """
+        Возвращает синтетическую историю тикера (создается один раз).
+        """
+        with self._lock:
+            frame = self._frames.get(ticker)
+        if frame is None:
+            seed = zlib.crc32(ticker.encode())
+            frame = synthetic_history(self.years * 252, seed=seed, start_price=20 + seed % 480)
+            with self._lock:
+                frame = self._frames.setdefault(ticker, frame)
+        return frame
+
+    def admit(self):
+        """
+        Учитывает запрос и решает, как на него ответить.
+
+        Возвращает:
+            int | None: Код ошибки (429 или 503) или None, если запрос нужно обслужить.
+        """
+        with self._lock:
+            self.counters['requests'] += 1
+            if self.rate_limit:
+                now = time.monotonic()
+                if now - self._window_start >= 1.0:
+                    self._window_start, self._window_requests = now, 0
+                self._window_requests += 1
+                if self._window_requests > self.rate_limit:
+                    self.counters['throttled'] += 1
+                    return 429
+            if self.error_rate and random.random() < self.error_rate:
+                self.counters['errors'] += 1
+                return 503
+        return None
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'history' or not parts[1]:
+            server.count('not_found')
+            return self._send(404, {'error': 'not found'})
+
+        status = server.admit()
+        if status == 429:
+            return self._send(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+        if status is not None:
+            return self._send(status, {'error': 'unavailable'})
+
+        query = parse_qs(url.query)
+        frame = server.frame(parts[1].upper())
+        try:
+            if 'start' in query:
+                frame = frame[frame.index.date >= date.fromisoformat(query['start'][0])]
+            else:
+                period = query.get('period', ['1y'])[0]
+                years = int(period[:-1]) if period.endswith('y') else 1
+                frame = frame.iloc[-years * 252:]
+        except ValueError:
+            return self._send(400, {'error': 'bad query'})
+
+        self._send(200, {
+            'tz': str(frame.index.tz) if frame.index.tz is not None else None,
+            'timestamps': frame.index.as_unit('s').asi8.tolist(),
+            **{column.lower(): frame[column].tolist() for column in frame.columns},
+        })
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Журнал каждого запроса мешает нагрузочным прогонам
+        pass
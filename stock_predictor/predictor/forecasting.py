@@ -0,0 +1,243 @@
+import numpy as np
+
+# Параметры методов прогнозирования (совпадают с moving_average() в services.py)
+MA_WINDOW = 30          # Окно скользящего среднего в днях
+TREND_WINDOW = 90       # Окно линейной регрессии в днях
+HORIZON_DAYS = 30       # Горизонт прогноза в днях
+
+# Поддерживаемые методы прогнозирования
+FORECAST_METHODS = ('moving_average', 'recent_trend', 'last_price')
+
+# Горизонты сетки прогнозов по умолчанию (в торговых днях)
+GRID_HORIZONS = (1, 5, 30, 90)
+
+
+def stack_prices(series):
+    """
+    Собирает матрицу цен из рядов разной длины, дополняя короткие ряды NaN слева.
+
+    Аргументы:
+        series (iterable): Ряды цен (например, результаты get_stock_data() формы (n, 1)).
+
+    Возвращает:
+        numpy.ndarray: Матрица формы (тикеры, дни) для batch_forecast().
+
+    Пример:
+        >>> matrix = stack_prices([get_stock_data(t)[0] for t in ['AAPL', 'MSFT']])
+    """
+    rows = [np.asarray(prices, dtype=float).ravel() for prices in series]
+    matrix = np.full((len(rows), max((len(row) for row in rows), default=0)), np.nan)
+    for i, row in enumerate(rows):
+        if len(row):
+            matrix[i, -len(row):] = row
+    return matrix
+
+
+def align_right(matrix):
+    """
+    Выравнивает строки матрицы цен по правому краю.
+
+    Значения NaN (дополнение для тикеров с короткой историей, в начале или в конце
+    строки) переносятся влево с сохранением порядка остальных цен, так что
+    последний столбец всегда содержит последнюю известную цену тикера.
+
+    Аргументы:
+        matrix (numpy.ndarray): Матрица цен формы (тикеры, дни) или одна строка.
+
+    Возвращает:
+        tuple: Кортеж, содержащий два элемента:
+            - aligned (numpy.ndarray): Выровненная матрица формы (тикеры, дни)
+            - counts (numpy.ndarray): Количество известных цен в каждой строке
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+    valid = ~np.isnan(matrix)
+    if valid.all():
+        return matrix, np.full(matrix.shape[0], matrix.shape[1])
+
+    # Устойчивая сортировка по признаку "значение известно": NaN уходят влево, порядок цен сохраняется
+    order = np.argsort(valid, axis=1, kind='stable')
+    return np.take_along_axis(matrix, order, axis=1), valid.sum(axis=1)
+
+
+def trend_forecast(window, horizon=HORIZON_DAYS):
+    """
+    Прогноз по линейному тренду для каждой строки окна (МНК в замкнутой форме).
+
+    Эквивалентно обучению LinearRegression на парах (день, цена) с днями 0..w-1
+    и предсказанию в точке w + horizon, но для всех строк за одну операцию NumPy.
+
+    Аргументы:
+        window (numpy.ndarray): Цены формы (тикеры, w) без пропусков.
+        horizon (int, опционально): Горизонт прогноза в днях. По умолчанию 30.
+
+    Возвращает:
+        numpy.ndarray: Прогноз для каждой строки.
+    """
+    mean, slope = _trend_moments(window)
+    return _trend_at(mean, slope, window.shape[1], horizon)
+
+
+def _trend_moments(window):
+    # Среднее и наклон тренда каждой строки (дни центрированы относительно середины окна)
+    width = window.shape[1]
+    x = np.arange(width, dtype=float) - (width - 1) / 2
+    mean = window.mean(axis=1)
+    return mean, (window - mean[:, None]) @ x / (x @ x)
+
+
+def _trend_at(mean, slope, width, horizon):
+    # Значение тренда в точке width + horizon
+    return mean + slope * (width + horizon - (width - 1) / 2)
+
+
+def batch_forecast(matrix, methods=FORECAST_METHODS):
+    """
+    Рассчитывает прогнозы сразу для множества тикеров за один проход NumPy.
+
+    Результаты совпадают (с точностью до погрешности вычислений с плавающей точкой)
+    с вызовом moving_average() для каждого тикера по отдельности.
+
+    Аргументы:
+        matrix (numpy.ndarray): Матрица цен закрытия формы (тикеры, дни),
+            дополненная NaN для тикеров с более короткой историей.
+        methods (iterable, опционально): Методы прогнозирования из FORECAST_METHODS.
+            По умолчанию все методы.
+
+    Возвращает:
+        dict: Словарь {метод: numpy.ndarray прогнозов по строкам матрицы}.
+            Для строк без данных прогноз равен NaN.
+
+    Пример:
+        >>> forecasts = batch_forecast(price_matrix, methods=['moving_average', 'recent_trend'])
+        >>> forecasts['recent_trend'][0]
+    """
+    grid = batch_forecast_grid(matrix, methods, horizons=(HORIZON_DAYS,))
+    return {method: by_horizon[HORIZON_DAYS] for method, by_horizon in grid.items()}
+
+
+def batch_forecast_grid(matrix, methods=FORECAST_METHODS, horizons=GRID_HORIZONS):
+    """
+    Рассчитывает сетку прогнозов (методы x горизонты) для множества тикеров за один проход NumPy.
+
+    Пакетный вариант forecast_grid(): среднее окна и коэффициенты тренда каждой
+    строки считаются один раз, горизонты отличаются только точкой на прямой.
+    Для горизонта 30 результаты совпадают с batch_forecast().
+
+    Аргументы:
+        matrix (numpy.ndarray): Матрица цен закрытия формы (тикеры, дни),
+            дополненная NaN для тикеров с более короткой историей.
+        methods (iterable, опционально): Методы из FORECAST_METHODS. По умолчанию все.
+        horizons (iterable, опционально): Горизонты в днях. По умолчанию (1, 5, 30, 90).
+
+    Возвращает:
+        dict: Словарь {метод: {горизонт: numpy.ndarray прогнозов по строкам матрицы}}.
+            Для строк без данных прогноз равен NaN.
+
+    Пример:
+        >>> grid = batch_forecast_grid(price_matrix, horizons=[1, 30])
+        >>> grid['recent_trend'][30][0]
+    """
+    aligned, counts = align_right(matrix)
+    n_rows, n_days = aligned.shape
+    # Копия: при матрице без пропусков aligned - это сама переданная матрица
+    last_price = aligned[:, -1].copy() if n_days else np.full(n_rows, np.nan)
+    horizons = [int(horizon) for horizon in horizons]
+
+    grid = {}
+    for method in methods:
+        if method == 'moving_average':
+            # Среднее последних 30 известных цен (или всех, если их меньше); от горизонта не зависит
+            window = aligned[:, -MA_WINDOW:]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                average = np.nansum(window, axis=1) / np.minimum(counts, MA_WINDOW)
+            grid[method] = {horizon: average for horizon in horizons}
+
+        elif method == 'recent_trend':
+            # Тренд по последним 90 ценам; при короткой истории - последняя цена
+            has_trend = counts > TREND_WINDOW if n_days > TREND_WINDOW else np.zeros(n_rows, dtype=bool)
+            mean, slope = _trend_moments(aligned[has_trend, -TREND_WINDOW:])
+            grid[method] = {}
+            for horizon in horizons:
+                forecast = last_price.copy()
+                forecast[has_trend] = _trend_at(mean, slope, TREND_WINDOW, horizon)
+                grid[method][horizon] = forecast
+
+        elif method == 'last_price':
+            grid[method] = {horizon: last_price for horizon in horizons}
+
+        else:
+            raise ValueError(f'Неизвестный метод прогнозирования: {method}')
+
+    return grid
+
+
+def fit_trend(prices):
+    """
+    Обучает линейный тренд по ценам окна (МНК в замкнутой форме, дни 0..w-1).
+
+    Результат совпадает с LinearRegression на парах (день, цена) с точностью
+    до погрешности вычислений с плавающей точкой.
+
+    Аргументы:
+        prices (numpy.ndarray): Цены окна формы (w,) или (w, 1).
+
+    Возвращает:
+        numpy.ndarray: Массив [наклон, свободный член].
+    """
+    y = np.asarray(prices, dtype=float).ravel()
+    x = np.arange(len(y), dtype=float) - (len(y) - 1) / 2
+    mean = y.mean()
+    slope = (y - mean) @ x / (x @ x)
+    return np.array([slope, mean - slope * (len(y) - 1) / 2])
+
+
+def forecast_grid(prices, methods=FORECAST_METHODS, horizons=GRID_HORIZONS, trend=None):
+    """
+    Рассчитывает прогнозы для набора методов и горизонтов за один проход по ценам.
+
+    Общие статистики считаются один раз: среднее окна скользящего среднего
+    и коэффициенты тренда (моменты регрессии окна). Каждый горизонт - это
+    только вычисление прямой в точке w + h, поэтому сетка любой ширины стоит
+    столько же, сколько один прогноз. Для горизонта 30 результаты совпадают
+    с moving_average() соответствующего метода.
+
+    Аргументы:
+        prices (numpy.ndarray): Исторические цены формы (n,) или (n, 1).
+        methods (iterable, опционально): Методы из FORECAST_METHODS. По умолчанию все.
+        horizons (iterable, опционально): Горизонты в днях. По умолчанию (1, 5, 30, 90).
+        trend (tuple, опционально): Уже обученные коэффициенты тренда (наклон, свободный член),
+            например из реестра моделей. По умолчанию обучаются по последним 90 ценам.
+
+    Возвращает:
+        dict: Словарь {метод: {горизонт: прогнозируемая цена}}.
+
+    Пример:
+        >>> grid = forecast_grid(prices, horizons=[1, 5, 30, 90])
+        >>> grid['recent_trend'][90]
+    """
+    y = np.asarray(prices, dtype=float).ravel()
+    if not len(y):
+        raise ValueError('Нет цен для прогноза')
+    horizons = [int(horizon) for horizon in horizons]
+    last_price = float(y[-1])
+
+    grid = {}
+    for method in methods:
+        if method == 'moving_average':
+            # Скользящее среднее не зависит от горизонта
+            grid[method] = dict.fromkeys(horizons, float(y[-MA_WINDOW:].mean()))
+
+        elif method == 'recent_trend':
+            if len(y) > TREND_WINDOW:
+                slope, intercept = trend if trend is not None else fit_trend(y[-TREND_WINDOW:])
+                grid[method] = {horizon: float(intercept + slope * (TREND_WINDOW + horizon)) for horizon in horizons}
+            else:
+                grid[method] = dict.fromkeys(horizons, last_price)
+
+        elif method == 'last_price':
+            grid[method] = dict.fromkeys(horizons, last_price)
+
+        else:
+            raise ValueError(f'Неизвестный метод прогнозирования: {method}')
+
+    return grid
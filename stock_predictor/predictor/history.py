@@ -0,0 +1,231 @@
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .forecasting import HORIZON_DAYS
+from .models import StockPrediction
+from .storage import get_price_store
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionRecorder:
+    """
+    Буферизованная запись истории прогнозов.
+
+    record() только добавляет прогноз в буфер в памяти. Фоновый поток раз
+    в flush_interval секунд (или сразу при накоплении batch_size записей)
+    сохраняет буфер одним bulk_create, поэтому запрос не ждет записи в базу.
+    При завершении процесса оставшиеся записи сохраняются.
+
+    Атрибуты:
+        batch_size (int): Размер пакета, при котором запись запускается досрочно.
+        flush_interval (float): Максимальная задержка записи в секундах.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def record(self, ticker, method, prices, dates, predicted_price, plot_key='', horizon_days=HORIZON_DAYS):
+        """
+        Добавляет прогноз в буфер записи.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            method (str): Метод прогнозирования.
+            prices (numpy.ndarray): Исторические цены, по которым сделан прогноз.
+            dates (pandas.DatetimeIndex): Даты этих цен.
+            predicted_price (float): Прогнозируемая цена.
+            plot_key (str, опционально): Имя файла графика прогноза.
+            horizon_days (int, опционально): Горизонт прогноза в днях. По умолчанию 30.
+        """
+        prediction = StockPrediction(
+            ticker=ticker, method=method, created_at=timezone.now(),
+            window_start=dates[0].date(), window_end=dates[-1].date(), window_size=len(prices),
+            horizon_days=horizon_days, current_price=float(prices[-1][0]), predicted_price=float(predicted_price),
+            target_date=dates[-1].date() + timedelta(days=horizon_days), plot_key=plot_key or '')
+
+        with self._lock:
+            self._ensure_thread()
+            self._buffer.append(prediction)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Сохраняет накопленные прогнозы одним пакетом.
+
+        Возвращает:
+            int: Количество сохраненных записей.
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return 0
+        try:
+            StockPrediction.objects.bulk_create(batch, batch_size=500)
+        except Exception:
+            logger.exception('Не удалось сохранить %d прогнозов', len(batch))
+            return 0
+        return len(batch)
+
+    def _ensure_thread(self):
+        # Поток не переживает fork - в дочернем процессе запускаем новый
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='prediction-recorder', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_prediction_recorder():
+    """
+    Возвращает общий для процесса PredictionRecorder.
+
+    Возвращает:
+        PredictionRecorder: Буферизованная запись истории прогнозов.
+    """
+    global _recorder
+    with _recorder_lock:
+        if _recorder is None:
+            _recorder = PredictionRecorder(settings.PREDICTION_HISTORY_BATCH_SIZE,
+                                           settings.PREDICTION_HISTORY_FLUSH_INTERVAL)
+            atexit.register(_recorder.flush)
+        return _recorder
+
+
+def encode_cursor(prediction):
+    """
+    Кодирует позицию записи для постраничной навигации по ключу (created_at, id).
+
+    Аргументы:
+        prediction (StockPrediction): Последняя запись текущей страницы.
+
+    Возвращает:
+        str: Курсор вида '<микросекунды Unix>-<id>'.
+    """
+    micros = int(prediction.created_at.timestamp() * 1_000_000)
+    return f'{micros}-{prediction.pk}'
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор, созданный encode_cursor().
+
+    Возвращает:
+        tuple | None: Кортеж (created_at, id) или None, если курсор некорректен.
+    """
+    try:
+        micros, pk = (int(part) for part in cursor.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    created_at = datetime.fromtimestamp(0, dt_timezone.utc) + timedelta(microseconds=micros)
+    return created_at, pk
+
+
+def history_page(ticker=None, since=None, until=None, cursor=None, page_size=50):
+    """
+    Возвращает страницу истории прогнозов (от новых к старым).
+
+    Навигация по ключу (created_at, id) вместо OFFSET: каждая страница читается
+    по индексу от позиции курсора, поэтому скорость не зависит от номера страницы.
+
+    Аргументы:
+        ticker (str, опционально): Фильтр по тикеру.
+        since (datetime, опционально): Начало диапазона времени (включительно).
+        until (datetime, опционально): Конец диапазона времени (не включительно).
+        cursor (str, опционально): Курсор следующей страницы из предыдущего вызова.
+        page_size (int, опционально): Размер страницы. По умолчанию 50.
+
+    Возвращает:
+        tuple: Кортеж (записи страницы, курсор следующей страницы или None).
+    """
+    queryset = StockPrediction.objects.order_by('-created_at', '-id')
+    if ticker:
+        queryset = queryset.filter(ticker=ticker)
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    if until is not None:
+        queryset = queryset.filter(created_at__lt=until)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    # Запрашиваем на одну запись больше, чтобы узнать, есть ли следующая страница
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+def fill_actual_prices(today=None, batch_size=1000):
+    """
+    Заполняет фактическую цену для прогнозов, дата которых уже наступила.
+
+    Фактической считается цена закрытия первого торгового дня не раньше
+    target_date по данным локального хранилища истории цен.
+
+    Аргументы:
+        today (date, опционально): Текущая дата. По умолчанию сегодня (UTC).
+        batch_size (int, опционально): Количество обрабатываемых записей за проход.
+
+    Возвращает:
+        int: Количество обновленных записей.
+    """
+    today = today or timezone.now().date()
+    store = get_price_store()
+    updated = 0
+    last_id = 0
+
+    while True:
+        pending = list(StockPrediction.objects
+                       .filter(actual_price__isnull=True, target_date__lte=today, id__gt=last_id)
+                       .order_by('id')[:batch_size])
+        if not pending:
+            return updated
+        last_id = pending[-1].pk
+
+        # Цены каждого тикера читаем из хранилища один раз на пакет
+        closes_by_ticker = {}
+        for prediction in pending:
+            if prediction.ticker not in closes_by_ticker:
+                closes_by_ticker[prediction.ticker] = store.read(prediction.ticker)
+
+        changed = []
+        for prediction in pending:
+            timestamps, bars = closes_by_ticker[prediction.ticker]
+            target = datetime.combine(prediction.target_date, datetime.min.time(), dt_timezone.utc).timestamp()
+            index = int(np.searchsorted(timestamps, target))
+            if index < len(timestamps):
+                prediction.actual_price = float(bars[index, 3])
+                changed.append(prediction)
+
+        StockPrediction.objects.bulk_update(changed, ['actual_price'], batch_size=500)
+        updated += len(changed)
@@ -0,0 +1,268 @@
+import asyncio
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from .benchmarks import isolated_environment, summarize
+from .plot_worker import _init_worker
+
+# Виды запросов нагрузочного теста: страница результата (POST формы) и JSON API
+REQUEST_KINDS = ('page', 'api')
+
+# Интерфейсы сервера: WSGI (django.test.Client в пуле потоков, как gunicorn --threads)
+# и ASGI (django.test.AsyncClient, одновременные запросы в цикле событий, как uvicorn)
+SERVER_MODES = ('wsgi', 'asgi')
+
+# Признак успешной страницы результата: при ошибке predict_view отдает error.html со статусом 200
+_RESULT_MARKER = '<title>Результат прогноза</title>'.encode()
+
+# Максимальное ожидание одновременного старта процессов (секунды): если воркер не смог
+# подготовиться, остальные получают BrokenBarrierError, а не ждут бесконечно
+_START_TIMEOUT = 300
+
+
+def loadtest_tickers(n_tickers):
+    """
+    Возвращает синтетические тикеры нагрузочного теста ('L0000', 'L0001', ...).
+    """
+    return [f'L{i:04d}' for i in range(n_tickers)]
+
+
+def loadtest_frames(n_tickers, n_days, seed=0):
+    """
+    Генерирует синтетическую историю тикеров нагрузочного теста.
+
+    Результат детерминирован, поэтому процессы-воркеры строят те же данные
+    сами, а не получают их от родительского процесса.
+
+    Возвращает:
+        dict: Словарь {тикер: pandas.DataFrame с барами OHLCV}.
+    """
+    from .synthetic import synthetic_history
+    return {ticker: synthetic_history(n_days, seed=seed + i) for i, ticker in enumerate(loadtest_tickers(n_tickers))}
+
+
+def request_mix(tickers, n_requests, api_share=0.5, seed=0):
+    """
+    Формирует последовательность запросов с неравномерной популярностью тикеров.
+
+    Вероятность тикера обратно пропорциональна его рангу (закон Ципфа), как у
+    реального трафика, где несколько популярных тикеров дают большую часть запросов.
+
+    Аргументы:
+        tickers (list): Тикеры.
+        n_requests (int): Количество запросов.
+        api_share (float, опционально): Доля запросов к JSON API. По умолчанию 0.5.
+        seed (int, опционально): Зерно генератора.
+
+    Возвращает:
+        list: Кортежи (вид запроса из REQUEST_KINDS, тикер).
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, len(tickers) + 1)]
+    return [('api' if rng.random() < api_share else 'page', ticker)
+            for ticker in rng.choices(tickers, weights=weights, k=n_requests)]
+
+
+def _send(client, kind, ticker, api_params):
+    # Выполняет один запрос и возвращает признак успеха
+    if kind == 'page':
+        return _succeeded(kind, client.post('/', {'ticker': ticker}))
+    return _succeeded(kind, client.get('/api/predict/', {'tickers': ticker, **api_params}))
+
+
+async def _asend(client, kind, ticker, api_params):
+    # То же через django.test.AsyncClient
+    if kind == 'page':
+        return _succeeded(kind, await client.post('/', {'ticker': ticker}))
+    return _succeeded(kind, await client.get('/api/predict/', {'tickers': ticker, **api_params}))
+
+
+def _succeeded(kind, response):
+    if kind == 'page':
+        return response.status_code == 200 and _RESULT_MARKER in response.content
+    return response.status_code == 200 and 'error' not in response.json()['results'][0]
+
+
+def run_threads(requests, threads, api_params=None):
+    """
+    Выполняет запросы в пуле потоков через тестовый клиент Django (без сети).
+
+    У каждого потока свой django.test.Client, как у потока воркера gunicorn.
+
+    Аргументы:
+        requests (list): Запросы из request_mix().
+        threads (int): Количество потоков.
+        api_params (dict, опционально): Дополнительные параметры запросов к JSON API.
+
+    Возвращает:
+        dict: {'samples': {вид: [длительности в секундах]}, 'errors': int, 'elapsed': float}.
+    """
+    from django.test import Client
+
+    api_params = api_params or {}
+    local = threading.local()
+    samples = {kind: [] for kind in REQUEST_KINDS}
+    errors = []
+
+    def send(request):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        kind, ticker = request
+        started = time.perf_counter()
+        try:
+            ok = _send(client, kind, ticker, api_params)
+        except Exception:
+            ok = False
+        # list.append атомарен, отдельная блокировка не нужна
+        samples[kind].append(time.perf_counter() - started)
+        if not ok:
+            errors.append(request)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(send, requests))
+    return {'samples': samples, 'errors': len(errors), 'elapsed': time.perf_counter() - started}
+
+
+def run_async(requests, concurrency, api_params=None):
+    """
+    Выполняет запросы через асинхронный тестовый клиент Django (ASGI, без сети).
+
+    В одном цикле событий работают concurrency сопрограмм, каждая со своим
+    django.test.AsyncClient и следующим запросом из общей очереди, как у воркера
+    uvicorn с несколькими одновременными соединениями. Асинхронный api_predict
+    выполняется в цикле событий, а синхронный predict_view - через sync_to_async,
+    как под настоящим ASGI-сервером.
+
+    Аргументы:
+        requests (list): Запросы из request_mix().
+        concurrency (int): Количество одновременных запросов.
+        api_params (dict, опционально): Дополнительные параметры запросов к JSON API.
+
+    Возвращает:
+        dict: {'samples': {вид: [длительности в секундах]}, 'errors': int, 'elapsed': float}.
+    """
+    from django.test import AsyncClient
+
+    api_params = api_params or {}
+    samples = {kind: [] for kind in REQUEST_KINDS}
+    errors = []
+    queue = iter(requests)
+
+    async def consume():
+        # Итератор общий для сопрограмм: они работают в одном потоке и не вытесняют друг друга в next()
+        client = AsyncClient()
+        for kind, ticker in queue:
+            started = time.perf_counter()
+            try:
+                ok = await _asend(client, kind, ticker, api_params)
+            except Exception:
+                ok = False
+            samples[kind].append(time.perf_counter() - started)
+            if not ok:
+                errors.append((kind, ticker))
+
+    async def main():
+        await asyncio.gather(*(consume() for _ in range(concurrency)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return {'samples': samples, 'errors': len(errors), 'elapsed': time.perf_counter() - started}
+
+
+# Исполнители запросов для интерфейсов сервера из SERVER_MODES
+_RUNNERS = {'wsgi': run_threads, 'asgi': run_async}
+
+
+def _run_worker(directory, frames_spec, requests, threads, api_params, overrides, barrier, server):
+    # Выполняется в процессе-воркере: окружение на общей директории, прогрев, затем запросы
+    from django.test.utils import override_settings
+
+    runner = _RUNNERS[server]
+    with isolated_environment(loadtest_frames(*frames_spec), directory=directory), override_settings(**overrides):
+        # Прогрев (импорты, построитель графиков потока) не входит в замер
+        runner(requests[:len(REQUEST_KINDS) * 2], 1, api_params)
+        barrier.wait(timeout=_START_TIMEOUT)
+        return runner(requests, threads, api_params)
+
+
+def run_load(workers, threads, requests_per_worker, n_tickers=20, n_days=504, api_share=0.5, api_params=None,
+             overrides=None, seed=0, server='wsgi'):
+    """
+    Нагрузочный прогон: workers процессов по threads потоков, как у gunicorn --workers N --threads M.
+
+    В режиме server='asgi' запросы выполняет AsyncClient (run_async), а threads
+    задает количество одновременных запросов в цикле событий каждого процесса.
+
+    Процессы запускаются заново (spawn), поднимают Django и работают с общими
+    хранилищем истории и кэшем графиков во временной директории; данные отдает
+    InMemoryProvider, поэтому сеть не используется. История заранее загружается
+    в хранилище родительским процессом. Замер начинается одновременно во всех
+    процессах после прогрева.
+
+    Аргументы:
+        workers (int): Количество процессов.
+        threads (int): Количество потоков в каждом процессе.
+        requests_per_worker (int): Количество запросов каждого процесса.
+        n_tickers (int, опционально): Количество синтетических тикеров.
+        n_days (int, опционально): Длина истории в торговых днях.
+        api_share (float, опционально): Доля запросов к JSON API.
+        api_params (dict, опционально): Дополнительные параметры запросов к JSON API (например, {'plot': '1'}).
+        overrides (dict, опционально): Настройки, подменяемые в процессах (override_settings).
+        seed (int, опционально): Зерно данных и последовательности запросов.
+        server (str, опционально): Интерфейс сервера из SERVER_MODES. По умолчанию 'wsgi'.
+
+    Возвращает:
+        dict: Результат summarize() по всем запросам с ключами 'server', 'workers', 'threads',
+        'requests', 'errors', 'rps' и сводками по видам запросов 'page' и 'api'.
+
+    Пример:
+        >>> result = run_load(workers=4, threads=2, requests_per_worker=200)
+        >>> result['rps'], result['p95_ms']
+    """
+    from .services import prefetch_history
+
+    if server not in SERVER_MODES:
+        raise ValueError(f'Неизвестный интерфейс сервера: {server}')
+    overrides = {'ALLOWED_HOSTS': ['testserver'], 'PRECOMPUTE_TICKERS': [], **(overrides or {})}
+    frames_spec = (n_tickers, n_days, seed)
+    tickers = loadtest_tickers(n_tickers)
+    years = n_days // 252 + 1
+    settings_module = os.environ.get('DJANGO_SETTINGS_MODULE', 'stock_predictor.settings')
+    context = multiprocessing.get_context('spawn')
+
+    with isolated_environment(loadtest_frames(*frames_spec)) as directory, context.Manager() as manager:
+        errors = prefetch_history(tickers, years=years)
+        if errors:
+            raise RuntimeError(f'Не удалось подготовить историю: {errors}')
+
+        barrier = manager.Barrier(workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(settings_module,)) as executor:
+            futures = [executor.submit(_run_worker, directory, frames_spec,
+                                       request_mix(tickers, requests_per_worker, api_share, seed + worker),
+                                       threads, api_params, overrides, barrier, server)
+                       for worker in range(workers)]
+            results = [future.result() for future in futures]
+
+    samples = {kind: [sample for result in results for sample in result['samples'][kind]] for kind in REQUEST_KINDS}
+    every = samples['page'] + samples['api']
+    elapsed = max(result['elapsed'] for result in results)
+    summary = summarize(every, len(every), elapsed)
+    summary.update({
+        'server': server,
+        'workers': workers,
+        'threads': threads,
+        'requests': len(every),
+        'errors': sum(result['errors'] for result in results),
+        'rps': summary.pop('throughput'),
+    })
+    for kind in REQUEST_KINDS:
+        if samples[kind]:
+            summary[kind] = summarize(samples[kind], len(samples[kind]), elapsed)
+    return summary
@@ -0,0 +1,63 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.backtesting import backtest
+from predictor.forecasting import FORECAST_METHODS, HORIZON_DAYS
+from predictor.services import get_stock_data, prefetch_history
+
+
+class Command(BaseCommand):
+    """
+    Пошаговое тестирование методов прогнозирования для списка тикеров.
+
+    История всех тикеров сначала обновляется одной пакетной загрузкой провайдера,
+    затем тикеры обрабатываются параллельно в пуле потоков: расчет по 10 годам
+    занимает миллисекунды и выполняется в NumPy.
+
+    Пример:
+        python manage.py backtest AAPL MSFT NVDA --years 10 --workers 8
+    """
+    help = 'Сравнивает методы прогнозирования на истории тикеров (MAE, MAPE, точность направления)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='+', help='Тикеры акций')
+        parser.add_argument('--years', type=int, default=10, help='Глубина истории в годах')
+        parser.add_argument('--horizon', type=int, default=HORIZON_DAYS, help='Горизонт прогноза в днях')
+        parser.add_argument('--workers', type=int, default=8, help='Количество параллельных потоков')
+
+    def handle(self, *args, **options):
+        tickers = [ticker.upper() for ticker in options['tickers']]
+        if options['workers'] < 1:
+            raise CommandError('--workers должен быть не меньше 1')
+
+        for ticker, error in prefetch_history(tickers, years=options['years']).items():
+            self.stderr.write(f'{ticker}: не удалось обновить историю: {error}')
+
+        def run(ticker):
+            try:
+                # Нужны только цены: представление общей матрицы цен без копирования, если она актуальна
+                prices, _ = get_stock_data(ticker, years=options['years'], as_arrays=True)
+                return ticker, backtest(prices, horizon=options['horizon']), None
+            except Exception as e:
+                return ticker, None, e
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = list(executor.map(run, tickers))
+
+        self.stdout.write(f'{"Тикер":<8} {"Метод":<16} {"MAE":>10} {"MAPE, %":>9} {"Направление, %":>15} {"Дней":>6}')
+        for ticker, report, error in results:
+            if error is not None:
+                self.stderr.write(f'{ticker:<8} ошибка: {error}')
+                continue
+            best = min(FORECAST_METHODS, key=lambda method: report[method]['mape']
+                       if report[method]['samples'] else float('inf'))
+            for method in FORECAST_METHODS:
+                metrics = report[method]
+                # NaN - метод не предсказывает направление (например, 'last_price')
+                direction = metrics['directional_accuracy']
+                direction = '-' if math.isnan(direction) else f'{direction:.1f}'
+                line = (f'{ticker:<8} {method:<16} {metrics["mae"]:>10.2f} {metrics["mape"]:>9.2f} '
+                        f'{direction:>15} {metrics["samples"]:>6}')
+                self.stdout.write(self.style.SUCCESS(line) if method == best and metrics['samples'] else line)
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.benchmarks import COMPARABLE_METRICS, PROFILES, STAGES, compare, load_report, run_suite, save_report
+
+
+class Command(BaseCommand):
+    """
+    Набор замеров производительности этапов прогноза на синтетических данных.
+
+    Измеряет get_stock_data (чтение из хранилища), moving_average для обоих методов,
+    batch_forecast, train_model и create_prediction_plot на историях от 30 дней
+    до 30 лет и пакетах от 1 до 5000 тикеров. Результат сравнивается с базовой
+    линией в JSON; при ухудшении больше порога команда завершается с ошибкой,
+    что позволяет запускать ее в CI. Базовая линия зависит от машины - ее нужно
+    создавать на той же машине, где выполняется сравнение.
+
+    Пример:
+        python manage.py benchmark --profile quick --save-baseline
+        python manage.py benchmark --profile quick --threshold 0.25
+        python manage.py benchmark --profile full --stage batch_forecast --stage fetch
+    """
+    help = 'Измеряет задержку, пропускную способность и память этапов прогноза и сравнивает с базовой линией'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=tuple(PROFILES), default='quick', help='Набор размеров')
+        parser.add_argument('--stage', action='append', choices=STAGES, help='Этап (можно указать несколько)')
+        parser.add_argument('--repeat', type=int, default=5, help='Количество прогонов каждого случая')
+        parser.add_argument('--max-bars', type=int, default=2_000_000,
+                            help='Пропускать случаи, где дни x тикеры больше этого числа')
+        parser.add_argument('--baseline', default=settings.BENCHMARK_BASELINE_PATH, help='Файл базовой линии')
+        parser.add_argument('--save-baseline', action='store_true', help='Сохранить результат как базовую линию')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Допустимое ухудшение (0.2 = 20%%)')
+        parser.add_argument('--metric', action='append', choices=COMPARABLE_METRICS,
+                            help='Сравниваемые метрики (по умолчанию p50_ms и peak_kb)')
+        parser.add_argument('--output', help='Сохранить отчет в JSON')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1')
+
+        self.stdout.write(f'{"Случай":<32} {"p50, мс":>10} {"p95, мс":>10} {"p99, мс":>10} '
+                          f'{"тикеров/с":>12} {"память, КБ":>11}')
+
+        def progress(key, result):
+            self.stdout.write(f'{key:<32} {result["p50_ms"]:>10.3f} {result["p95_ms"]:>10.3f} '
+                              f'{result["p99_ms"]:>10.3f} {result["throughput"] or 0:>12,.0f} '
+                              f'{result["peak_kb"]:>11,.0f}')
+
+        report = run_suite(options['profile'], stages=options['stage'] or STAGES, repeat=options['repeat'],
+                           max_bars=options['max_bars'], progress=progress)
+        if options['output']:
+            save_report(report, options['output'])
+
+        if options['save_baseline']:
+            save_report(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f'Базовая линия сохранена: {options["baseline"]}'))
+            return
+
+        baseline = load_report(options['baseline'])
+        if baseline is None:
+            self.stdout.write(f'Базовая линия {options["baseline"]} не найдена, сравнение пропущено '
+                              f'(создайте ее с --save-baseline)')
+            return
+
+        regressions = compare(report, baseline, options['threshold'], options['metric'] or ('p50_ms', 'peak_kb'))
+        if regressions:
+            for key, metric, before, after in regressions:
+                self.stderr.write(f'{key} {metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)')
+            raise CommandError(f'Обнаружено ухудшений: {len(regressions)} '
+                               f'(порог {options["threshold"] * 100:.0f}%)')
+        self.stdout.write(self.style.SUCCESS('Ухудшений относительно базовой линии нет'))
@@ -0,0 +1,67 @@
+import tempfile
+import time
+from os import path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from predictor.rendering import PLOT_FORMATS, PlotRenderer
+from predictor.services import _render_legacy, moving_average
+from predictor.synthetic import synthetic_prices
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает задержку построения графика: исходный способ через pyplot и PlotRenderer.
+
+    Пример:
+        python manage.py benchmark_render --iterations 20 --days 252 --dpi 100 --format png
+    """
+    help = 'Измеряет задержку построения графика прогноза (legacy против fast)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Количество построений на режим')
+        parser.add_argument('--days', type=int, default=252, help='Длина синтетической истории в днях')
+        parser.add_argument('--dpi', type=int, default=100, help='Разрешение для быстрого режима')
+        parser.add_argument('--format', choices=PLOT_FORMATS, default='png', help='Формат для быстрого режима')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        prices, dates = synthetic_prices(options['days'], seed=1)
+        future_price = moving_average(prices)
+
+        with tempfile.TemporaryDirectory() as directory:
+            legacy = self._measure(
+                iterations, lambda i: _render_legacy(path.join(directory, f'legacy_{i}.png'), 'BENCH', prices,
+                                                     dates, future_price, 'moving_average'))
+
+            # Первое построение создает фигуру - измеряем его отдельно как стоимость инициализации
+            started = time.perf_counter()
+            renderer = PlotRenderer(dpi=options['dpi'], fmt=options['format'])
+            renderer.render('BENCH', prices, dates, future_price, 'moving_average')
+            warmup = (time.perf_counter() - started) * 1000
+
+            fast = self._measure(
+                iterations, lambda i: renderer.render_to(path.join(directory, f'fast_{i}.{options["format"]}'),
+                                                         'BENCH', prices, dates, future_price * (1 + i / 1000),
+                                                         'moving_average'))
+
+        self.stdout.write(f'История: {options["days"]} дней, построений на режим: {iterations}')
+        self._report('legacy (pyplot, 300 dpi, png)', legacy)
+        self._report(f'fast ({options["dpi"]} dpi, {options["format"]})', fast)
+        self.stdout.write(f'Инициализация PlotRenderer: {warmup:.1f} мс')
+        self.stdout.write(self.style.SUCCESS(f'Ускорение по медиане: {np.median(legacy) / np.median(fast):.1f}x'))
+
+    @staticmethod
+    def _measure(iterations, fn):
+        timings = []
+        for i in range(iterations):
+            started = time.perf_counter()
+            fn(i)
+            timings.append((time.perf_counter() - started) * 1000)
+        return np.array(timings)
+
+    def _report(self, title, timings):
+        self.stdout.write(
+            f'{title:<32} среднее {timings.mean():8.1f} мс | p50 {np.percentile(timings, 50):8.1f} мс | '
+            f'p95 {np.percentile(timings, 95):8.1f} мс')
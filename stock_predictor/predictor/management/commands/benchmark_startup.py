@@ -0,0 +1,62 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Скрипт дочернего процесса: поднимает Django, импортирует представления (как воркер
+# при первом запросе) и сообщает время запуска, пиковый RSS и загруженные тяжелые модули
+_CHILD_SCRIPT = '''
+import json, os, resource, sys, time
+started = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stock_predictor.settings')
+import django
+django.setup()
+mode = sys.argv[1]
+if mode == 'eager':
+    # Как до отложенных импортов: все тяжелые зависимости загружаются вместе с services
+    import pandas, yfinance, sklearn.linear_model, matplotlib.pyplot
+elif mode == 'warmup':
+    from predictor.services import warm_up
+    warm_up()
+import predictor.views
+elapsed = time.perf_counter() - started
+heavy = [name for name in ('pandas', 'yfinance', 'sklearn', 'matplotlib.pyplot', 'matplotlib') if name in sys.modules]
+print(json.dumps({'seconds': elapsed, 'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'heavy_modules': heavy}))
+'''
+
+
+class Command(BaseCommand):
+    """
+    Измеряет время запуска и память процесса с отложенными и с немедленными импортами.
+
+    Режимы:
+        - eager: тяжелые зависимости загружаются при старте (поведение до отложенных импортов)
+        - lazy: текущее поведение - загружаются только Django и легкие модули приложения
+        - warmup: отложенные импорты плюс прогрев services.warm_up()
+
+    Пример:
+        python manage.py benchmark_startup --runs 5
+    """
+    help = 'Сравнивает время запуска и пиковый RSS процесса при немедленных и отложенных импортах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Количество запусков на режим')
+
+    def handle(self, *args, **options):
+        for mode in ('eager', 'lazy', 'warmup'):
+            samples = [self._run_child(mode) for _ in range(options['runs'])]
+            seconds = np.median([sample['seconds'] for sample in samples]) * 1000
+            rss_mb = np.median([sample['rss_kb'] for sample in samples]) / 1024
+            modules = ', '.join(samples[-1]['heavy_modules']) or 'нет'
+            self.stdout.write(f'{mode:<7} запуск {seconds:8.1f} мс | пиковый RSS {rss_mb:7.1f} МБ | '
+                              f'тяжелые модули: {modules}')
+
+    @staticmethod
+    def _run_child(mode):
+        output = subprocess.run([sys.executable, '-c', _CHILD_SCRIPT, mode], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.services import prefetch_history
+from predictor.shared_prices import build_price_matrix
+
+
+class Command(BaseCommand):
+    """
+    Строит общую матрицу цен в отображенной памяти для всех воркеров.
+
+    Пример:
+        python manage.py build_price_matrix AAPL MSFT NVDA --refresh --years 5
+    """
+    help = 'Строит общую для процессов матрицу цен закрытия (numpy.memmap) из хранилища истории'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='+', help='Тикеры акций')
+        parser.add_argument('--refresh', action='store_true', help='Предварительно обновить историю у провайдера')
+        parser.add_argument('--years', type=int, default=1, help='Глубина истории при обновлении')
+        parser.add_argument('--dtype', choices=('float64', 'float32'), default='float64',
+                            help='Тип цен: float32 вдвое компактнее, но округляет цены до ~7 значащих цифр')
+
+    def handle(self, *args, **options):
+        if not settings.SHARED_PRICES_DIR:
+            raise CommandError('Не задана настройка SHARED_PRICES_DIR')
+
+        tickers = [ticker.upper() for ticker in options['tickers']]
+        if options['refresh']:
+            for ticker, error in prefetch_history(tickers, years=options['years']).items():
+                self.stderr.write(f'{ticker}: не удалось обновить историю: {error}')
+
+        index = build_price_matrix(tickers, settings.SHARED_PRICES_DIR, dtype=options['dtype'])
+        total = sum(length for _, length in index.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Матрица построена: {len(index)} тикеров, {total} баров, {settings.SHARED_PRICES_DIR}'))
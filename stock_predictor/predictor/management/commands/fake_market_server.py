@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.fake_market import FakeMarketServer
+from predictor.providers import HTTPJSONProvider
+
+
+class Command(BaseCommand):
+    """
+    Запускает локальный сервер синтетических рыночных данных.
+
+    Для работы приложения без сети укажите в настройках
+    PRICE_PROVIDER = 'predictor.providers.HTTPJSONProvider' и PRICE_HTTP_URL.
+    С параметром --bench сервер запускается в фоне, и команда измеряет
+    пропускную способность fetch_many() и работу повторов при заданной
+    доле ошибок и ограничении частоты.
+
+    Пример:
+        python manage.py fake_market_server --port 8765 --latency 0.05 --error-rate 0.1
+        python manage.py fake_market_server --port 0 --bench 500 --workers 16 --rate 200
+    """
+    help = 'Запускает локальный HTTP-сервер синтетических рыночных данных (или замер fetch_many на нем)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Адрес сервера')
+        parser.add_argument('--port', type=int, default=8765, help='Порт сервера (0 - любой свободный)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа в секундах')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов 503')
+        parser.add_argument('--rate-limit', type=float, default=None, help='Запросов в секунду до ответов 429')
+        parser.add_argument('--bench', type=int, default=0, help='Замерить загрузку N тикеров и завершиться')
+        parser.add_argument('--period', default='5y', help='Период истории для замера')
+        parser.add_argument('--workers', type=int, default=8, help='Одновременных запросов при замере')
+        parser.add_argument('--rate', type=float, default=None, help='Ограничение частоты клиента при замере')
+        parser.add_argument('--retries', type=int, default=3, help='Повторов временных ошибок при замере')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['error_rate'] < 1:
+            raise CommandError('--error-rate должен быть в диапазоне [0, 1)')
+
+        server = FakeMarketServer((options['host'], options['port']), latency=options['latency'],
+                                  error_rate=options['error_rate'], rate_limit=options['rate_limit'])
+        if not options['bench']:
+            self.stdout.write(f'Сервер рыночных данных: {server.url}/history/<тикер>?period=1y (Ctrl+C - остановка)')
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+            return
+
+        server.serve_in_thread()
+        try:
+            self._bench(server, options)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def _bench(self, server, options):
+        tickers = [f'T{i:05d}' for i in range(options['bench'])]
+        # Синтетическая история генерируется заранее, чтобы замер не включал ее создание
+        for ticker in tickers:
+            server.frame(ticker)
+
+        provider = HTTPJSONProvider(server.url, max_workers=options['workers'], rate=options['rate'],
+                                    retries=options['retries'], backoff=0.05, max_backoff=2.0)
+        started = time.perf_counter()
+        frames, errors = provider.fetch_many(tickers, period=options['period'])
+        elapsed = time.perf_counter() - started
+
+        stats = provider.stats()
+        bars = sum(len(frame) for frame in frames.values())
+        self.stdout.write(f'Тикеров: {len(frames)} загружено, {len(errors)} с ошибкой за {elapsed:.2f} с '
+                          f'({len(frames) / elapsed:.1f} тикеров/с, {bars / elapsed:,.0f} баров/с)')
+        self.stdout.write(f'Клиент: запросов {stats["requests"]}, повторов {stats["retries"]}, '
+                          f'отказов {stats["failures"]}, ожидание лимита {stats["throttled_seconds"]:.2f} с')
+        self.stdout.write(f'Сервер: {server.counters}')
+        for ticker, error in list(errors.items())[:5]:
+            self.stderr.write(f'{ticker}: {error}')
@@ -0,0 +1,104 @@
+import json
+from os import cpu_count
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.loadtest import SERVER_MODES, run_load
+
+
+def _int_list(value):
+    # Список целых чисел через запятую ('1,2,4')
+    try:
+        values = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise CommandError(f'Ожидается список целых чисел через запятую: {value}')
+    if not values or min(values) < 1:
+        raise CommandError(f'Значения должны быть не меньше 1: {value}')
+    return values
+
+
+def _server_list(value):
+    # Интерфейсы сервера через запятую ('wsgi,asgi')
+    servers = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [server for server in servers if server not in SERVER_MODES]
+    if not servers or unknown:
+        raise CommandError(f'Ожидаются интерфейсы из {", ".join(SERVER_MODES)} через запятую: {value}')
+    return servers
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест страницы прогноза и JSON API на синтетических данных.
+
+    Для каждого сочетания количества процессов и потоков (как у
+    gunicorn --workers N --threads M) запускает процессы, которые выполняют
+    смесь запросов к predict_view и /api/predict/ через тестовый клиент Django.
+    С --server asgi запросы выполняет django.test.AsyncClient, а --threads задает
+    количество одновременных запросов в цикле событий процесса (как у uvicorn).
+    Данные отдает InMemoryProvider, хранилище истории и кэш графиков общие
+    для процессов и находятся во временной директории. Выводит пропускную
+    способность, перцентили задержки и ускорение относительно первой строки:
+    при отсутствии общих узких мест запросы/с растут почти линейно с числом
+    процессов (до количества ядер).
+
+    Пример:
+        python manage.py loadtest --workers 1,2,4 --threads 1,4 --requests 300
+        python manage.py loadtest --server wsgi,asgi --workers 1,4 --threads 8 --output loadtest.json
+        python manage.py loadtest --workers 1,4 --renderer legacy --api-plot --history
+    """
+    help = ('Измеряет пропускную способность и задержку predict_view и JSON API (WSGI и ASGI) '
+            'при росте числа процессов и потоков')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4', help='Количество процессов через запятую')
+        parser.add_argument('--threads', default='1,4',
+                            help='Количество потоков (для asgi - одновременных запросов) в процессе через запятую')
+        parser.add_argument('--server', default='wsgi',
+                            help=f'Интерфейсы сервера через запятую: {", ".join(SERVER_MODES)}')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на процесс')
+        parser.add_argument('--tickers', type=int, default=20, help='Количество синтетических тикеров')
+        parser.add_argument('--days', type=int, default=504, help='Длина истории в торговых днях')
+        parser.add_argument('--api-share', type=float, default=0.5, help='Доля запросов к JSON API')
+        parser.add_argument('--api-plot', action='store_true', help='Строить графики в запросах к JSON API')
+        parser.add_argument('--renderer', choices=('fast', 'legacy'), help='Режим построения графиков')
+        parser.add_argument('--async-plots', action='store_true',
+                            help='Строить графики страницы в фоновом пуле (по умолчанию - в запросе)')
+        parser.add_argument('--history', action='store_true',
+                            help='Записывать историю прогнозов (в базу Django из настроек)')
+        parser.add_argument('--output', help='Сохранить результаты в JSON')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['tickers'] < 1:
+            raise CommandError('--requests и --tickers должны быть не меньше 1')
+        if not 0 <= options['api_share'] <= 1:
+            raise CommandError('--api-share должен быть в диапазоне [0, 1]')
+
+        overrides = {'PLOT_ASYNC': options['async_plots'], 'PREDICTION_HISTORY_ENABLED': options['history']}
+        if options['renderer']:
+            overrides['PLOT_RENDERER'] = options['renderer']
+        api_params = {'plot': '1'} if options['api_plot'] else {}
+
+        self.stdout.write(f'Ядер: {cpu_count()}. Запросов на процесс: {options["requests"]}, '
+                          f'тикеров: {options["tickers"]}, дней истории: {options["days"]}')
+        self.stdout.write(f'{"Сервер":>6} {"Процессы":>9} {"Потоки":>7} {"Запросов":>9} {"Ошибок":>7} '
+                          f'{"Запросов/с":>11} {"p50, мс":>9} {"p95, мс":>9} {"p99, мс":>9} {"Ускорение":>10}')
+
+        results = []
+        for server in _server_list(options['server']):
+            for workers in _int_list(options['workers']):
+                for threads in _int_list(options['threads']):
+                    result = run_load(workers, threads, options['requests'], n_tickers=options['tickers'],
+                                      n_days=options['days'], api_share=options['api_share'],
+                                      api_params=api_params, overrides=overrides, server=server)
+                    speedup = result['rps'] / results[0]['rps'] if results and results[0]['rps'] else 1.0
+                    results.append(result)
+                    self.stdout.write(f'{server:>6} {workers:>9} {threads:>7} {result["requests"]:>9} '
+                                      f'{result["errors"]:>7} {result["rps"] or 0:>11,.1f} '
+                                      f'{result["p50_ms"]:>9.1f} {result["p95_ms"]:>9.1f} '
+                                      f'{result["p99_ms"]:>9.1f} {speedup:>9.2f}x')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, indent=2, ensure_ascii=False)
+        if any(result['errors'] for result in results):
+            self.stderr.write(self.style.WARNING('Часть запросов завершилась ошибкой (см. столбец "Ошибок")'))
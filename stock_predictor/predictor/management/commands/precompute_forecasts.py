@@ -0,0 +1,77 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.forecasting import FORECAST_METHODS
+from predictor.plot_worker import _init_worker
+from predictor.precompute import precompute_chunk, save_precomputed
+from predictor.services import prefetch_history
+
+
+class Command(BaseCommand):
+    """
+    Заранее рассчитывает прогнозы и графики для часто запрашиваемых тикеров.
+
+    Запускается после закрытия биржи (например, из cron). История всех тикеров
+    обновляется одной пакетной загрузкой, затем прогнозы и графики считаются
+    в пуле процессов по частям, а результаты сохраняются в PrecomputedForecast
+    одним пакетом из основного процесса.
+
+    Пример:
+        python manage.py precompute_forecasts --workers 8
+        python manage.py precompute_forecasts AAPL MSFT --method recent_trend --no-plots
+
+    Пример записи cron (будни, 22:30 UTC - после закрытия NYSE):
+        30 22 * * 1-5 cd /srv/stock_predictor && python manage.py precompute_forecasts
+    """
+    help = 'Рассчитывает прогнозы и графики для тикеров PRECOMPUTE_TICKERS в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*', help='Тикеры (по умолчанию PRECOMPUTE_TICKERS)')
+        parser.add_argument('--method', action='append', choices=FORECAST_METHODS,
+                            help='Метод прогнозирования (по умолчанию все)')
+        parser.add_argument('--years', type=int, default=1, help='Глубина истории в годах')
+        parser.add_argument('--workers', type=int, default=settings.PRECOMPUTE_WORKERS,
+                            help='Количество процессов')
+        parser.add_argument('--chunk-size', type=int, default=25, help='Тикеров в одной задаче процесса')
+        parser.add_argument('--no-plots', action='store_true', help='Не строить графики')
+        parser.add_argument('--no-history', action='store_true', help='Не добавлять прогнозы в историю')
+
+    def handle(self, *args, **options):
+        tickers = list(dict.fromkeys(ticker.upper() for ticker in options['tickers'] or settings.PRECOMPUTE_TICKERS))
+        if not tickers:
+            raise CommandError('Не заданы тикеры: укажите их в аргументах или в настройке PRECOMPUTE_TICKERS')
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers и --chunk-size должны быть не меньше 1')
+        methods = options['method'] or FORECAST_METHODS
+
+        started = time.perf_counter()
+        errors = {ticker: str(error) for ticker, error in prefetch_history(tickers, years=options['years']).items()}
+        fetched = time.perf_counter()
+
+        chunks = [tickers[i:i + options['chunk_size']] for i in range(0, len(tickers), options['chunk_size'])]
+        rows = []
+        with ProcessPoolExecutor(
+                max_workers=min(options['workers'], len(chunks)),
+                mp_context=multiprocessing.get_context(settings.PLOT_WORKER_START_METHOD),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'stock_predictor.settings'),)) as executor:
+            futures = [executor.submit(precompute_chunk, chunk, methods, options['years'], not options['no_plots'])
+                       for chunk in chunks]
+            for future in as_completed(futures):
+                chunk_rows, chunk_errors = future.result()
+                rows.extend(chunk_rows)
+                errors.update(chunk_errors)
+        computed = time.perf_counter()
+
+        saved = save_precomputed(rows, record_history=not options['no_history'])
+        for ticker, error in sorted(errors.items()):
+            self.stderr.write(f'{ticker}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Сохранено прогнозов: {saved} ({len(tickers) - len(errors)} из {len(tickers)} тикеров). '
+            f'Загрузка {fetched - started:.1f} с, расчет {computed - fetched:.1f} с, '
+            f'запись {time.perf_counter() - computed:.1f} с'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from predictor.history import fill_actual_prices
+
+
+class Command(BaseCommand):
+    """
+    Заполняет фактические цены для прогнозов, дата которых уже наступила.
+
+    Пример:
+        python manage.py update_actual_prices
+    """
+    help = 'Заполняет фактическую цену на дату прогноза по данным хранилища истории цен'
+
+    def handle(self, *args, **options):
+        updated = fill_actual_prices()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено прогнозов: {updated}'))
@@ -0,0 +1,230 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from os import path, makedirs
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+# Границы корзин гистограмм задержки в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Описания метрик для вывода в формате Prometheus
+_HELP = {
+    'predictor_request_seconds': 'Полное время обработки запроса по представлениям',
+    'predictor_stage_seconds': 'Время этапов обработки прогноза',
+    'predictor_ticker_stage_seconds': 'Время этапов обработки прогноза по тикерам',
+}
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами (как histogram в Prometheus).
+
+    Атрибуты:
+        buckets (tuple): Верхние границы корзин.
+        counts (list): Количество наблюдений в каждой корзине (последняя - +Inf).
+        total (float): Сумма наблюдений.
+        count (int): Количество наблюдений.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Реестр гистограмм задержек процесса с выводом в текстовом формате Prometheus.
+
+    Метрики хранятся в памяти процесса: при нескольких воркерах каждый отдает
+    свои значения, а суммирование выполняется на стороне сборщика.
+
+    Атрибуты:
+        max_tickers (int): Максимум различных тикеров в метках; остальные учитываются как 'other'.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_tickers=200):
+        self.buckets = buckets
+        self.max_tickers = max_tickers
+        self._histograms = {}
+        self._tickers = set()
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        """
+        Добавляет наблюдение в гистограмму name с метками labels.
+        """
+        with self._lock:
+            ticker = labels.get('ticker')
+            if ticker is not None and ticker not in self._tickers:
+                if len(self._tickers) < self.max_tickers:
+                    self._tickers.add(ticker)
+                else:
+                    labels['ticker'] = 'other'
+            key = (name, tuple(sorted(labels.items())))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def render(self, values=None):
+        """
+        Формирует текст метрик в формате Prometheus.
+
+        Аргументы:
+            values (dict, опционально): Дополнительные значения {имя метрики: число}. Метрики
+                с суффиксом _total (монотонные счетчики) выводятся с типом counter, остальные - gauge.
+
+        Возвращает:
+            str: Текст для ответа на запрос сборщика метрик.
+        """
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+            snapshot = [(key, list(h.counts), h.total, h.count) for key, h in items]
+
+        current_name = None
+        for (name, labels), counts, total, count in snapshot:
+            if name != current_name:
+                current_name = name
+                lines.append(f'# HELP {name} {_HELP.get(name, name)}')
+                lines.append(f'# TYPE {name} histogram')
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            prefix = f'{label_text},' if label_text else ''
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            suffix = f'{{{label_text}}}' if label_text else ''
+            lines.append(f'{name}_sum{suffix} {total}')
+            lines.append(f'{name}_count{suffix} {count}')
+
+        for name, value in sorted((values or {}).items()):
+            lines.append(f'# TYPE {name} {"counter" if name.endswith("_total") else "gauge"}')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def stage(name, ticker=None):
+    """
+    Измеряет время этапа обработки прогноза.
+
+    Аргументы:
+        name (str): Название этапа ('fetch', 'forecast', 'plot', 'render_template').
+        ticker (str, опционально): Тикер для гистограммы по тикерам.
+
+    Пример:
+        >>> with stage('fetch', 'AAPL'):
+        ...     prices, dates = get_stock_data('AAPL')
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('predictor_stage_seconds', elapsed, stage=name)
+        if ticker:
+            registry.observe('predictor_ticker_stage_seconds', elapsed, stage=name, ticker=ticker)
+
+
+# Одновременно может работать только один cProfile (с Python 3.12 это ограничение интерпретатора)
+_profiler_lock = threading.Lock()
+
+
+class TimingMiddleware:
+    """
+    Промежуточное ПО, измеряющее полное время обработки запроса.
+
+    Поддерживает синхронные и асинхронные представления без лишних переключений
+    потоков. Если задан PROFILE_SLOW_REQUESTS_MS, доля PROFILE_SAMPLE_RATE
+    запросов выполняется под cProfile, и для запросов медленнее порога
+    статистика сохраняется в PROFILE_DIR (файлы .prof для pstats/snakeviz).
+
+    cProfile профилирует только поток, в котором включен. Для синхронных
+    представлений это весь запрос. У асинхронных (api_predict) в профиль попадает
+    лишь поток цикла событий: загрузка истории и графики, выполняемые через
+    sync_to_async в других потоках, видны только как ожидание, а между await
+    в профиль попадают и корутины соседних запросов. Узкие места таких этапов
+    ищите по гистограммам predictor_stage_seconds или профилируя синхронный
+    этап отдельно (например, через predict_view).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        profiler = _start_profiler()
+        try:
+            return self.get_response(request)
+        finally:
+            _finish_request(request, started, profiler)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        profiler = _start_profiler()
+        try:
+            return await self.get_response(request)
+        finally:
+            _finish_request(request, started, profiler)
+
+
+def _start_profiler():
+    threshold = getattr(settings, 'PROFILE_SLOW_REQUESTS_MS', None)
+    if threshold is None or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return None
+    if not _profiler_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Профилирование уже включено другим инструментом
+        _profiler_lock.release()
+        return None
+    return profiler
+
+
+def _finish_request(request, started, profiler):
+    elapsed = time.perf_counter() - started
+    match = getattr(request, 'resolver_match', None)
+    view = match.url_name if match is not None and match.url_name else 'unknown'
+    registry.observe('predictor_request_seconds', elapsed, view=view)
+
+    if profiler is None:
+        return
+    try:
+        profiler.disable()
+        if elapsed * 1000 >= settings.PROFILE_SLOW_REQUESTS_MS:
+            makedirs(settings.PROFILE_DIR, exist_ok=True)
+            filename = f'{time.strftime("%Y%m%d_%H%M%S")}_{view}_{int(elapsed * 1000)}ms_{os.getpid()}.prof'
+            profiler.dump_stats(path.join(settings.PROFILE_DIR, filename))
+    finally:
+        _profiler_lock.release()
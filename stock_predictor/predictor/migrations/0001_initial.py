@@ -0,0 +1,40 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=15)),
+                ('method', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('window_size', models.PositiveIntegerField()),
+                ('horizon_days', models.PositiveSmallIntegerField(default=30)),
+                ('current_price', models.FloatField()),
+                ('predicted_price', models.FloatField()),
+                ('target_date', models.DateField()),
+                ('actual_price', models.FloatField(blank=True, null=True)),
+                ('plot_key', models.CharField(blank=True, max_length=64)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [
+                    models.Index(fields=['ticker', '-created_at', '-id'], name='prediction_ticker_time_idx'),
+                    models.Index(fields=['-created_at', '-id'], name='prediction_time_idx'),
+                    models.Index(condition=models.Q(('actual_price__isnull', True)), fields=['target_date'],
+                                 name='prediction_pending_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=15)),
+                ('method', models.CharField(max_length=20)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('window_start', models.DateField()),
+                ('window_end', models.DateField()),
+                ('window_size', models.PositiveIntegerField()),
+                ('horizon_days', models.PositiveSmallIntegerField(default=30)),
+                ('current_price', models.FloatField()),
+                ('predicted_price', models.FloatField()),
+                ('plot_url', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'constraints': [
+                    models.UniqueConstraint(fields=('ticker', 'method'), name='precomputed_ticker_method_uniq'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0002_precomputedforecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='precomputedforecast',
+            name='grid',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
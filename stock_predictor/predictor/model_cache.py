@@ -0,0 +1,179 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ModelRegistry:
+    """
+    Реестр обученных моделей прогноза по ключу (тикер, метод, дата конца окна, длина окна).
+
+    Хранит не объекты sklearn, а коэффициенты модели в виде небольших массивов NumPy.
+    Внутри процесса используется LRU-словарь (OrderedDict), дополнительно можно
+    подключить общий для процессов кэш Django (например, Redis или memcached).
+
+    Актуальность: в ключ входит отпечаток данных окна (window_fingerprint), поэтому
+    обновление незакрытого дня - дата конца окна та же, а цена последнего бара
+    другая - дает новый ключ в любом процессе, в том числе в других воркерах
+    с собственным реестром в памяти. invalidate(ticker), вызываемый при записи
+    новых баров, дополнительно освобождает записи тикера в текущем процессе и
+    увеличивает номер поколения в общем кэше.
+
+    Атрибуты:
+        max_entries (int): Максимум записей в памяти процесса.
+        backend (str | None): Псевдоним кэша Django из CACHES для общего хранения.
+        timeout (int): Время жизни записей общего кэша в секундах.
+        counters (dict): Счетчики 'hits', 'shared_hits', 'misses', 'evictions', 'invalidations'.
+    """
+
+    def __init__(self, max_entries=10000, backend=None, timeout=24 * 60 * 60):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.timeout = timeout
+        self.counters = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_fit(self, ticker, method, end_date, window_length, fit, data=None):
+        """
+        Возвращает коэффициенты модели окна, обучая ее только при промахе.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            method (str): Метод или тип модели, например 'recent_trend'.
+            end_date (date | datetime | int): Дата последнего бара окна.
+            window_length (int): Количество точек окна.
+            fit (callable): Функция без аргументов, возвращающая коэффициенты (массив или кортеж массивов).
+            data (numpy.ndarray | tuple, опционально): Данные окна, по которым обучается модель.
+                Их отпечаток входит в ключ, поэтому изменившееся окно не получит старые коэффициенты.
+
+        Возвращает:
+            object: Коэффициенты модели.
+
+        Пример:
+            >>> slope, intercept = get_model_registry().get_or_fit(
+            ...     'AAPL', 'recent_trend', dates[-1], 90, lambda: fit_trend(prices[-90:]), data=prices[-90:])
+        """
+        shared = self._shared()
+        generation = shared.get(_generation_key(ticker), 0) if shared is not None else 0
+        fingerprint = window_fingerprint(data) if data is not None else ''
+        key = (ticker, method, _date_key(end_date), int(window_length), fingerprint, generation)
+
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return value
+
+        value = shared.get(_entry_key(key)) if shared is not None else None
+        if value is not None:
+            counter = 'shared_hits'
+        else:
+            value = fit()
+            counter = 'misses'
+            if shared is not None:
+                shared.set(_entry_key(key), value, self.timeout)
+
+        with self._lock:
+            self.counters[counter] += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        return value
+
+    def invalidate(self, ticker):
+        """
+        Удаляет коэффициенты всех моделей тикера (вызывается при появлении новых баров).
+
+        Аргументы:
+            ticker (str): Тикер акции.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == ticker]:
+                del self._entries[key]
+            self.counters['invalidations'] += 1
+
+        shared = self._shared()
+        if shared is not None:
+            generation_key = _generation_key(ticker)
+            try:
+                shared.incr(generation_key)
+            except ValueError:
+                # Ключа поколения еще нет: add() не перезапишет его, если другой процесс успел раньше
+                if not shared.add(generation_key, 1, None):
+                    shared.incr(generation_key)
+
+    def clear(self):
+        """
+        Очищает записи в памяти процесса.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Возвращает копию счетчиков и текущий размер реестра.
+        """
+        with self._lock:
+            return {**self.counters, 'entries': len(self._entries)}
+
+    def _shared(self):
+        if not self.backend:
+            return None
+        from django.core.cache import caches
+        return caches[self.backend]
+
+
+def window_fingerprint(data):
+    """
+    Возвращает короткий отпечаток данных окна (BLAKE2b, 16 шестнадцатеричных символов).
+
+    Аргументы:
+        data (numpy.ndarray | tuple): Массив или кортеж массивов (например, признаки и цены).
+
+    Возвращает:
+        str: Отпечаток, меняющийся при изменении любого значения окна.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for array in data if isinstance(data, tuple) else (data,):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def _date_key(end_date):
+    # Timestamp и datetime приводим к дате, числа (секунды Unix) оставляем как есть
+    if hasattr(end_date, 'date') and callable(end_date.date):
+        end_date = end_date.date()
+    return str(end_date)
+
+
+def _generation_key(ticker):
+    return f'predictor:model-generation:{ticker}'
+
+
+def _entry_key(key):
+    return 'predictor:model:' + ':'.join(str(part) for part in key)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """
+    Возвращает общий для процесса реестр моделей, настроенный из settings.
+
+    Возвращает:
+        ModelRegistry: Реестр моделей.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from django.conf import settings
+            _registry = ModelRegistry(settings.MODEL_CACHE_SIZE, settings.MODEL_CACHE_BACKEND,
+                                      settings.MODEL_CACHE_TIMEOUT)
+        return _registry
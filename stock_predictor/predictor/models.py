@@ -1,9 +1,110 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 
-# Определение моделей базы данных для приложения
-# В данном проекте используется SQLite с данными из yfinance, поэтому модели Django не требуются
-# Пример модели:
-# class StockPrediction(models.Model):
-#     ticker = models.CharField(max_length=10)
-#     prediction_date = models.DateTimeField(auto_now_add=True)
-#     predicted_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+class StockPrediction(models.Model):
+    """
+    Сохраненный прогноз цены акции.
+
+    Записи создаются пакетно (bulk_create) фоновым PredictionRecorder, поэтому
+    сохранение не добавляет задержки к обработке запроса. Индексы рассчитаны
+    на выборки по тикеру и по диапазону времени с постраничной навигацией
+    по ключу (created_at, id) вместо OFFSET.
+
+    Атрибуты:
+        ticker (str): Тикер акции.
+        method (str): Метод прогнозирования.
+        created_at (datetime): Время расчета прогноза.
+        window_start (date): Дата первой цены в окне исходных данных.
+        window_end (date): Дата последней цены в окне исходных данных.
+        window_size (int): Количество цен в окне исходных данных.
+        horizon_days (int): Горизонт прогноза в днях.
+        current_price (float): Последняя известная цена на момент прогноза.
+        predicted_price (float): Прогнозируемая цена.
+        target_date (date): Дата, на которую сделан прогноз.
+        actual_price (float | None): Фактическая цена на дату прогноза (заполняется позже).
+        plot_key (str): Имя файла графика прогноза в кэше графиков.
+    """
+    ticker = models.CharField(max_length=15)
+    method = models.CharField(max_length=20)
+    created_at = models.DateTimeField(default=timezone.now)
+    window_start = models.DateField()
+    window_end = models.DateField()
+    window_size = models.PositiveIntegerField()
+    horizon_days = models.PositiveSmallIntegerField(default=30)
+    current_price = models.FloatField()
+    predicted_price = models.FloatField()
+    target_date = models.DateField()
+    actual_price = models.FloatField(null=True, blank=True)
+    plot_key = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # История по тикеру и по времени (ключ постраничной навигации)
+            models.Index(fields=['ticker', '-created_at', '-id'], name='prediction_ticker_time_idx'),
+            models.Index(fields=['-created_at', '-id'], name='prediction_time_idx'),
+            # Прогнозы, для которых еще не заполнена фактическая цена
+            models.Index(fields=['target_date'], name='prediction_pending_idx', condition=Q(actual_price__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f'{self.ticker} {self.method}: {self.predicted_price:.2f} на {self.target_date}'
+
+
+class PrecomputedForecast(models.Model):
+    """
+    Заранее рассчитанный прогноз тикера для метода (пересчитывается раз в торговый день).
+
+    Таблица заполняется командой precompute_forecasts после закрытия биржи.
+    predict_view отдает прогнозы из нее без загрузки истории и вычислений.
+    Для каждой пары (тикер, метод) хранится одна строка, которая заменяется
+    при следующем пересчете.
+
+    Атрибуты:
+        ticker (str): Тикер акции.
+        method (str): Метод прогнозирования.
+        computed_at (datetime): Время расчета.
+        window_start (date): Дата первой цены истории.
+        window_end (date): Дата последней цены истории.
+        window_size (int): Количество цен истории.
+        horizon_days (int): Горизонт прогноза в днях.
+        current_price (float): Последняя известная цена.
+        predicted_price (float): Прогнозируемая цена.
+        plot_url (str): URL заранее построенного графика (пусто, если график не строился).
+        grid (dict): Сетка прогнозов {метод: {горизонт: цена}} по всем методам и горизонтам.
+    """
+    ticker = models.CharField(max_length=15)
+    method = models.CharField(max_length=20)
+    computed_at = models.DateTimeField(default=timezone.now)
+    window_start = models.DateField()
+    window_end = models.DateField()
+    window_size = models.PositiveIntegerField()
+    horizon_days = models.PositiveSmallIntegerField(default=30)
+    current_price = models.FloatField()
+    predicted_price = models.FloatField()
+    plot_url = models.CharField(max_length=255, blank=True)
+    grid = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ticker', 'method'], name='precomputed_ticker_method_uniq'),
+        ]
+
+    def summary(self):
+        """
+        Возвращает сводку прогноза в формате forecast_summary() из views.py.
+        """
+        return {
+            'ticker': self.ticker,
+            'current_price': round(self.current_price, 2),
+            'future_price': round(self.predicted_price, 2),
+            'change_percent': round((self.predicted_price - self.current_price) / self.current_price * 100, 2),
+            'historical_data_points': self.window_size,
+            'first_date': self.window_start.strftime('%Y-%m-%d'),
+            'last_date': self.window_end.strftime('%Y-%m-%d'),
+        }
+
+    def __str__(self):
+        return f'{self.ticker} {self.method}: {self.predicted_price:.2f} ({self.computed_at:%Y-%m-%d %H:%M})'
@@ -0,0 +1,218 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from os import path, makedirs
+
+# Файлы графиков, которыми управляет кэш: адресуемые по содержимому ('AAPL_3f2a...png')
+# и устаревшие файлы с временной меткой ('AAPL_prediction_20250101_120000.png').
+# Прочие файлы директории (например, plot.png из README) не вытесняются.
+_MANAGED_NAME = re.compile(r'^.+_(?:[0-9a-f]{16}|prediction_\d{8}_\d{6})\.(?:png|webp|svg|json)$')
+
+# Временные файлы незавершенной записи старше этого срока (в секундах) считаются брошенными.
+# Столько же живут отметки о неудачном построении графика (см. PlotCache.mark_failed)
+_STALE_TEMP_AGE = 60 * 60
+
+# Суффикс файла-отметки о неудачном построении графика
+_FAILED_SUFFIX = '.failed'
+
+
+def plot_key(*parts):
+    """
+    Вычисляет ключ графика по данным, от которых зависит изображение.
+
+    Аргументы:
+        *parts: Значения ключа, например тикер, даты, метод, прогноз и версия стиля.
+            Числа с плавающей точкой округляются до 6 знаков.
+
+    Возвращает:
+        str: Первые 16 символов SHA-256 в шестнадцатеричном виде.
+
+    Пример:
+        >>> plot_key('AAPL', '2025-01-02', 'moving_average', 150.5, 'dark-v1')
+    """
+    normalized = [f'{part:.6f}' if isinstance(part, float) else str(part) for part in parts]
+    return hashlib.sha256('|'.join(normalized).encode('utf-8')).hexdigest()[:16]
+
+
+class PlotCache:
+    """
+    Адресуемый по содержимому кэш графиков в директории MEDIA_ROOT/plots.
+
+    Имя файла однозначно определяется ключом графика, поэтому повторный запрос
+    с теми же данными возвращает существующий файл без обращения к matplotlib.
+    Время изменения файла обновляется при каждом попадании и служит меткой
+    последнего использования для вытеснения LRU по размеру и возрасту.
+
+    Атрибуты:
+        directory (str): Директория с файлами графиков.
+        url_prefix (str): URL-префикс, по которому директория доступна клиенту.
+        max_bytes (int): Максимальный суммарный размер графиков в байтах.
+        max_age (float): Максимальное время без обращений к графику в секундах.
+        evict_every (int): Как часто (раз в сколько новых графиков) запускать вытеснение.
+    """
+
+    def __init__(self, directory, url_prefix, max_bytes, max_age, evict_every=50):
+        self.directory = str(directory)
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def filename(self, ticker, key, ext='png'):
+        """
+        Возвращает имя файла графика. Тикер очищается от символов, недопустимых в пути.
+        """
+        safe_ticker = re.sub(r'[^A-Za-z0-9.\-^=]', '_', ticker)
+        return f'{safe_ticker}_{key}.{ext}'
+
+    def url(self, filename):
+        return f'{self.url_prefix}{filename}'
+
+    def full_path(self, filename):
+        return path.join(self.directory, filename)
+
+    def lookup(self, filename):
+        """
+        Ищет готовый график и отмечает его как недавно использованный.
+
+        Аргументы:
+            filename (str): Имя файла графика.
+
+        Возвращает:
+            str | None: URL графика или None, если его нужно построить.
+        """
+        try:
+            os.utime(self.full_path(filename))
+        except FileNotFoundError:
+            return None
+        return self.url(filename)
+
+    def mark_failed(self, filename):
+        """
+        Отмечает, что построить график не удалось.
+
+        Отметка - пустой файл в директории кэша, поэтому ее видят все воркеры,
+        а не только процесс, ставивший график в очередь.
+        """
+        makedirs(self.directory, exist_ok=True)
+        with open(self._failed_path(filename), 'wb'):
+            pass
+
+    def failed(self, filename):
+        """
+        Проверяет, отмечен ли график как не построенный (mark_failed).
+        """
+        return path.exists(self._failed_path(filename))
+
+    def clear_failed(self, filename):
+        """
+        Снимает отметку о неудачном построении перед повторной попыткой.
+        """
+        _remove(self._failed_path(filename))
+
+    def _failed_path(self, filename):
+        return self.full_path(f'.{filename}{_FAILED_SUFFIX}')
+
+    def temp_path(self, filename):
+        """
+        Возвращает уникальный путь временного файла для записи графика.
+        """
+        makedirs(self.directory, exist_ok=True)
+        return self.full_path(f'.{filename}.tmp-{os.getpid()}-{threading.get_ident()}')
+
+    def commit(self, temp_path, filename):
+        """
+        Атомарно публикует построенный график и при необходимости запускает вытеснение.
+
+        Аргументы:
+            temp_path (str): Путь временного файла, полученный из temp_path().
+            filename (str): Итоговое имя файла графика.
+
+        Возвращает:
+            str: URL опубликованного графика.
+        """
+        os.replace(temp_path, self.full_path(filename))
+        with self._lock:
+            self._writes += 1
+            run_eviction = self._writes % self.evict_every == 0
+        if run_eviction:
+            self.evict()
+        return self.url(filename)
+
+    def evict(self):
+        """
+        Удаляет графики, к которым давно не обращались, и самые старые графики сверх лимита размера.
+
+        Возвращает:
+            int: Количество удаленных файлов.
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+
+        for name in names:
+            file_path = self.full_path(name)
+            # Временные файлы и отметки о неудачном построении удаляются только по возрасту
+            is_temp = name.startswith('.') and ('.tmp-' in name or name.endswith(_FAILED_SUFFIX))
+            if not is_temp and not _MANAGED_NAME.match(name):
+                continue
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            age = now - stat.st_mtime
+            if (is_temp and age > _STALE_TEMP_AGE) or (not is_temp and age > self.max_age):
+                removed += _remove(file_path)
+            elif not is_temp:
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+
+        # Вытеснение LRU: удаляем давно не использованные графики, пока не уложимся в лимит
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            removed += _remove(file_path)
+            total -= size
+        return removed
+
+
+def _remove(file_path):
+    # Файл мог удалить параллельно другой воркер
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        return 0
+    return 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_plot_cache():
+    """
+    Возвращает общий для процесса кэш графиков, настроенный из settings.
+
+    Создается один раз под блокировкой: иначе потоки первых одновременных
+    запросов получили бы разные экземпляры с раздельным учетом размера кэша.
+
+    Возвращает:
+        PlotCache: Кэш графиков.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from django.conf import settings
+                _cache = PlotCache(
+                    path.join(settings.MEDIA_ROOT, 'plots'), f'{settings.MEDIA_URL}plots/',
+                    max_bytes=settings.PLOT_CACHE_MAX_BYTES, max_age=settings.PLOT_CACHE_MAX_AGE)
+    return _cache
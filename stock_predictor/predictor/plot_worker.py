@@ -0,0 +1,179 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+
+def _init_worker(settings_module):
+    # Процесс пула запускается заново (spawn) - поднимаем Django перед первым построением
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _render_in_worker(ticker, historical_prices, historical_dates, future_price, method_used):
+    # Выполняется в процессе пула: строит график и возвращает время построения в секундах
+    from .services import create_prediction_plot
+    started = time.perf_counter()
+    create_prediction_plot(ticker, historical_prices, historical_dates, future_price, method_used)
+    return time.perf_counter() - started
+
+
+class PlotWorkerPool:
+    """
+    Пул процессов для построения графиков вне обработки запроса.
+
+    Matplotlib нагружает процессор и удерживает GIL, поэтому графики строятся
+    в отдельных процессах. Очередь ограничена: если в работе и в очереди уже
+    max_queue графиков, новая задача отклоняется (обратное давление), и страница
+    результата показывается без графика.
+
+    Клиент узнает имя файла графика сразу (оно адресуется по содержимому)
+    и опрашивает plot_status, пока файл не появится или построение не завершится
+    ошибкой (failed()).
+
+    Атрибуты:
+        max_workers (int): Количество процессов пула.
+        max_queue (int): Максимум графиков в очереди и в работе одновременно.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'deduplicated': 0}
+        self._render_seconds_total = 0.0
+        self._render_seconds_max = 0.0
+        self._wait_seconds_total = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(settings.PLOT_WORKER_START_METHOD),
+                initializer=_init_worker,
+                initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'stock_predictor.settings'),))
+        return self._executor
+
+    def submit(self, ticker, historical_prices, historical_dates, future_price, method_used):
+        """
+        Ставит построение графика в очередь и сразу возвращает его будущий адрес.
+
+        Аргументы совпадают с create_prediction_plot().
+
+        Возвращает:
+            dict | None: {'name': имя файла, 'url': URL графика, 'ready': построен ли уже график}
+            или None, если очередь заполнена и задача отклонена.
+        """
+        from .plot_cache import get_plot_cache
+        from .services import prediction_plot_filename
+
+        cache = get_plot_cache()
+        name = prediction_plot_filename(ticker, historical_prices, historical_dates, future_price, method_used)
+        ticket = {'name': name, 'url': cache.url(name), 'ready': cache.lookup(name) is not None}
+        if ticket['ready']:
+            return ticket
+
+        with self._lock:
+            if name in self._pending:
+                self._counters['deduplicated'] += 1
+                return ticket
+            if len(self._pending) >= self.max_queue:
+                self._counters['rejected'] += 1
+                return None
+            self._pending.add(name)
+            self._counters['submitted'] += 1
+            # Прошлая неудача не должна остановить опрос новой попытки
+            cache.clear_failed(name)
+
+            try:
+                future = self._get_executor().submit(
+                    _render_in_worker, ticker, historical_prices, historical_dates, future_price, method_used)
+            except BrokenProcessPool:
+                # Процесс пула аварийно завершился - пересоздаем пул при следующей задаче
+                self._executor = None
+                self._pending.discard(name)
+                self._counters['failed'] += 1
+                return None
+
+        submitted_at = time.perf_counter()
+        future.add_done_callback(lambda f: self._on_done(name, submitted_at, f))
+        return ticket
+
+    def failed(self, name):
+        """
+        Сообщает, что построение графика name завершилось ошибкой и ждать его бессмысленно.
+
+        Отметка хранится в кэше графиков, поэтому ответ одинаков в любом воркере.
+        """
+        from .plot_cache import get_plot_cache
+        return get_plot_cache().failed(name)
+
+    def _on_done(self, name, submitted_at, future):
+        from .plot_cache import get_plot_cache
+
+        total = time.perf_counter() - submitted_at
+        with self._lock:
+            self._pending.discard(name)
+            if future.cancelled() or future.exception() is not None:
+                self._counters['failed'] += 1
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self._executor = None
+                get_plot_cache().mark_failed(name)
+                return
+            render_seconds = future.result()
+            self._counters['completed'] += 1
+            self._render_seconds_total += render_seconds
+            self._render_seconds_max = max(self._render_seconds_max, render_seconds)
+            self._wait_seconds_total += max(total - render_seconds, 0.0)
+
+    def stats(self):
+        """
+        Возвращает метрики пула.
+
+        Возвращает:
+            dict: Счетчики задач, текущая глубина очереди ('queue_depth'),
+            среднее и максимальное время построения и среднее ожидание в очереди (секунды).
+        """
+        with self._lock:
+            completed = self._counters['completed']
+            return {
+                **self._counters,
+                'queue_depth': len(self._pending),
+                'queue_capacity': self.max_queue,
+                'render_seconds_avg': self._render_seconds_total / completed if completed else 0.0,
+                'render_seconds_max': self._render_seconds_max,
+                'wait_seconds_avg': self._wait_seconds_total / completed if completed else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_plot_pool():
+    """
+    Возвращает пул построения графиков текущего процесса (создается при первом обращении).
+
+    Возвращает:
+        PlotWorkerPool: Пул, настроенный параметрами PLOT_WORKERS и PLOT_QUEUE_SIZE.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PlotWorkerPool(settings.PLOT_WORKERS, settings.PLOT_QUEUE_SIZE)
+            atexit.register(_pool.shutdown, wait=False)
+        return _pool
@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .forecasting import FORECAST_METHODS, GRID_HORIZONS, HORIZON_DAYS, batch_forecast_grid, stack_prices
+from .models import PrecomputedForecast, StockPrediction
+
+# Поля, которые обновляются при повторном расчете прогноза (тикер, метод)
+_UPDATE_FIELDS = ['computed_at', 'window_start', 'window_end', 'window_size', 'horizon_days',
+                  'current_price', 'predicted_price', 'plot_url', 'grid']
+
+
+def precompute_chunk(tickers, methods, years=1, with_plots=True):
+    """
+    Рассчитывает прогнозы и графики для части тикеров.
+
+    Сетка прогнозов (все методы x горизонты) для всех тикеров считается одним
+    вызовом batch_forecast_grid() по матрице цен части; прогноз на HORIZON_DAYS
+    берется из той же сетки. Выполняется в процессе пула команды precompute_forecasts и не пишет
+    в базу Django: строки возвращаются родительскому процессу, который
+    сохраняет их одним пакетом (SQLite допускает только одного писателя).
+
+    Аргументы:
+        tickers (list): Тикеры акций.
+        methods (iterable): Методы прогнозирования.
+        years (int, опционально): Количество лет истории. По умолчанию 1.
+        with_plots (bool, опционально): Строить графики прогнозов. По умолчанию True.
+
+    Возвращает:
+        tuple: Кортеж (rows, errors) - список словарей с полями PrecomputedForecast
+        и словарь {тикер: текст ошибки}.
+    """
+    from .services import create_prediction_plot, get_stock_data
+
+    histories, errors = {}, {}
+    for ticker in tickers:
+        try:
+            prices, dates = get_stock_data(ticker, years=years)
+        except Exception as e:
+            errors[ticker] = str(e)
+            continue
+        if not len(prices):
+            errors[ticker] = 'нет данных'
+            continue
+        histories[ticker] = (prices, dates)
+    if not histories:
+        return [], errors
+
+    # Сетка всех тикеров части считается одним проходом NumPy по матрице цен
+    horizons = sorted({*GRID_HORIZONS, HORIZON_DAYS})
+    batch_grid = batch_forecast_grid(stack_prices(prices for prices, _ in histories.values()),
+                                     FORECAST_METHODS, horizons)
+
+    rows = []
+    for row_index, (ticker, (prices, dates)) in enumerate(histories.items()):
+        try:
+            # Сетка по всем методам и горизонтам общая для строк тикера (ключи JSON - строки)
+            grid = {method: {str(horizon): float(forecasts[row_index]) for horizon, forecasts in by_horizon.items()}
+                    for method, by_horizon in batch_grid.items()}
+            for method in methods:
+                future_price = grid[method][str(HORIZON_DAYS)]
+                plot_url = (create_prediction_plot(ticker, prices, dates, future_price, method)
+                            if with_plots else '')
+                rows.append({
+                    'ticker': ticker, 'method': method, 'computed_at': timezone.now(),
+                    'window_start': dates[0].date(), 'window_end': dates[-1].date(), 'window_size': len(prices),
+                    'horizon_days': HORIZON_DAYS, 'current_price': float(prices[-1][0]),
+                    'predicted_price': future_price, 'plot_url': plot_url, 'grid': grid,
+                })
+        except Exception as e:
+            errors[ticker] = str(e)
+    return rows, errors
+
+
+def save_precomputed(rows, record_history=True):
+    """
+    Сохраняет рассчитанные прогнозы одним пакетом, заменяя строки прошлого расчета.
+
+    Аргументы:
+        rows (list): Строки из precompute_chunk().
+        record_history (bool, опционально): Добавить прогнозы в историю (StockPrediction).
+
+    Возвращает:
+        int: Количество сохраненных прогнозов.
+    """
+    forecasts = [PrecomputedForecast(**row) for row in rows]
+    PrecomputedForecast.objects.bulk_create(
+        forecasts, batch_size=500, update_conflicts=True,
+        unique_fields=['ticker', 'method'], update_fields=_UPDATE_FIELDS)
+
+    if record_history:
+        StockPrediction.objects.bulk_create([
+            StockPrediction(
+                ticker=row['ticker'], method=row['method'], created_at=row['computed_at'],
+                window_start=row['window_start'], window_end=row['window_end'], window_size=row['window_size'],
+                horizon_days=row['horizon_days'], current_price=row['current_price'],
+                predicted_price=row['predicted_price'],
+                target_date=row['window_end'] + timedelta(days=row['horizon_days']),
+                plot_key=row['plot_url'].rsplit('/', 1)[-1])
+            for row in rows], batch_size=500)
+    return len(forecasts)
+
+
+_tickers_source = None
+_tickers = frozenset()
+
+
+def precomputed_tickers():
+    """
+    Возвращает множество тикеров из настройки PRECOMPUTE_TICKERS.
+
+    Множество строится один раз и пересобирается только при замене настройки.
+    """
+    global _tickers_source, _tickers
+    source = getattr(settings, 'PRECOMPUTE_TICKERS', ())
+    if source is not _tickers_source:
+        _tickers = frozenset(ticker.upper() for ticker in source)
+        _tickers_source = source
+    return _tickers
+
+
+def get_precomputed_forecast(ticker, method='moving_average'):
+    """
+    Возвращает заранее рассчитанный прогноз, если он свежий и его график на месте.
+
+    База не запрашивается для тикеров вне PRECOMPUTE_TICKERS. Прогноз старше
+    PRECOMPUTE_MAX_AGE секунд (например, если ночной расчет не выполнился)
+    или с удаленным из кэша графиком не отдается - вызывающий код считает
+    прогноз заново.
+
+    Аргументы:
+        ticker (str): Тикер акции.
+        method (str, опционально): Метод прогнозирования.
+
+    Возвращает:
+        PrecomputedForecast | None: Прогноз или None.
+    """
+    if ticker not in precomputed_tickers():
+        return None
+
+    cutoff = timezone.now() - timedelta(seconds=settings.PRECOMPUTE_MAX_AGE)
+    forecast = PrecomputedForecast.objects.filter(ticker=ticker, method=method, computed_at__gte=cutoff).first()
+    if forecast is None:
+        return None
+    if forecast.plot_url:
+        from .plot_cache import get_plot_cache
+        if get_plot_cache().lookup(forecast.plot_url.rsplit('/', 1)[-1]) is None:
+            return None
+    return forecast
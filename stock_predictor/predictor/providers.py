@@ -0,0 +1,498 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .storage import OHLCV_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """
+    Ошибка провайдера рыночных данных, после которой повторять запрос бессмысленно.
+    """
+
+
+class TransientProviderError(ProviderError):
+    """
+    Временная ошибка провайдера (ограничение частоты, 5xx, обрыв соединения) - запрос можно повторить.
+
+    Атрибуты:
+        retry_after (float | None): Рекомендованная сервером пауза перед повтором в секундах.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# Ошибки, после которых запрос повторяется (ошибки requests и сокетов наследуют OSError)
+RETRYABLE_ERRORS = (TransientProviderError, OSError, TimeoutError)
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов по алгоритму "корзина токенов" (token bucket).
+
+    Корзина пополняется на rate токенов в секунду и вмещает не более burst токенов,
+    поэтому короткие всплески до burst запросов проходят сразу, а средняя частота
+    не превышает rate. Безопасен для использования из нескольких потоков.
+
+    Часы и функцию ожидания можно подменить (clock, sleep), чтобы проверять
+    ограничитель в тестах без реальных пауз.
+
+    Атрибуты:
+        rate (float): Запросов в секунду.
+        burst (int): Емкость корзины.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst or rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Забирает один токен, при необходимости ожидая его появления.
+
+        Возвращает:
+            float: Время ожидания в секундах.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0, retry_after=None):
+    """
+    Пауза перед повтором: экспоненциальная задержка со случайным разбросом (full jitter).
+
+    Случайный разброс не дает многим потокам и воркерам повторять запросы синхронно
+    и снова упираться в ограничение частоты.
+
+    Аргументы:
+        attempt (int): Номер неудачной попытки, начиная с 0.
+        base (float, опционально): Базовая задержка в секундах.
+        cap (float, опционально): Максимальная задержка в секундах.
+        retry_after (float, опционально): Минимальная пауза, запрошенная сервером.
+
+    Возвращает:
+        float: Пауза в секундах.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def empty_frame():
+    """
+    Возвращает пустой DataFrame баров OHLCV (тикер без данных).
+    """
+    import pandas as pd
+    return pd.DataFrame(columns=list(OHLCV_COLUMNS), index=pd.DatetimeIndex([]))
+
+
+def slice_frame(frame, period=None, start=None):
+    """
+    Оставляет бары периода period или начиная с даты start (семантика yfinance).
+
+    Аргументы:
+        frame (pandas.DataFrame): Бары OHLCV.
+        period (str, опционально): Период вида '5y'.
+        start (datetime.date, опционально): Дата первого бара. Если указана, period игнорируется.
+
+    Возвращает:
+        pandas.DataFrame: Копия нужной части баров.
+    """
+    import pandas as pd
+    if frame is None or frame.empty:
+        return empty_frame()
+    if start is not None:
+        frame = frame[frame.index.date >= start]
+    elif period and period.endswith('y'):
+        cutoff = frame.index[-1] - pd.DateOffset(years=int(period[:-1]))
+        frame = frame[frame.index >= cutoff]
+    return frame.copy()
+
+
+class BaseProvider:
+    """
+    Базовый класс провайдера рыночных данных.
+
+    Наследник реализует _fetch(ticker, period, start), а базовый класс добавляет
+    ограничение частоты, повтор временных ошибок с разбросом задержки и пакетную
+    загрузку fetch_many() с ограниченным числом одновременных запросов. Часы и
+    функция ожидания (clock, sleep) передаются также в ограничитель частоты; в тестах
+    их подменяют, чтобы проверять повторы без реальных пауз.
+
+    Атрибуты:
+        max_workers (int): Максимум одновременных запросов в fetch_many().
+        retries (int): Количество повторов после временной ошибки.
+        backoff (float): Базовая задержка повтора в секундах.
+        max_backoff (float): Максимальная задержка повтора в секундах.
+        limiter (RateLimiter | None): Ограничитель частоты запросов.
+        counters (dict): Счетчики 'requests', 'retries', 'failures', 'throttled_seconds'.
+    """
+
+    def __init__(self, max_workers=8, rate=None, burst=None, retries=3, backoff=0.5, max_backoff=30.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.max_workers = max(1, int(max_workers))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self.limiter = RateLimiter(rate, burst, clock=clock, sleep=sleep) if rate else None
+        self.counters = {'requests': 0, 'retries': 0, 'failures': 0, 'throttled_seconds': 0.0}
+        self._counters_lock = threading.Lock()
+
+    def history(self, ticker, period=None, start=None):
+        """
+        Загружает историю цен по тикеру.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            period (str, опционально): Период в формате yfinance (например, '1y').
+            start (datetime.date, опционально): Дата, начиная с которой нужны бары.
+                Если указана, period игнорируется.
+
+        Возвращает:
+            pandas.DataFrame: Дневные бары OHLCV с колонками 'Open', 'High', 'Low',
+            'Close', 'Volume' и индексом pandas.DatetimeIndex.
+        """
+        return self._with_retry(self._fetch, ticker, period, start)
+
+    def fetch_many(self, tickers, period=None, start=None):
+        """
+        Загружает историю нескольких тикеров, выполняя не более max_workers запросов одновременно.
+
+        Аргументы:
+            tickers (iterable): Тикеры акций.
+            period (str, опционально): Период в формате yfinance.
+            start (datetime.date | dict, опционально): Дата первого бара или словарь
+                {тикер: дата} для дозагрузки с разных дат.
+
+        Возвращает:
+            tuple: Кортеж (frames, errors) - словари {тикер: DataFrame} и {тикер: исключение}.
+
+        Пример:
+            >>> frames, errors = get_provider().fetch_many(['AAPL', 'MSFT'], period='5y')
+        """
+        tickers = list(dict.fromkeys(tickers))
+        frames, errors = {}, {}
+        if not tickers:
+            return frames, errors
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tickers))) as executor:
+            futures = {executor.submit(self.history, ticker, period, _start_for(start, ticker)): ticker
+                       for ticker in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    frames[ticker] = future.result()
+                except Exception as e:
+                    errors[ticker] = e
+        return frames, errors
+
+    def stats(self):
+        """
+        Возвращает копию счетчиков запросов.
+        """
+        with self._counters_lock:
+            return dict(self.counters)
+
+    def _fetch(self, ticker, period, start):
+        raise NotImplementedError
+
+    def _count(self, name, value=1):
+        with self._counters_lock:
+            self.counters[name] += value
+
+    def _with_retry(self, fn, *args):
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                waited = self.limiter.acquire()
+                if waited:
+                    self._count('throttled_seconds', waited)
+            self._count('requests')
+            try:
+                return fn(*args)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.retries:
+                    self._count('failures')
+                    raise
+                delay = backoff_delay(attempt, self.backoff, self.max_backoff, getattr(e, 'retry_after', None))
+                logger.info('Повтор запроса %s через %.2f с: %s', args[0], delay, e)
+                self._count('retries')
+                attempt += 1
+                self._sleep(delay)
+            except Exception:
+                self._count('failures')
+                raise
+
+
+def _start_for(start, ticker):
+    return start.get(ticker) if isinstance(start, dict) else start
+
+
+class YFinanceProvider(BaseProvider):
+    """
+    Провайдер рыночных данных на основе библиотеки yfinance.
+
+    Каждый поток использует одну HTTP-сессию (curl_cffi, если установлен), поэтому
+    соединения с Yahoo переиспользуются между запросами, а не открываются заново.
+    fetch_many() загружает тикеры пачками одним вызовом yf.download().
+
+    Атрибуты:
+        chunk_size (int): Количество тикеров в одном вызове yf.download().
+    """
+
+    def __init__(self, chunk_size=100, **options):
+        super().__init__(**options)
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            try:
+                from curl_cffi import requests as curl_requests
+            except ImportError:  # Старые версии yfinance работают с собственной сессией
+                return None
+            session = self._local.session = curl_requests.Session(impersonate='chrome')
+        return session
+
+    def _fetch(self, ticker, period, start):
+        import yfinance as yf
+        stock_info = yf.Ticker(ticker, session=self._session())
+        try:
+            if start is not None:
+                return stock_info.history(start=start)
+            return stock_info.history(period=period)
+        except Exception as e:
+            raise _translate_yfinance_error(e)
+
+    def fetch_many(self, tickers, period=None, start=None):
+        # Разные даты начала не укладываются в один вызов yf.download - грузим по тикерам
+        if isinstance(start, dict):
+            return super().fetch_many(tickers, period, start)
+
+        tickers = list(dict.fromkeys(tickers))
+        frames, errors = {}, {}
+        for offset in range(0, len(tickers), self.chunk_size):
+            chunk = tickers[offset:offset + self.chunk_size]
+            try:
+                data = self._with_retry(self._download, chunk, period, start)
+            except Exception as e:
+                errors.update(dict.fromkeys(chunk, e))
+                continue
+            for ticker in chunk:
+                frames[ticker] = _ticker_columns(data, ticker)
+        return frames, errors
+
+    def _download(self, tickers, period, start):
+        import yfinance as yf
+        try:
+            return yf.download(tickers, period=None if start is not None else period, start=start,
+                               group_by='ticker', auto_adjust=True, ignore_tz=False, progress=False,
+                               threads=min(self.max_workers, len(tickers)), session=self._session())
+        except Exception as e:
+            raise _translate_yfinance_error(e)
+
+
+def _translate_yfinance_error(error):
+    # Ограничение частоты Yahoo (YFRateLimitError) - временная ошибка, остальные пробрасываем как есть
+    if type(error).__name__ == 'YFRateLimitError':
+        return TransientProviderError(str(error))
+    return error
+
+
+def _ticker_columns(data, ticker):
+    import pandas as pd
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(0):
+            return empty_frame()
+        data = data[ticker]
+    return data[[column for column in OHLCV_COLUMNS if column in data.columns]].dropna(how='all')
+
+
+class InMemoryProvider(BaseProvider):
+    """
+    Фейковый провайдер, отдающий заранее подготовленные данные без сети.
+
+    Используется для офлайн-тестов и нагрузочных прогонов.
+
+    Атрибуты:
+        frames (dict): Словарь {тикер: pandas.DataFrame с барами OHLCV}.
+        calls (list): Журнал вызовов history() в виде кортежей (ticker, period, start).
+    """
+
+    def __init__(self, frames, **options):
+        super().__init__(**options)
+        self.frames = {ticker.upper(): frame for ticker, frame in frames.items()}
+        self.calls = []
+
+    def _fetch(self, ticker, period, start):
+        # Журнал вызовов пополняется из потоков fetch_many() и потоков запросов
+        with self._counters_lock:
+            self.calls.append((ticker, period, start))
+        return slice_frame(self.frames.get(ticker.upper()), period, start)
+
+
+class FileProvider(BaseProvider):
+    """
+    Офлайн-провайдер, читающий историю из файлов <ТИКЕР>.parquet или <ТИКЕР>.csv.
+
+    CSV должен содержать колонку дат (первая колонка) и колонки 'Open', 'High',
+    'Low', 'Close', 'Volume' - например, результат DataFrame.to_csv() для данных
+    yfinance. Прочитанные файлы кешируются до изменения времени модификации.
+
+    Атрибуты:
+        directory (str): Директория с файлами.
+    """
+
+    def __init__(self, directory=None, **options):
+        super().__init__(**options)
+        self.directory = str(directory or getattr(settings, 'PRICE_FILES_DIR', '.'))
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def _fetch(self, ticker, period, start):
+        return slice_frame(self._load(ticker.upper()), period, start)
+
+    def _load(self, ticker):
+        import pandas as pd
+        for extension in ('parquet', 'csv'):
+            file_path = path.join(self.directory, f'{ticker}.{extension}')
+            try:
+                mtime = path.getmtime(file_path)
+            except OSError:
+                continue
+            with self._cache_lock:
+                cached = self._cache.get(file_path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            if extension == 'parquet':
+                frame = pd.read_parquet(file_path)
+            else:
+                frame = pd.read_csv(file_path, index_col=0)
+                # Смешанные смещения (летнее/зимнее время) читаем через UTC и возвращаем исходный пояс
+                index = pd.to_datetime(frame.index, utc=True)
+                tz = pd.Timestamp(frame.index[0]).tz if len(frame) else None
+                frame.index = index.tz_convert(tz) if tz is not None else index.tz_localize(None)
+            frame = frame.sort_index()
+            with self._cache_lock:
+                self._cache[file_path] = (mtime, frame)
+            return frame
+        return None
+
+
+class HTTPJSONProvider(BaseProvider):
+    """
+    Провайдер, загружающий историю по HTTP в формате JSON (см. predictor.fake_market).
+
+    Все потоки используют одну сессию requests с пулом соединений размером
+    max_workers, поэтому соединения keep-alive переиспользуются между запросами.
+    Ответы 429 и 5xx считаются временными ошибками (с учетом заголовка Retry-After),
+    404 - тикером без данных.
+
+    Формат ответа GET <base_url>/history/<тикер>?period=1y или ?start=2025-01-02:
+        {"tz": "America/New_York", "timestamps": [...], "open": [...], "high": [...],
+         "low": [...], "close": [...], "volume": [...]}
+
+    Атрибуты:
+        base_url (str): Адрес сервера, например 'http://127.0.0.1:8765'.
+        timeout (float): Таймаут запроса в секундах.
+    """
+
+    def __init__(self, base_url=None, timeout=10.0, **options):
+        super().__init__(**options)
+        self.base_url = (base_url or getattr(settings, 'PRICE_HTTP_URL', 'http://127.0.0.1:8765')).rstrip('/')
+        self.timeout = timeout
+        self._http = None
+        self._http_lock = threading.Lock()
+
+    def _session(self):
+        with self._http_lock:
+            if self._http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._http = session
+            return self._http
+
+    def _fetch(self, ticker, period, start):
+        import pandas as pd
+        params = {'start': start.isoformat()} if start is not None else {'period': period or '1y'}
+        response = self._session().get(f'{self.base_url}/history/{ticker}', params=params, timeout=self.timeout)
+
+        if response.status_code == 404:
+            return empty_frame()
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get('Retry-After')
+            raise TransientProviderError(f'HTTP {response.status_code} для {ticker}',
+                                         retry_after=float(retry_after) if retry_after else None)
+        if response.status_code != 200:
+            raise ProviderError(f'HTTP {response.status_code} для {ticker}')
+
+        payload = response.json()
+        index = pd.to_datetime(payload['timestamps'], unit='s', utc=True)
+        if payload.get('tz'):
+            index = index.tz_convert(payload['tz'])
+        return pd.DataFrame({column: payload[column.lower()] for column in OHLCV_COLUMNS}, index=index)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """
+    Возвращает текущий провайдер рыночных данных.
+
+    Класс провайдера берется из настройки PRICE_PROVIDER, параметры конструктора -
+    из PRICE_PROVIDER_OPTIONS. Провайдер создается один раз на процесс.
+
+    Возвращает:
+        BaseProvider: Объект с методами history(ticker, period=None, start=None) и fetch_many().
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            provider_path = getattr(settings, 'PRICE_PROVIDER', 'predictor.providers.YFinanceProvider')
+            options = getattr(settings, 'PRICE_PROVIDER_OPTIONS', {})
+            _provider = import_string(provider_path)(**options)
+        return _provider
+
+
+def set_provider(provider):
+    """
+    Подменяет провайдер рыночных данных (например, фейковым в тестах).
+
+    Аргументы:
+        provider (object | None): Новый провайдер. None сбрасывает его к значению из настроек.
+    """
+    global _provider
+    _provider = provider
@@ -0,0 +1,242 @@
+import threading
+from io import BytesIO
+
+import numpy as np
+from matplotlib import dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+# Цвета оформления графика
+BACKGROUND_COLOR = '#121212'
+HISTORY_COLOR = '#2962FF'
+CURRENT_COLOR = '#00E676'
+FORECAST_COLOR = '#FF6D00'
+NEGATIVE_COLOR = '#FF5252'
+SPINE_COLOR = '#757575'
+LABEL_COLOR = '#BDBDBD'
+PANEL_COLOR = '#424242'
+
+# Горизонт прогноза на графике в днях
+FORECAST_DAYS = 30
+
+# Поддерживаемые форматы вывода
+PLOT_FORMATS = ('png', 'webp', 'svg')
+
+
+def info_panel_text(last_price, future_price, n_points, first_date, last_date, method_used):
+    """
+    Формирует текст информационной панели графика.
+
+    Аргументы:
+        last_price (float): Текущая цена.
+        future_price (float): Прогнозируемая цена.
+        n_points (int): Количество исторических точек.
+        first_date (datetime): Дата первой точки.
+        last_date (datetime): Дата последней точки.
+        method_used (str): Метод прогнозирования.
+
+    Возвращает:
+        str: Многострочный текст панели (заголовки разделов рисуются отдельно).
+    """
+    return f'''
+
+    ┣ Текущая: ${last_price:.2f}
+    ┣ Прогноз: ${future_price:.2f}
+    ┗ Изменение: 
+
+
+    ┣ Период: {n_points} дней
+    ┣ Начало: {first_date.strftime("%d.%m.%Y")}
+    ┗ Конец: {last_date.strftime("%d.%m.%Y")}
+
+
+    ┗ {method_used}
+
+
+    ┣   - Исторические данные
+    ┣   - Текущая цена
+    ┗   - Прогноз на {FORECAST_DAYS} дней'''
+
+
+def _dates_to_num(dates):
+    # Даты с часовым поясом рисуем в местном времени биржи, как их показывает pandas
+    if getattr(dates, 'tz', None) is not None:
+        dates = dates.tz_localize(None)
+    return mdates.date2num(np.asarray(dates, dtype='datetime64[ns]'))
+
+
+class PlotRenderer:
+    """
+    Быстрый построитель графиков прогноза без глобального состояния pyplot.
+
+    Фигура, оси, информационная панель и статический текст создаются один раз
+    в конструкторе. При каждом построении обновляются только данные линий,
+    заливки и точек, подписи и пределы осей, после чего фигура рисуется
+    бэкендом Agg напрямую (без tight_layout и bbox_inches='tight').
+
+    Экземпляр защищен блокировкой; для параллельного построения в нескольких
+    потоках используйте get_renderer(), который выдает отдельный экземпляр на поток.
+
+    Атрибуты:
+        figure (matplotlib.figure.Figure): Переиспользуемая фигура.
+        dpi (int): Разрешение по умолчанию.
+        fmt (str): Формат вывода по умолчанию ('png', 'webp' или 'svg').
+    """
+
+    def __init__(self, dpi=100, fmt='png'):
+        self.dpi = dpi
+        self.fmt = fmt
+        self._lock = threading.Lock()
+        self._fill = None
+
+        self.figure = Figure(figsize=(16, 8), facecolor=BACKGROUND_COLOR)
+        FigureCanvasAgg(self.figure)
+        gs = self.figure.add_gridspec(1, 2, width_ratios=[3, 1], wspace=0.05,
+                                      left=0.07, right=0.99, top=0.9, bottom=0.16)
+        self._build_main_axes(self.figure.add_subplot(gs[0]))
+        self._build_info_axes(self.figure.add_subplot(gs[1]))
+
+    def _build_main_axes(self, ax):
+        self.ax = ax
+        ax.set_facecolor(BACKGROUND_COLOR)
+
+        # Линия истории, текущая и прогнозная точки, линия прогноза (данные задаются в render)
+        self._history_line, = ax.plot([], [], color=HISTORY_COLOR, linewidth=2)
+        self._current_point = ax.scatter([0], [0], color=CURRENT_COLOR, s=120, edgecolors='white',
+                                         linewidth=2, zorder=5)
+        self._forecast_point = ax.scatter([0], [0], color=FORECAST_COLOR, s=120, edgecolors='white',
+                                          linewidth=2, zorder=5)
+        self._forecast_line, = ax.plot([], [], color=FORECAST_COLOR, linestyle='--', linewidth=2, alpha=0.8)
+
+        # Оси, сетка и форматирование
+        ax.grid(True, alpha=0.3, linestyle='--', color='white')
+        ax.set_axisbelow(True)
+        for spine in ax.spines.values():
+            spine.set_color(SPINE_COLOR)
+        ax.tick_params(colors='white')
+        ax.tick_params(axis='x', labelrotation=45)
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda x, p: f'${x:,.2f}'))
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+
+        self._title = ax.set_title('', fontsize=16, fontweight='bold', pad=20, color='white')
+        ax.set_xlabel('Дата', fontsize=12, color=LABEL_COLOR, labelpad=10)
+        ax.set_ylabel('Цена ($)', fontsize=12, color=LABEL_COLOR, labelpad=10)
+
+    def _build_info_axes(self, ax_info):
+        ax_info.axis('off')
+        font = dict(transform=ax_info.transAxes, fontfamily='monospace', color='white', fontsize=10)
+
+        # Изменяемые тексты панели
+        self._info_text = ax_info.text(
+            0.02, 0.95, '', verticalalignment='top', linespacing=1.4,
+            bbox=dict(boxstyle='round', facecolor=PANEL_COLOR, alpha=0.9, edgecolor=SPINE_COLOR, pad=1), **font)
+        self._info_header = ax_info.text(0.02, 0.935, '', fontweight='bold', **font)
+        self._change_text = ax_info.text(0.46, 0.8, '', fontweight='bold', **{**font, 'color': CURRENT_COLOR})
+
+        # Статические заголовки разделов и условные обозначения
+        for y, title in ((0.90, 'ЦЕНА:'), (0.74, 'ДАННЫЕ:'), (0.58, 'МЕТОД:'), (0.48, 'ЛЕГЕНДА:')):
+            ax_info.text(0.04, y, title, fontweight='bold', **font)
+        ax_info.plot([0.22, 0.18], [0.455, 0.455], transform=ax_info.transAxes, color=HISTORY_COLOR,
+                     linewidth=3, zorder=10)
+        ax_info.scatter(0.2, 0.42, transform=ax_info.transAxes, color=CURRENT_COLOR, s=50, edgecolors='white',
+                        linewidth=1, zorder=10)
+        ax_info.scatter(0.2, 0.385, transform=ax_info.transAxes, color=FORECAST_COLOR, s=50, edgecolors='white',
+                        linewidth=1, zorder=10)
+
+    def _update(self, ticker, historical_prices, historical_dates, future_price, method_used, n_points=None):
+        prices = np.asarray(historical_prices, dtype=float).ravel()
+        x = _dates_to_num(historical_dates)
+        last_x, last_price = x[-1], float(prices[-1])
+        future_x = last_x + FORECAST_DAYS
+        future_price = float(future_price)
+
+        self._history_line.set_data(x, prices)
+        if self._fill is not None:
+            self._fill.remove()
+        self._fill = self.ax.fill_between(x, prices, alpha=0.2, color=HISTORY_COLOR)
+        self._current_point.set_offsets([[last_x, last_price]])
+        self._forecast_point.set_offsets([[future_x, future_price]])
+        self._forecast_line.set_data([last_x, future_x], [last_price, future_price])
+
+        # Пределы осей как при автомасштабировании: заливка идет от нуля, поля 5%
+        x_pad = (future_x - x[0]) * 0.05 or 1
+        y_low = min(0.0, float(prices.min()), future_price)
+        y_high = max(float(prices.max()), future_price)
+        y_pad = (y_high - y_low) * 0.05 or 1
+        self.ax.set_xlim(x[0] - x_pad, future_x + x_pad)
+        self.ax.set_ylim(y_low - y_pad, y_high + y_pad)
+        for label in self.ax.xaxis.get_majorticklabels():
+            label.set_horizontalalignment('right')
+
+        change_percent = (future_price - last_price) / last_price * 100
+        self._title.set_text(f'{ticker} - Текущая: ${last_price:.2f} | Прогноз: ${future_price:.2f}')
+        self._info_header.set_text(f'{ticker} - АНАЛИЗ')
+        self._info_text.set_text(info_panel_text(last_price, future_price, n_points or len(prices),
+                                                 historical_dates[0], historical_dates[-1], method_used))
+        self._change_text.set_text(f'{change_percent:+.2f}%')
+        self._change_text.set_color(CURRENT_COLOR if change_percent >= 0 else NEGATIVE_COLOR)
+
+    def render(self, ticker, historical_prices, historical_dates, future_price, method_used, dpi=None, fmt=None,
+               n_points=None):
+        """
+        Строит график прогноза и возвращает его содержимое.
+
+        Аргументы:
+            ticker (str): Тикер акции для заголовка графика.
+            historical_prices (numpy.ndarray): Исторические цены акции.
+            historical_dates (pandas.DatetimeIndex): Даты соответствующих цен.
+            future_price (float): Прогнозируемая цена на 30 дней вперед.
+            method_used (str): Использованный метод прогнозирования.
+            dpi (int, опционально): Разрешение. По умолчанию self.dpi.
+            fmt (str, опционально): Формат 'png', 'webp' или 'svg'. По умолчанию self.fmt.
+            n_points (int, опционально): Количество точек исходной истории для информационной
+                панели, если historical_prices прорежены. По умолчанию len(historical_prices).
+
+        Возвращает:
+            bytes: Изображение в выбранном формате.
+
+        Пример:
+            >>> image = PlotRenderer(dpi=100).render('AAPL', prices, dates, 150.5, 'moving_average')
+        """
+        buffer = BytesIO()
+        self.render_to(buffer, ticker, historical_prices, historical_dates, future_price, method_used, dpi, fmt,
+                       n_points)
+        return buffer.getvalue()
+
+    def render_to(self, target, ticker, historical_prices, historical_dates, future_price, method_used,
+                  dpi=None, fmt=None, n_points=None):
+        """
+        Строит график прогноза и записывает его в файл или файловый объект target.
+
+        Аргументы те же, что у render(), плюс target (str | file-like) - куда записать изображение.
+        """
+        fmt = fmt or self.fmt
+        if fmt not in PLOT_FORMATS:
+            raise ValueError(f'Неподдерживаемый формат графика: {fmt}')
+        with self._lock:
+            self._update(ticker, historical_prices, historical_dates, future_price, method_used, n_points)
+            self.figure.savefig(target, format=fmt, dpi=dpi or self.dpi, facecolor=BACKGROUND_COLOR,
+                                edgecolor='none')
+
+
+_local = threading.local()
+
+
+def get_renderer(dpi=100, fmt='png'):
+    """
+    Возвращает построитель графиков текущего потока (создается при первом обращении).
+
+    Аргументы:
+        dpi (int, опционально): Разрешение по умолчанию для нового построителя.
+        fmt (str, опционально): Формат по умолчанию для нового построителя.
+
+    Возвращает:
+        PlotRenderer: Построитель, принадлежащий текущему потоку.
+    """
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = PlotRenderer(dpi=dpi, fmt=fmt)
+    return renderer
@@ -0,0 +1,287 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# Поддерживаемые разрешения истории
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+
+# Методы прореживания рядов для графиков
+DOWNSAMPLE_METHODS = ('minmax_lttb', 'lttb', 'minmax')
+
+# Минимальное n_out, при котором методы 'minmax' и 'minmax_lttb' укладываются в лимит точек;
+# при меньших значениях используется LTTB
+MIN_EXTREMA_POINTS = 8
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def local_seconds(timestamps, tz=None):
+    """
+    Переводит время баров (секунды Unix) в местное время биржи в секундах "стенных часов".
+
+    Календарные границы недель и месяцев определяются по местной дате бара: дневной
+    бар Токийской биржи за понедельник начинается в 00:00 JST, что в UTC еще воскресенье.
+    Смещение вычисляется для каждого бара, поэтому переход на летнее время учитывается.
+
+    Аргументы:
+        timestamps (numpy.ndarray): Время баров в секундах Unix (int64).
+        tz (str, опционально): Часовой пояс биржи (IANA, например 'Asia/Tokyo'). None - UTC.
+
+    Возвращает:
+        numpy.ndarray: Местное время в секундах (int64).
+    """
+    if not tz or tz == 'UTC':
+        return timestamps
+    zone = ZoneInfo(tz)
+    offsets = np.fromiter((datetime.fromtimestamp(int(ts), zone).utcoffset().total_seconds() for ts in timestamps),
+                          dtype=np.int64, count=len(timestamps))
+    return timestamps + offsets
+
+
+def _period_keys(timestamps, resolution):
+    # Номер недели (с понедельника) или месяца для каждого бара по местному времени в секундах
+    if resolution == 'weekly':
+        # 1 января 1970 года - четверг: сдвиг на 3 дня начинает недели с понедельника
+        return (timestamps // SECONDS_PER_DAY + 3) // 7
+    if resolution == 'monthly':
+        return timestamps.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    raise ValueError(f'Неизвестное разрешение: {resolution}')
+
+
+def resample_ohlc(timestamps, bars, resolution, tz=None):
+    """
+    Агрегирует дневные бары OHLCV в недельные или месячные.
+
+    Open - первое значение периода, High - максимум, Low - минимум, Close - последнее
+    значение, Volume - сумма. Время бара - время последнего дневного бара периода,
+    поэтому ряд закрытий продолжает дневной ряд без разрывов. Пропуски (NaN) в
+    Open/High/Low/Volume игнорируются. Вычисляется за один проход NumPy (reduceat).
+    Периоды определяются по местной дате бара в часовом поясе биржи tz.
+
+    Аргументы:
+        timestamps (numpy.ndarray): Время баров в секундах Unix (int64), по возрастанию.
+        bars (numpy.ndarray): Матрица OHLCV формы (n, 5), как возвращает PriceStore.read().
+        resolution (str): 'weekly' или 'monthly' ('daily' возвращает данные без изменений).
+        tz (str, опционально): Часовой пояс биржи, как в PriceStore.meta()['tz']. None - UTC.
+
+    Возвращает:
+        tuple: Кортеж (timestamps, bars) агрегированных баров.
+
+    Пример:
+        >>> timestamps, bars = get_price_store().read('AAPL')
+        >>> weekly_ts, weekly_bars = resample_ohlc(timestamps, bars, 'weekly')
+    """
+    if resolution == 'daily' or not len(timestamps):
+        return timestamps, bars
+
+    keys = _period_keys(local_seconds(np.asarray(timestamps, dtype=np.int64), tz), resolution)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+
+    aggregated = np.empty((len(starts), bars.shape[1]))
+    aggregated[:, 0] = bars[starts, 0]
+    aggregated[:, 1] = np.fmax.reduceat(bars[:, 1], starts)
+    aggregated[:, 2] = np.fmin.reduceat(bars[:, 2], starts)
+    aggregated[:, 3] = bars[ends, 3]
+    aggregated[:, 4] = np.add.reduceat(np.nan_to_num(bars[:, 4]), starts)
+    return timestamps[ends], aggregated
+
+
+class ResampledHistoryCache:
+    """
+    Кэш недельных и месячных агрегатов истории тикеров в памяти процесса.
+
+    Агрегаты строятся по всей сохраненной истории один раз и пересчитываются
+    только после записи новых баров (меняется версия тикера в PriceStore.meta()),
+    а запросы с разной глубиной истории получают срез без повторной агрегации.
+
+    Атрибуты:
+        max_entries (int): Максимум хранимых рядов (тикер, разрешение).
+    """
+
+    def __init__(self, max_entries=2000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, store, ticker, resolution, since=None):
+        """
+        Возвращает агрегированную историю тикера из хранилища.
+
+        Аргументы:
+            store (PriceStore): Хранилище истории цен.
+            ticker (str): Тикер акции.
+            resolution (str): Разрешение из RESOLUTIONS.
+            since (float, опционально): Время (Unix), начиная с которого нужны бары.
+
+        Возвращает:
+            tuple: Кортеж (timestamps, bars), как у PriceStore.read().
+        """
+        if resolution == 'daily':
+            return store.read(ticker, since=since)
+
+        meta = store.meta(ticker)
+        version = (meta['last_ts'], meta['refreshed_at']) if meta is not None else None
+        key = (store.db_path, ticker, resolution)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                timestamps, bars = entry[1], entry[2]
+            else:
+                entry = None
+
+        if entry is None:
+            timestamps, bars = resample_ohlc(*store.read(ticker), resolution,
+                                             tz=meta['tz'] if meta is not None else None)
+            with self._lock:
+                self._entries[key] = (version, timestamps, bars)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if since is not None:
+            start = int(np.searchsorted(timestamps, since))
+            timestamps, bars = timestamps[start:], bars[start:]
+        return timestamps, bars
+
+
+resampled_history = ResampledHistoryCache()
+
+
+def lttb(x, y, n_out):
+    """
+    Прореживание ряда алгоритмом Largest-Triangle-Three-Buckets.
+
+    Ряд делится на n_out - 2 корзины; из каждой выбирается точка, образующая
+    треугольник наибольшей площади с выбранной точкой предыдущей корзины и
+    средней точкой следующей. Первая и последняя точки сохраняются.
+
+    Аргументы:
+        x (numpy.ndarray): Координаты X по возрастанию.
+        y (numpy.ndarray): Значения.
+        n_out (int): Количество точек результата (не меньше 3).
+
+    Возвращает:
+        numpy.ndarray: Индексы выбранных точек по возрастанию.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # Границы корзин; последняя "корзина" - последняя точка ряда
+    bounds = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    # Средние точки всех корзин не зависят от выбора и считаются заранее одной операцией
+    sizes = np.diff(bounds)
+    mean_x = np.add.reduceat(x, bounds[:-1]) / sizes
+    mean_y = np.add.reduceat(y, bounds[:-1]) / sizes
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - mean_x[bucket + 1]) * (y[start:end] - py)
+                       - (px - x[start:end]) * (mean_y[bucket + 1] - py))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(y, n_out):
+    """
+    Прореживание с сохранением экстремумов: минимум и максимум каждой из n_out / 2 корзин.
+
+    Аргументы:
+        y (numpy.ndarray): Значения.
+        n_out (int): Примерное количество точек результата.
+
+    Возвращает:
+        numpy.ndarray: Индексы выбранных точек по возрастанию (первая и последняя сохраняются).
+    """
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    # Корзины одинаковой длины: хвост, не делящийся на n_buckets, добавляется отдельной корзиной
+    size = n // n_buckets
+    body = y[:size * n_buckets].reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    indices = [offsets + body.argmin(axis=1), offsets + body.argmax(axis=1), [0, n - 1]]
+    if size * n_buckets < n:
+        tail = y[size * n_buckets:]
+        indices.append([size * n_buckets + int(tail.argmin()), size * n_buckets + int(tail.argmax())])
+    return np.unique(np.concatenate(indices))
+
+
+def downsample(x, y, n_out, method='minmax_lttb'):
+    """
+    Выбирает не более n_out точек ряда для графика.
+
+    Методы:
+        - 'lttb': форма ряда (Largest-Triangle-Three-Buckets)
+        - 'minmax': минимумы и максимумы корзин (экстремумы сохраняются точно)
+        - 'minmax_lttb': предварительный отбор минимумов и максимумов (4 * n_out точек),
+          затем LTTB - почти та же картинка, что у LTTB, в несколько раз быстрее
+          на длинных рядах; глобальные минимум и максимум сохраняются точно
+
+    Аргументы:
+        x (numpy.ndarray): Координаты X по возрастанию (например, время в секундах).
+        y (numpy.ndarray): Значения.
+        n_out (int): Максимальное количество точек.
+        method (str, опционально): Метод из DOWNSAMPLE_METHODS. По умолчанию 'minmax_lttb'.
+
+    Возвращает:
+        numpy.ndarray: Индексы выбранных точек по возрастанию, не больше n_out.
+
+    Пример:
+        >>> indices = downsample(timestamps, closes, 800)
+        >>> plot_prices, plot_dates = prices[indices], dates[indices]
+    """
+    y = np.asarray(y, dtype=float).ravel()
+    if n_out is None or len(y) <= n_out:
+        return np.arange(len(y))
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f'Неизвестный метод прореживания: {method}')
+    if n_out < 3:
+        # Меньше трех точек: только последняя или первая и последняя
+        return np.array([0, len(y) - 1])[-n_out:] if n_out > 0 else np.arange(0)
+    # Методы с экстремумами резервируют под них 4 точки; при малых n_out результат
+    # не уложился бы в лимит - используется LTTB, который выдает ровно n_out точек
+    if method == 'lttb' or n_out < MIN_EXTREMA_POINTS:
+        return lttb(x, y, n_out)
+    if method == 'minmax':
+        # Запас на первую, последнюю точки и хвостовую корзину
+        return minmax(y, n_out - 4)
+    candidates = minmax(y, 4 * n_out) if len(y) > 4 * n_out else np.arange(len(y))
+    selected = candidates[lttb(np.asarray(x, dtype=float)[candidates], y[candidates], n_out - 2)]
+    # Глобальные минимум и максимум добавляются всегда: от них зависят пределы оси Y
+    return np.union1d(selected, [int(y.argmin()), int(y.argmax())])
+
+
+def downsample_series(prices, dates, n_out, method='minmax_lttb'):
+    """
+    Прореживает ряд цен и его даты для графика или ответа API.
+
+    Аргументы:
+        prices (numpy.ndarray): Цены формы (n,) или (n, 1).
+        dates (pandas.DatetimeIndex | numpy.ndarray): Даты цен (или время в секундах Unix).
+        n_out (int | None): Максимальное количество точек. None - без прореживания.
+        method (str, опционально): Метод из DOWNSAMPLE_METHODS.
+
+    Возвращает:
+        tuple: Кортеж (prices, dates) той же формы и типа, что на входе.
+    """
+    if n_out is None or len(prices) <= n_out:
+        return prices, dates
+    x = dates.asi8 if hasattr(dates, 'asi8') else np.asarray(dates)
+    indices = downsample(x, prices, n_out, method)
+    return prices[indices], dates[indices]
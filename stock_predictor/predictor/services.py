@@ -1,42 +1,221 @@
+import time
+import logging
+import threading
 import numpy as np
-import yfinance as yf
-from os import path, makedirs
-import matplotlib.pyplot as plt
 from django.conf import settings
-from datetime import datetime, timedelta
-from sklearn.linear_model import LinearRegression
+from django.urls import reverse
+from datetime import timedelta
+from .providers import get_provider
+from .storage import get_price_store
+from .shared_prices import get_shared_price_matrix
+from .singleflight import SingleFlight
+from .plot_cache import get_plot_cache, plot_key
+from .forecasting import FORECAST_METHODS, GRID_HORIZONS, TREND_WINDOW, fit_trend, forecast_grid
+from .model_cache import get_model_registry
+from .resampling import downsample_series, resampled_history
+from .charts import CHART_CONTENT_TYPES, PLOT_MODES, chart_json, chart_payload, chart_svg
 
+# Тяжелые зависимости (pandas, yfinance, sklearn, matplotlib) импортируются при первом
+# использовании, чтобы запуск Django, команды manage.py и GET-запросы формы их не загружали.
 
-def get_stock_data(ticker, years=1):
+logger = logging.getLogger(__name__)
+
+# Средняя длина года в секундах (для перевода параметра years во временную границу)
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+# Объединение одновременных загрузок истории одного и того же тикера и периода
+history_flight = SingleFlight(getattr(settings, 'FETCH_LOCK_DIR', None))
+
+
+def get_stock_data(ticker, years=1, as_arrays=False, resolution='daily'):
     """
     Получает исторические данные по акциям для заданного тикера.
 
-    Использует библиотеку yfinance для получения цен закрытия акции
-    за указанное количество лет. Данные возвращаются в формате,
+    Сначала читает локальное хранилище истории цен (PriceStore) и загружает
+    у провайдера рыночных данных только бары после последней сохраненной даты.
+    Полная загрузка периода выполняется лишь для новых тикеров или если
+    запрошено больше лет, чем уже сохранено. Данные возвращаются в формате,
     подходящем для алгоритмов машинного обучения.
 
     Аргументы:
         ticker (str): Тикер акции (например, 'AAPL', 'TSLA', 'NVDA').
         years (int, опционально): Количество лет исторических данных. По умолчанию 5.
+        as_arrays (bool, опционально): Вернуть даты как массив int64 (секунды Unix) без
+            создания объектов pandas. Дневная история при этом читается из общей для
+            воркеров матрицы цен (SHARED_PRICES_DIR), если строка тикера совпадает
+            с хранилищем после обновления (SharedPriceMatrix.is_current): цены и даты
+            возвращаются как представления отображенной памяти только для чтения без копирования.
+        resolution (str, опционально): Разрешение 'daily', 'weekly' или 'monthly'. Недельные
+            и месячные бары агрегируются из дневных один раз и кэшируются до появления новых баров.
 
     Возвращает:
         tuple: Кортеж, содержащий два элемента:
             - prices (numpy.ndarray): Массив цен закрытия в формате для ML (-1, 1)
-            - dates (pandas.DatetimeIndex): Соответствующие даты цен
+            - dates (pandas.DatetimeIndex | numpy.ndarray): Соответствующие даты цен
 
     Пример:
         >>> prices, dates = get_stock_data('AAPL', years=3)
         >>> print(f"Получено {len(prices)} точек данных для AAPL")
     """
-    # Получаем информацию об акции
-    stock_info = yf.Ticker(ticker)
+    since = time.time() - years * SECONDS_PER_YEAR
+    store = get_price_store()
+
+    # Дозагружаем недостающие бары (одна загрузка на все одновременные запросы тикера)
+    # и читаем историю из локального хранилища или, для as_arrays, из общей матрицы цен
+    tz = history_flight.do(f'{ticker}:{years}y', _refresh_history, store, ticker, years, since)
+    if as_arrays and resolution == 'daily':
+        shared = _shared_history(store, ticker, since)
+        if shared is not None:
+            closes, timestamps = shared
+            return closes.reshape(-1, 1), timestamps
+
+    timestamps, bars = resampled_history.get(store, ticker, resolution, since=since)
+    closes = bars[:, 3]
+    if as_arrays:
+        return closes.reshape(-1, 1), timestamps
 
-    # Получаем историю с самой первой доступной даты
-    hist = stock_info.history(period=f"{years}y")
+    import pandas as pd
+    dates = pd.to_datetime(timestamps, unit='s', utc=True)
+    if tz:
+        dates = dates.tz_convert(tz)
 
-    return hist['Close'].values.reshape(-1, 1), hist.index
+    return closes.reshape(-1, 1), dates
+
+
+def _shared_history(store, ticker, since):
+    """
+    Читает дневную историю тикера из общей матрицы цен, если она не отстала от хранилища.
+
+    Аргументы:
+        store (PriceStore): Хранилище истории цен (уже обновленное).
+        ticker (str): Тикер акции.
+        since (float): Время (Unix), начиная с которого нужны бары.
 
-def moving_average(prices, method='moving_average'):
+    Возвращает:
+        tuple | None: Кортеж (closes, timestamps) из SharedPriceMatrix.get() или None,
+        если матрица не настроена, не содержит тикер или устарела.
+    """
+    matrix = get_shared_price_matrix()
+    if matrix is None or ticker not in matrix or not matrix.is_current(ticker, store.meta(ticker), since):
+        return None
+    return matrix.get(ticker, since=since)
+
+
+def _refresh_history(store, ticker, years, since):
+    """
+    Обновляет историю тикера в хранилище, загружая у провайдера только недостающие бары.
+
+    Аргументы:
+        store (PriceStore): Хранилище истории цен.
+        ticker (str): Тикер акции.
+        years (int): Запрошенное количество лет истории.
+        since (float): Время (Unix), начиная с которого нужна полная история.
+
+    Возвращает:
+        str | None: Часовой пояс биржи тикера для восстановления дат.
+    """
+    meta = store.meta(ticker)
+    plan = _refresh_plan(meta, since)
+
+    # Нет данных или сохраненная история короче запрошенной - загружаем весь период
+    if plan == 'full':
+        try:
+            frame = get_provider().history(ticker, period=f"{years}y")
+        except Exception as e:
+            if meta is None:
+                raise
+            # Короткая сохраненная история лучше ошибки: отдаем ее, догрузим при следующем запросе
+            logger.warning('Не удалось загрузить полную историю %s: %s', ticker, e)
+            return meta['tz']
+        _store_bars(store, ticker, frame, covered_from=since)
+        return _frame_tz(frame) or (meta or {}).get('tz')
+
+    # История недавно обновлялась - сеть не трогаем
+    if plan is None:
+        return meta['tz']
+
+    try:
+        frame = get_provider().history(ticker, start=_resume_date(meta))
+    except Exception as e:
+        # При сбое сети отдаем сохраненную историю, а не ошибку
+        logger.warning('Не удалось обновить историю %s: %s', ticker, e)
+        return meta['tz']
+    _store_bars(store, ticker, frame)
+    return meta['tz']
+
+
+def prefetch_history(tickers, years=1):
+    """
+    Обновляет историю нескольких тикеров одной пакетной загрузкой (fetch_many).
+
+    Тикеры делятся на требующие полной загрузки периода и требующие дозагрузки
+    последних баров, каждая группа загружается провайдером за один пакетный
+    вызов с ограниченным числом одновременных запросов. Свежие тикеры пропускаются.
+    Используется командами, работающими со многими тикерами сразу.
+
+    Аргументы:
+        tickers (iterable): Тикеры акций.
+        years (int, опционально): Количество лет истории. По умолчанию 1.
+
+    Возвращает:
+        dict: Словарь {тикер: исключение} для тикеров, которые не удалось обновить.
+
+    Пример:
+        >>> errors = prefetch_history(['AAPL', 'MSFT', 'NVDA'], years=10)
+    """
+    store = get_price_store()
+    since = time.time() - years * SECONDS_PER_YEAR
+    full, resume = [], {}
+    for ticker in dict.fromkeys(tickers):
+        meta = store.meta(ticker)
+        plan = _refresh_plan(meta, since)
+        if plan == 'full':
+            full.append(ticker)
+        elif plan == 'incremental':
+            resume[ticker] = _resume_date(meta)
+
+    provider = get_provider()
+    errors = {}
+    for batch, fetch_options, covered_from in ((full, {'period': f'{years}y'}, since),
+                                               (list(resume), {'start': resume}, None)):
+        if not batch:
+            continue
+        frames, failed = provider.fetch_many(batch, **fetch_options)
+        errors.update(failed)
+        for ticker, frame in frames.items():
+            _store_bars(store, ticker, frame, covered_from=covered_from)
+    return errors
+
+
+def _store_bars(store, ticker, frame, covered_from=None):
+    # Сохраняет бары и освобождает обученные модели тикера в этом процессе. Корректность
+    # в других процессах обеспечивает отпечаток окна в ключе реестра (см. ModelRegistry)
+    store.write(ticker, frame, covered_from=covered_from)
+    if len(frame):
+        get_model_registry().invalidate(ticker)
+
+
+def _refresh_plan(meta, since):
+    # 'full' - загрузить весь период, 'incremental' - дозагрузить новые бары, None - данные свежие
+    stale = meta is None or time.time() - meta['refreshed_at'] >= settings.PRICE_STORE_REFRESH_INTERVAL
+    if meta is None or meta['covered_from'] > since or (stale and meta['last_ts'] is None):
+        return 'full'
+    return 'incremental' if stale else None
+
+
+def _resume_date(meta):
+    # Загружаем бары начиная с последнего сохраненного дня: он мог быть незакрытым
+    import pandas as pd
+    last_date = pd.Timestamp(meta['last_ts'], unit='s', tz='UTC')
+    if meta['tz']:
+        last_date = last_date.tz_convert(meta['tz'])
+    return last_date.date()
+
+
+def _frame_tz(frame):
+    return str(frame.index.tz) if len(frame) and frame.index.tz is not None else None
+
+def moving_average(prices, method='moving_average', ticker=None, end_date=None):
     """
     Прогнозирует будущую цену акции на основе исторических данных.
 
@@ -50,6 +229,9 @@ def moving_average(prices, method='moving_average'):
             - 'recent_trend': Линейная регрессия на 90 днях
             - 'last_price': Последняя известная цена
             По умолчанию 'moving_average'.
+        ticker (str, опционально): Тикер акции. Вместе с end_date включает реестр
+            моделей: коэффициенты тренда окна обучаются один раз и берутся из кэша.
+        end_date (date, опционально): Дата последней цены prices.
 
     Возвращает:
         float: Прогнозируемая цена акции.
@@ -66,7 +248,13 @@ def moving_average(prices, method='moving_average'):
         # Линейная регрессия только на последних 90 днях
         if len(prices) > 90:
             recent_prices = prices[-90:]
+            if ticker is not None and end_date is not None:
+                slope, intercept = get_model_registry().get_or_fit(
+                    ticker, method, end_date, len(recent_prices), lambda: fit_trend(recent_prices),
+                    data=recent_prices)
+                return float(intercept + slope * (len(recent_prices) + 30))
             days = np.arange(len(recent_prices)).reshape(-1, 1)
+            from sklearn.linear_model import LinearRegression
             model = LinearRegression()
             model.fit(days, recent_prices)
             return float(model.predict([[len(recent_prices) + 30]])[0][0])
@@ -77,12 +265,48 @@ def moving_average(prices, method='moving_average'):
         # Просто возвращаем последнюю цену
         return prices[-1][0]
 
-def create_prediction_plot(ticker, historical_prices, historical_dates, future_price, method_used):
+def prediction_grid(prices, methods=FORECAST_METHODS, horizons=GRID_HORIZONS, ticker=None, end_date=None):
+    """
+    Рассчитывает сетку прогнозов (методы x горизонты) за один проход по ценам.
+
+    Обертка над forecasting.forecast_grid(): если переданы ticker и end_date,
+    коэффициенты тренда берутся из реестра моделей (тот же ключ, что у
+    moving_average(..., method='recent_trend')), поэтому повторные запросы
+    по тому же окну не обучают регрессию заново.
+
+    Аргументы:
+        prices (numpy.ndarray): Исторические цены формы (n, 1).
+        methods (iterable, опционально): Методы прогнозирования. По умолчанию все.
+        horizons (iterable, опционально): Горизонты в днях. По умолчанию (1, 5, 30, 90).
+        ticker (str, опционально): Тикер акции.
+        end_date (date, опционально): Дата последней цены prices.
+
+    Возвращает:
+        dict: Словарь {метод: {горизонт: прогнозируемая цена}}.
+
+    Пример:
+        >>> grid = prediction_grid(prices, horizons=[1, 5, 30, 90], ticker='AAPL', end_date=dates[-1])
+    """
+    trend = None
+    if 'recent_trend' in methods and len(prices) > TREND_WINDOW and ticker is not None and end_date is not None:
+        window = prices[-TREND_WINDOW:]
+        trend = get_model_registry().get_or_fit(ticker, 'recent_trend', end_date, TREND_WINDOW,
+                                                lambda: fit_trend(window), data=window)
+    return forecast_grid(prices, methods, horizons, trend=trend)
+
+def create_prediction_plot(ticker, historical_prices, historical_dates, future_price, method_used, mode=None):
     """
     Создает визуализацию исторических данных и прогноза цены акции.
 
     Генерирует график с историческими ценами, текущей ценой и прогнозируемой
     ценой на 30 дней вперед. График сохраняется в медиа-директорию проекта.
+    Имя файла адресуется по содержимому: если график с теми же данными уже
+    построен, возвращается существующий файл без обращения к matplotlib.
+
+    Режимы 'json' и 'svg' не используют matplotlib: сохраняются данные графика
+    (прореженная история, текущая точка и отрезок прогноза) для отрисовки
+    в браузере или компактный SVG по тем же данным. Такие графики отдаются
+    представлением chart_file со сжатием gzip и ETag.
 
     Аргументы:
         ticker (str): Тикер акции для заголовка графика.
@@ -90,147 +314,226 @@ def create_prediction_plot(ticker, historical_prices, historical_dates, future_p
         historical_dates (pandas.DatetimeIndex): Даты соответствующих цен.
         future_price (float): Прогнозируемая цена на 30 дней вперед.
         method_used (str): Использованный метод прогнозирования для легенды.
+        mode (str, опционально): Режим из charts.PLOT_MODES: 'image', 'json' или 'svg'.
+            По умолчанию settings.PLOT_MODE.
 
     Возвращает:
-        str: URL путь к сохраненному изображению графика.
+        str: URL путь к сохраненному изображению графика (для 'json' и 'svg' - URL представления chart_file).
 
     Пример:
         >>> plot_url = create_prediction_plot('AAPL', prices, dates, 150.50, 'moving_average')
         >>> print(f"График сохранен: {plot_url}")
     """
-    # Настройка стиля
-    plt.style.use('dark_background')
-
-    # Создаем фигуру с двумя subplots: основной график и информационная панель
-    fig = plt.figure(figsize=(16, 8), facecolor='#121212')
-    gs = plt.GridSpec(1, 2, width_ratios=[3, 1], wspace=0.05)
-
-    # Основной график
-    ax = fig.add_subplot(gs[0])
-
-    # Основной график цен
-    ax.plot(historical_dates, historical_prices.flatten(),
-            color='#2962FF', linewidth=2, label='Исторические данные')
-
-    # Текущая цена
-    last_date = historical_dates[-1]
-    last_price = historical_prices[-1][0]
-
-    # Прогнозная точка
-    future_date = last_date + timedelta(days=30)
-
-    # Добавляем свечной стиль для последнего дня
-    ax.scatter(last_date, last_price, color='#00E676', s=120, edgecolors='white', linewidth=2, zorder=5,
-               label=f'Текущая: ${last_price:.2f}')
-
-    # Прогнозная точка
-    ax.scatter(future_date, future_price, color='#FF6D00', s=120, edgecolors='white', linewidth=2, zorder=5,
-               label=f'Прогноз: ${future_price:.2f}')
-
-    # Линия прогноза
-    ax.plot([last_date, future_date], [last_price, future_price],
-            color='#FF6D00', linestyle='--', linewidth=2, alpha=0.8)
-
-    # Заполнение под графиком
-    ax.fill_between(historical_dates, historical_prices.flatten(), alpha=0.2, color='#2962FF')
-
-    # Настройка осей и сетки
-    ax.grid(True, alpha=0.3, linestyle='--')
-    ax.set_axisbelow(True)
-
-    # Цвета осей
-    ax.spines['bottom'].set_color('#757575')
-    ax.spines['top'].set_color('#757575')
-    ax.spines['right'].set_color('#757575')
-    ax.spines['left'].set_color('#757575')
-
-    # Форматирование цен на оси Y
-    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.2f}'))
-
-    # Поворот дат для лучшей читаемости
-    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
-
-    # Заголовок и подписи
-    ax.set_title(f'{ticker} - Текущая: ${last_price:.2f} | Прогноз: ${future_price:.2f}',
-                 fontsize=16, fontweight='bold', pad=20, color='white')
-    ax.set_xlabel('Дата', fontsize=12, color='#BDBDBD', labelpad=10)
-    ax.set_ylabel('Цена ($)', fontsize=12, color='#BDBDBD', labelpad=10)
-
-    # Информационная панель (правая часть)
-    ax_info = fig.add_subplot(gs[1])
-    ax_info.axis('off')  # Скрываем оси
-
-    # Расчет изменения цены
-    change_percent = ((future_price - last_price) / last_price * 100)
-    change_color = '#00E676' if change_percent >= 0 else '#FF5252'
-
-    # Основной текст без форматирования
-    info_text = f'''
-
-    ┣ Текущая: ${last_price:.2f}
-    ┣ Прогноз: ${future_price:.2f}
-    ┗ Изменение: 
-
-
-    ┣ Период: {len(historical_prices)} дней
-    ┣ Начало: {historical_dates[0].strftime("%d.%m.%Y")}
-    ┗ Конец: {historical_dates[-1].strftime("%d.%m.%Y")}
-
-
-    ┗ {method_used}
-
-
-    ┣   - Исторические данные
-    ┣   - Текущая цена
-    ┗   - Прогноз на 30 дней'''
-
-    # Создаем основной текст
-    font_size = 10
-    ax_info.text(0.02, 0.95, info_text, transform=ax_info.transAxes,
-                 bbox=dict(boxstyle='round', facecolor='#424242', alpha=0.9, edgecolor='#757575', pad=1),
-                 fontfamily='monospace', color='white', fontsize=font_size, verticalalignment='top', linespacing=1.4)
-
-    # Добавляем заголовки
-    ax_info.text(0.02, 0.935, f"{ticker} - АНАЛИЗ", transform=ax_info.transAxes,
-                 fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
-    ax_info.text(0.04, 0.90, "ЦЕНА:", transform=ax_info.transAxes,
-                 fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
-    ax_info.text(0.04, 0.74, "ДАННЫЕ:", transform=ax_info.transAxes,
-                 fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
-    ax_info.text(0.04, 0.58, "МЕТОД:", transform=ax_info.transAxes,
-                 fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
-    ax_info.text(0.04, 0.48, "ЛЕГЕНДА:", transform=ax_info.transAxes,
-                 fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
-
-    # Цветной процент изменения
-    ax_info.text(0.46, 0.8, f'{change_percent:+.2f}%', transform=ax_info.transAxes,
-                 color=change_color, fontfamily='monospace', fontsize=font_size, fontweight='bold')
-
-    # Синяя линия для исторических данных
-    ax_info.plot([0.22, 0.18], [0.455, 0.455], transform=ax_info.transAxes, color='#2962FF', linewidth=3, zorder=10)
-
-    # Зеленая точка для текущей цены
-    ax_info.scatter(0.2, 0.42, transform=ax_info.transAxes, color='#00E676', s=50, edgecolors='white', linewidth=1,
-                    zorder=10)
-
-    # Оранжевая точка для прогноза
-    ax_info.scatter(0.2, 0.385, transform=ax_info.transAxes, color='#FF6D00', s=50, edgecolors='white', linewidth=1,
-                    zorder=10)
+    mode = mode or settings.PLOT_MODE
+    if mode not in PLOT_MODES:
+        raise ValueError(f'Неизвестный режим графика: {mode}')
+    cache = get_plot_cache()
+    plot_filename = prediction_plot_filename(ticker, historical_prices, historical_dates, future_price, method_used,
+                                             mode)
+    renderer_mode = settings.PLOT_RENDERER
+    fmt, dpi = _plot_output_options(mode)
+    cached_url = cache.lookup(plot_filename)
+    if cached_url is not None:
+        return chart_file_url(plot_filename) if mode in CHART_CONTENT_TYPES else cached_url
+
+    # Длинную историю прореживаем: на ширине графика видно не больше нескольких сотен точек
+    n_points = len(historical_prices)
+    plot_prices, plot_dates = downsample_series(historical_prices, historical_dates, settings.PLOT_MAX_POINTS,
+                                                settings.PLOT_DOWNSAMPLE_METHOD)
+
+    # Строим график во временный файл и атомарно публикуем его в кэш
+    temp_path = cache.temp_path(plot_filename)
+    if mode in CHART_CONTENT_TYPES:
+        payload = chart_payload(ticker, plot_prices, plot_dates, future_price, method_used, n_points=n_points)
+        with open(temp_path, 'w', encoding='utf-8') as chart_file:
+            chart_file.write(chart_json(payload) if mode == 'json' else chart_svg(payload))
+        cache.commit(temp_path, plot_filename)
+        return chart_file_url(plot_filename)
+    if renderer_mode == 'fast':
+        from .rendering import get_renderer
+        get_renderer().render_to(temp_path, ticker, plot_prices, plot_dates, future_price, method_used,
+                                 dpi=dpi, fmt=fmt, n_points=n_points)
+    else:
+        _render_legacy(temp_path, ticker, plot_prices, plot_dates, future_price, method_used, n_points=n_points)
+
+    return cache.commit(temp_path, plot_filename)
+
+def prediction_plot_filename(ticker, historical_prices, historical_dates, future_price, method_used, mode=None):
+    """
+    Возвращает имя файла графика прогноза, не строя сам график.
 
-    # Настройка layout
-    plt.tight_layout()
+    Имя вычисляется по всему, от чего зависит изображение, поэтому его можно
+    сообщить клиенту заранее, пока график строится в фоне.
 
-    # Сохранение с высоким качеством
-    plot_filename = f'{ticker}_prediction_{datetime.now().strftime("%Y%m%d_%H%M%S")}.png'
-    plot_path = path.join(settings.MEDIA_ROOT, 'plots', plot_filename)
-    makedirs(path.dirname(plot_path), exist_ok=True)
+    Аргументы совпадают с create_prediction_plot().
 
-    plt.savefig(plot_path, dpi=300, bbox_inches='tight', facecolor='#121212', edgecolor='none')
-    plt.close()
+    Возвращает:
+        str: Имя файла в директории MEDIA_ROOT/plots.
+    """
+    mode = mode or settings.PLOT_MODE
+    fmt, dpi = _plot_output_options(mode)
+    key = plot_key(ticker, historical_dates[0], historical_dates[-1], len(historical_prices),
+                   float(historical_prices[-1][0]), method_used, float(future_price), settings.PLOT_STYLE_VERSION,
+                   settings.PLOT_RENDERER, dpi, fmt, settings.PLOT_MAX_POINTS, settings.PLOT_DOWNSAMPLE_METHOD, mode)
+    return get_plot_cache().filename(ticker, key, ext=fmt)
+
+def chart_file_url(filename):
+    """
+    Возвращает URL представления chart_file для графика в режиме 'json' или 'svg'.
+    """
+    return reverse('chart_file', args=[filename])
+
+def _plot_output_options(mode='image'):
+    # Формат и разрешение графика для режима и способа построения
+    if mode in CHART_CONTENT_TYPES:
+        return mode, None
+    if settings.PLOT_RENDERER == 'fast':
+        return settings.PLOT_FORMAT, settings.PLOT_DPI
+    return 'png', 300
+
+# pyplot хранит текущую фигуру и стиль в глобальном состоянии: построения в режиме 'legacy'
+# из разных потоков (потоки gunicorn, пул sync_to_async) выполняются по очереди
+_pyplot_lock = threading.Lock()
+
+def _pyplot():
+    # pyplot загружается только для режима 'legacy'; бэкенд Agg выбирается до его импорта
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _render_legacy(target, ticker, historical_prices, historical_dates, future_price, method_used, n_points=None):
+    """
+    Строит график прогноза через pyplot (исходный способ, 300 dpi) и сохраняет его в target.
 
-    return f'/media/plots/{plot_filename}'
+    Каждый вызов заново создает фигуру, применяет стиль и выполняет tight_layout,
+    поэтому он заметно медленнее PlotRenderer. Оставлен для режима PLOT_RENDERER = 'legacy'.
+    pyplot не потокобезопасен, поэтому построения выполняются под блокировкой процесса.
 
-def train_model(x, y):
+    Аргументы:
+        target (str): Путь к файлу изображения (формат PNG).
+        n_points (int, опционально): Количество точек исходной истории для информационной
+            панели, если historical_prices прорежены. По умолчанию len(historical_prices).
+        Остальные аргументы совпадают с create_prediction_plot().
+    """
+    from .rendering import info_panel_text
+    plt = _pyplot()
+
+    with _pyplot_lock:
+        # Настройка стиля
+        plt.style.use('dark_background')
+
+        # Создаем фигуру с двумя subplots: основной график и информационная панель
+        fig = plt.figure(figsize=(16, 8), facecolor='#121212')
+        gs = plt.GridSpec(1, 2, width_ratios=[3, 1], wspace=0.05)
+
+        # Основной график
+        ax = fig.add_subplot(gs[0])
+
+        # Основной график цен
+        ax.plot(historical_dates, historical_prices.flatten(),
+                color='#2962FF', linewidth=2, label='Исторические данные')
+
+        # Текущая цена
+        last_date = historical_dates[-1]
+        last_price = historical_prices[-1][0]
+
+        # Прогнозная точка
+        future_date = last_date + timedelta(days=30)
+
+        # Добавляем свечной стиль для последнего дня
+        ax.scatter(last_date, last_price, color='#00E676', s=120, edgecolors='white', linewidth=2, zorder=5,
+                   label=f'Текущая: ${last_price:.2f}')
+
+        # Прогнозная точка
+        ax.scatter(future_date, future_price, color='#FF6D00', s=120, edgecolors='white', linewidth=2, zorder=5,
+                   label=f'Прогноз: ${future_price:.2f}')
+
+        # Линия прогноза
+        ax.plot([last_date, future_date], [last_price, future_price],
+                color='#FF6D00', linestyle='--', linewidth=2, alpha=0.8)
+
+        # Заполнение под графиком
+        ax.fill_between(historical_dates, historical_prices.flatten(), alpha=0.2, color='#2962FF')
+
+        # Настройка осей и сетки
+        ax.grid(True, alpha=0.3, linestyle='--')
+        ax.set_axisbelow(True)
+
+        # Цвета осей
+        ax.spines['bottom'].set_color('#757575')
+        ax.spines['top'].set_color('#757575')
+        ax.spines['right'].set_color('#757575')
+        ax.spines['left'].set_color('#757575')
+
+        # Форматирование цен на оси Y
+        ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'${x:,.2f}'))
+
+        # Поворот дат для лучшей читаемости
+        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+        # Заголовок и подписи
+        ax.set_title(f'{ticker} - Текущая: ${last_price:.2f} | Прогноз: ${future_price:.2f}',
+                     fontsize=16, fontweight='bold', pad=20, color='white')
+        ax.set_xlabel('Дата', fontsize=12, color='#BDBDBD', labelpad=10)
+        ax.set_ylabel('Цена ($)', fontsize=12, color='#BDBDBD', labelpad=10)
+
+        # Информационная панель (правая часть)
+        ax_info = fig.add_subplot(gs[1])
+        ax_info.axis('off')  # Скрываем оси
+
+        # Расчет изменения цены
+        change_percent = ((future_price - last_price) / last_price * 100)
+        change_color = '#00E676' if change_percent >= 0 else '#FF5252'
+
+        # Основной текст без форматирования
+        info_text = info_panel_text(last_price, future_price, n_points or len(historical_prices),
+                                    historical_dates[0], historical_dates[-1], method_used)
+
+        # Создаем основной текст
+        font_size = 10
+        ax_info.text(0.02, 0.95, info_text, transform=ax_info.transAxes,
+                     bbox=dict(boxstyle='round', facecolor='#424242', alpha=0.9, edgecolor='#757575', pad=1),
+                     fontfamily='monospace', color='white', fontsize=font_size, verticalalignment='top',
+                     linespacing=1.4)
+
+        # Добавляем заголовки
+        ax_info.text(0.02, 0.935, f"{ticker} - АНАЛИЗ", transform=ax_info.transAxes,
+                     fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
+        ax_info.text(0.04, 0.90, "ЦЕНА:", transform=ax_info.transAxes,
+                     fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
+        ax_info.text(0.04, 0.74, "ДАННЫЕ:", transform=ax_info.transAxes,
+                     fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
+        ax_info.text(0.04, 0.58, "МЕТОД:", transform=ax_info.transAxes,
+                     fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
+        ax_info.text(0.04, 0.48, "ЛЕГЕНДА:", transform=ax_info.transAxes,
+                     fontfamily='monospace', color='white', fontsize=font_size, fontweight='bold')
+
+        # Цветной процент изменения
+        ax_info.text(0.46, 0.8, f'{change_percent:+.2f}%', transform=ax_info.transAxes,
+                     color=change_color, fontfamily='monospace', fontsize=font_size, fontweight='bold')
+
+        # Синяя линия для исторических данных
+        ax_info.plot([0.22, 0.18], [0.455, 0.455], transform=ax_info.transAxes, color='#2962FF', linewidth=3, zorder=10)
+
+        # Зеленая точка для текущей цены
+        ax_info.scatter(0.2, 0.42, transform=ax_info.transAxes, color='#00E676', s=50, edgecolors='white', linewidth=1,
+                        zorder=10)
+
+        # Оранжевая точка для прогноза
+        ax_info.scatter(0.2, 0.385, transform=ax_info.transAxes, color='#FF6D00', s=50, edgecolors='white', linewidth=1,
+                        zorder=10)
+
+        # Настройка layout
+        plt.tight_layout()
+
+        # Сохранение с высоким качеством
+        try:
+            plt.savefig(target, format='png', dpi=300, bbox_inches='tight', facecolor='#121212', edgecolor='none')
+        finally:
+            plt.close()
+
+def train_model(x, y, ticker=None, end_date=None):
     """
     Обучает модель линейной регрессии на предоставленных данных.
 
@@ -240,6 +543,10 @@ def train_model(x, y):
     Аргументы:
         x (numpy.ndarray): Признаки для обучения (обычно временные периоды).
         y (numpy.ndarray): Целевые значения (цены акций).
+        ticker (str, опционально): Тикер акции. Вместе с end_date включает реестр моделей:
+            коэффициенты берутся из кэша, если окно с такой датой конца и длиной уже
+            обучалось. Подходит, когда x - номера дней окна, как в приложении.
+        end_date (date, опционально): Дата последней точки обучающего окна.
 
     Возвращает:
         LinearRegression: Обученная модель линейной регрессии.
@@ -248,6 +555,39 @@ def train_model(x, y):
         >>> model = train_model(days, prices)
         >>> prediction = model.predict([[100]])
     """
+    from sklearn.linear_model import LinearRegression
+    if ticker is None or end_date is None:
+        model = LinearRegression()
+        model.fit(x, y)
+        return model
+
+    def fit():
+        fitted = LinearRegression().fit(x, y)
+        return np.asarray(fitted.coef_), np.asarray(fitted.intercept_)
+
+    coef, intercept = get_model_registry().get_or_fit(ticker, 'linear_regression', end_date, len(x), fit,
+                                                      data=(x, y))
+    # Восстанавливаем обученную модель из коэффициентов без повторного обучения
     model = LinearRegression()
-    model.fit(x, y)
+    model.coef_, model.intercept_ = coef, intercept
+    model.n_features_in_ = coef.shape[-1]
     return model
+
+def warm_up():
+    """
+    Заранее загружает тяжелые зависимости и прогревает построение графиков.
+
+    Вызывается из PredictorConfig.ready() при PREDICTOR_WARMUP = True. При запуске
+    сервера с предварительной загрузкой приложения (gunicorn --preload) прогрев
+    выполняется один раз в главном процессе, и воркеры наследуют загруженные
+    модули и кэш шрифтов matplotlib через fork.
+    """
+    import pandas  # noqa: F401
+    import yfinance  # noqa: F401
+    from sklearn.linear_model import LinearRegression  # noqa: F401
+    from .rendering import PlotRenderer
+    from .synthetic import synthetic_prices
+
+    # Одно построение загружает шрифты и заполняет кэши matplotlib
+    prices, dates = synthetic_prices(120)
+    PlotRenderer(dpi=20).render('WARMUP', prices, dates, float(prices[-1][0]), 'moving_average')
@@ -0,0 +1,207 @@
+import json
+import os
+import threading
+import time
+from os import path, makedirs
+
+import numpy as np
+
+# Имя индексного файла. Его замена (os.replace) атомарно публикует новую версию матрицы
+INDEX_FILENAME = 'index.json'
+
+
+class SharedPriceMatrix:
+    """
+    Общая для процессов матрица цен закрытия, отображенная в память (только чтение).
+
+    Формат на диске:
+        - closes-<версия>.bin: цены закрытия всех тикеров подряд (float32 или float64)
+        - dates-<версия>.bin: время баров в секундах Unix (int64) в том же порядке
+        - index.json: тип данных, имена файлов, словарь {тикер: [смещение, длина]}
+          и начало полной истории каждого тикера в хранилище на момент построения
+
+    Файлы отображаются через numpy.memmap, поэтому все воркеры используют одни
+    и те же страницы памяти ОС, а get() возвращает представления без копирования.
+    Матрица - снимок хранилища истории: перед чтением строки проверяйте is_current().
+
+    Атрибуты:
+        directory (str): Директория с файлами матрицы.
+        dtype (numpy.dtype): Тип цен закрытия.
+        tickers (dict): Индекс {тикер: (смещение, длина)}.
+        covered_from (dict): Словарь {тикер: время Unix, с которого история полная}.
+        built_at (float): Время построения матрицы (Unix).
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        with open(path.join(self.directory, INDEX_FILENAME), encoding='utf-8') as index_file:
+            index = json.load(index_file)
+        self.dtype = np.dtype(index['dtype'])
+        self.tickers = {ticker: tuple(position) for ticker, position in index['tickers'].items()}
+        # Индексы, построенные до появления поля, не подтверждают покрытие периода
+        self.covered_from = index.get('covered_from', {})
+        self.built_at = index['built_at']
+        self.closes = self._map(index['closes'], self.dtype)
+        self.dates = self._map(index['dates'], np.int64)
+
+    def _map(self, filename, dtype):
+        file_path = path.join(self.directory, filename)
+        # numpy.memmap не умеет отображать пустой файл
+        if os.path.getsize(file_path) == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode='r')
+
+    def __contains__(self, ticker):
+        return ticker in self.tickers
+
+    def get(self, ticker, since=None):
+        """
+        Возвращает цены и даты тикера как представления отображенной памяти.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            since (float, опционально): Время (Unix), начиная с которого нужны бары.
+
+        Возвращает:
+            tuple: Кортеж (closes, dates) - одномерные массивы без копирования данных.
+
+        Пример:
+            >>> closes, dates = get_shared_price_matrix().get('AAPL')
+        """
+        offset, length = self.tickers[ticker]
+        closes = self.closes[offset:offset + length]
+        dates = self.dates[offset:offset + length]
+        if since is not None:
+            start = int(np.searchsorted(dates, since))
+            closes, dates = closes[start:], dates[start:]
+        return closes, dates
+
+    def is_current(self, ticker, meta, since=None):
+        """
+        Проверяет, что строка тикера совпадает с текущим состоянием хранилища истории.
+
+        Матрица перестраивается командой build_price_matrix время от времени, а хранилище
+        дозагружается при запросах, поэтому строка годится, только если ее последний бар
+        (время и цена закрытия) совпадает с последним баром хранилища и при построении
+        история уже покрывала запрошенный период.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            meta (dict | None): Метаданные тикера из PriceStore.meta().
+            since (float, опционально): Время (Unix), начиная с которого нужны бары.
+
+        Возвращает:
+            bool: True, если get() вернет те же бары, что и хранилище.
+        """
+        position = self.tickers.get(ticker)
+        if meta is None or meta['last_ts'] is None or position is None or not position[1]:
+            return False
+        covered_from = self.covered_from.get(ticker)
+        if since is not None and (covered_from is None or covered_from > since):
+            return False
+        last = position[0] + position[1] - 1
+        return (int(self.dates[last]) == meta['last_ts']
+                and self.closes[last] == self.dtype.type(meta['last_close']))
+
+
+def build_price_matrix(tickers, directory, dtype='float64', store=None):
+    """
+    Строит матрицу цен из локального хранилища истории и атомарно публикует ее.
+
+    Новые файлы данных получают уникальную версию, индекс заменяется последним,
+    поэтому читатели видят либо старую, либо новую матрицу целиком. Файлы
+    предыдущих версий удаляются: уже отображенные страницы остаются доступны
+    открывшим их процессам до переоткрытия.
+
+    Аргументы:
+        tickers (iterable): Тикеры, которые нужно включить.
+        directory (str): Директория матрицы.
+        dtype (str, опционально): Тип цен 'float64' (значения совпадают с хранилищем) или 'float32'
+            (вдвое меньше памяти, ~7 значащих цифр). По умолчанию 'float64'.
+        store (PriceStore, опционально): Хранилище истории. По умолчанию общее хранилище процесса.
+
+    Возвращает:
+        dict: Индекс {тикер: [смещение, длина]} опубликованной матрицы.
+    """
+    if store is None:
+        from .storage import get_price_store
+        store = get_price_store()
+
+    directory = str(directory)
+    makedirs(directory, exist_ok=True)
+    version = f'{time.time_ns()}-{os.getpid()}'
+    closes_name, dates_name = f'closes-{version}.bin', f'dates-{version}.bin'
+
+    index, covered_from = {}, {}
+    offset = 0
+    with open(path.join(directory, closes_name), 'wb') as closes_file, \
+            open(path.join(directory, dates_name), 'wb') as dates_file:
+        for ticker in dict.fromkeys(tickers):
+            # Метаданные читаются до баров: если между чтениями история загрузится заново
+            # за больший период, покрытие строки окажется заниженным, а не завышенным
+            meta = store.meta(ticker)
+            timestamps, bars = store.read(ticker)
+            if meta is None or not len(timestamps):
+                continue
+            covered_from[ticker] = meta['covered_from']
+            bars[:, 3].astype(dtype).tofile(closes_file)
+            timestamps.astype(np.int64).tofile(dates_file)
+            index[ticker] = [offset, len(timestamps)]
+            offset += len(timestamps)
+        closes_file.flush()
+        os.fsync(closes_file.fileno())
+        dates_file.flush()
+        os.fsync(dates_file.fileno())
+
+    temp_index = path.join(directory, f'.{INDEX_FILENAME}.tmp-{version}')
+    with open(temp_index, 'w', encoding='utf-8') as index_file:
+        json.dump({'dtype': np.dtype(dtype).name, 'closes': closes_name, 'dates': dates_name,
+                   'built_at': time.time(), 'tickers': index, 'covered_from': covered_from}, index_file)
+    os.replace(temp_index, path.join(directory, INDEX_FILENAME))
+
+    # Удаляем файлы предыдущих версий
+    for name in os.listdir(directory):
+        if name.endswith('.bin') and name not in (closes_name, dates_name):
+            try:
+                os.remove(path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return index
+
+
+_matrix = None
+_matrix_version = None
+_matrix_lock = threading.Lock()
+
+
+def get_shared_price_matrix():
+    """
+    Возвращает матрицу цен из директории SHARED_PRICES_DIR.
+
+    Матрица открывается при первом обращении и переоткрывается, когда
+    опубликована новая версия (изменилось время модификации индекса) или
+    изменилась директория в настройках.
+
+    Возвращает:
+        SharedPriceMatrix | None: Матрица или None, если она не настроена или еще не построена.
+    """
+    global _matrix, _matrix_version
+    from django.conf import settings
+
+    directory = getattr(settings, 'SHARED_PRICES_DIR', None)
+    if not directory:
+        return None
+    try:
+        version = (str(directory), os.stat(path.join(directory, INDEX_FILENAME)).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+    with _matrix_lock:
+        if _matrix is None or version != _matrix_version:
+            try:
+                _matrix = SharedPriceMatrix(directory)
+            except FileNotFoundError:
+                # Индекс успели заменить следующей публикацией - откроем ее при следующем обращении
+                return _matrix
+            _matrix_version = version
+        return _matrix
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+from contextlib import contextmanager
+from os import path, makedirs
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессное объединение недоступно, работает только потоковое
+    fcntl = None
+
+
+class _Call:
+    """
+    Выполняющийся вызов, результат которого ждут остальные участники.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Объединение одновременных вызовов с одинаковым ключом (single-flight).
+
+    Внутри процесса первый поток с новым ключом становится ведущим и выполняет
+    функцию, остальные потоки ждут и получают тот же результат или то же исключение.
+    Между процессами ведущие потоки разных воркеров встречаются на файловой
+    блокировке (fcntl.flock): второй процесс ждет, пока первый закончит загрузку,
+    после чего функция, как правило, находит свежие данные в общем хранилище.
+
+    Атрибуты:
+        lock_dir (str | None): Директория файлов блокировки. None отключает межпроцессный режим.
+        counters (dict): Счетчики:
+            - 'calls': всего вызовов do()
+            - 'executed': вызовов, выполненных ведущим потоком
+            - 'coalesced': вызовов, объединенных с уже выполняющимся в этом процессе
+            - 'process_waits': ожиданий блокировки, занятой другим процессом
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = str(lock_dir) if lock_dir and fcntl is not None else None
+        self.counters = {'calls': 0, 'executed': 0, 'coalesced': 0, 'process_waits': 0}
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Выполняет fn(*args, **kwargs) не более одного раза для одновременных вызовов с ключом key.
+
+        Аргументы:
+            key (str): Ключ объединения, например 'AAPL:1y'.
+            fn (callable): Выполняемая функция.
+
+        Возвращает:
+            object: Результат fn, общий для всех объединенных вызовов.
+
+        Пример:
+            >>> flight = SingleFlight()
+            >>> flight.do('AAPL:1y', fetch, 'AAPL')
+        """
+        with self._lock:
+            self.counters['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.counters['executed'] += 1
+            else:
+                self.counters['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._process_lock(key):
+                call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    @contextmanager
+    def _process_lock(self, key):
+        # Эксклюзивная файловая блокировка, общая для всех процессов на хосте
+        if self.lock_dir is None:
+            yield
+            return
+
+        makedirs(self.lock_dir, exist_ok=True)
+        lock_name = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.lock'
+        with open(path.join(self.lock_dir, lock_name), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                with self._lock:
+                    self.counters['process_waits'] += 1
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self):
+        """
+        Возвращает копию счетчиков объединения вызовов.
+
+        Возвращает:
+            dict: Значения счетчиков на текущий момент.
+        """
+        with self._lock:
+            return dict(self.counters)
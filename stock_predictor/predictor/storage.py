@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from os import path, makedirs
+
+import numpy as np
+
+# Схема локального хранилища дневных баров.
+# Одна строка - один бар тикера, время хранится в секундах Unix (UTC).
+# Таблица meta хранит, с какой даты история по тикеру полная и когда она обновлялась.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL NOT NULL,
+    volume REAL,
+    PRIMARY KEY (ticker, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    ticker TEXT PRIMARY KEY,
+    covered_from INTEGER NOT NULL,
+    refreshed_at REAL NOT NULL,
+    tz TEXT
+);
+"""
+
+# Колонки OHLCV в порядке хранения
+OHLCV_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+class PriceStore:
+    """
+    Персистентное хранилище дневных баров OHLCV на SQLite.
+
+    Запись выполняется одной транзакцией BEGIN IMMEDIATE, поэтому она атомарна
+    и безопасна при одновременной работе нескольких процессов-воркеров
+    (SQLite в режиме WAL сериализует писателей и не блокирует читателей).
+    Каждый поток и каждый процесс работает через собственное соединение.
+
+    Атрибуты:
+        db_path (str): Путь к файлу базы данных.
+        timeout (float): Время ожидания блокировки базы в секундах.
+    """
+
+    def __init__(self, db_path, timeout=30.0):
+        self.db_path = str(db_path)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        # Соединение, унаследованное через fork, использовать нельзя - открываем новое
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            makedirs(path.dirname(path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def meta(self, ticker):
+        """
+        Возвращает метаданные тикера.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+
+        Возвращает:
+            dict | None: Словарь с ключами 'covered_from', 'refreshed_at', 'tz', 'last_ts'
+            и 'last_close' (время и цена закрытия последнего бара) или None, если тикер
+            еще не загружался.
+        """
+        row = self._connect().execute(
+            'SELECT m.covered_from, m.refreshed_at, m.tz, b.ts, b.close FROM meta m '
+            'LEFT JOIN bars b ON b.ticker = m.ticker '
+            'AND b.ts = (SELECT MAX(ts) FROM bars WHERE ticker = m.ticker) '
+            'WHERE m.ticker = ?', (ticker,)).fetchone()
+        if row is None:
+            return None
+        return {'covered_from': row[0], 'refreshed_at': row[1], 'tz': row[2], 'last_ts': row[3],
+                'last_close': row[4]}
+
+    def write(self, ticker, frame, covered_from=None):
+        """
+        Атомарно сохраняет бары тикера и обновляет его метаданные.
+
+        Существующие бары с теми же датами перезаписываются, поэтому незакрытый
+        последний бар при следующем обновлении заменяется актуальным.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            frame (pandas.DataFrame): Бары OHLCV с индексом pandas.DatetimeIndex.
+            covered_from (float, опционально): Время (Unix), начиная с которого история
+                по тикеру теперь полная. Используется после полной загрузки периода.
+        """
+        rows = []
+        tz = None
+        if frame is not None and len(frame):
+            # Разрешение индекса зависит от источника и версии pandas (нс, мкс), приводим к секундам
+            timestamps = frame.index.as_unit('s').asi8
+            columns = [frame[name].to_numpy(dtype=float) if name in frame else np.full(len(frame), np.nan)
+                       for name in OHLCV_COLUMNS]
+            # Бары без цены закрытия (бывают у yfinance в дни без торгов) не сохраняем
+            rows = [(ticker, int(ts), *(float(column[i]) for column in columns))
+                    for i, ts in enumerate(timestamps) if not np.isnan(columns[3][i])]
+            tz = str(frame.index.tz) if frame.index.tz is not None else None
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT OR REPLACE INTO bars (ticker, ts, open, high, low, close, volume) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            conn.execute(
+                'INSERT INTO meta (ticker, covered_from, refreshed_at, tz) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(ticker) DO UPDATE SET '
+                'covered_from = MIN(meta.covered_from, excluded.covered_from), '
+                'refreshed_at = excluded.refreshed_at, '
+                'tz = COALESCE(excluded.tz, meta.tz)',
+                (ticker, int(covered_from if covered_from is not None else time.time()), time.time(), tz))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def read(self, ticker, since=None):
+        """
+        Читает сохраненные бары тикера в хронологическом порядке.
+
+        Аргументы:
+            ticker (str): Тикер акции.
+            since (float, опционально): Время (Unix), начиная с которого нужны бары.
+
+        Возвращает:
+            tuple: Кортеж, содержащий два элемента:
+                - timestamps (numpy.ndarray): Время баров в секундах Unix (int64)
+                - bars (numpy.ndarray): Матрица OHLCV формы (n, 5)
+        """
+        rows = self._connect().execute(
+            'SELECT ts, open, high, low, close, volume FROM bars '
+            'WHERE ticker = ? AND ts >= ? ORDER BY ts', (ticker, int(since or 0))).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS)))
+        data = np.array(rows, dtype=float)
+        return data[:, 0].astype(np.int64), data[:, 1:]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_price_store(db_path=None):
+    """
+    Возвращает общий для процесса экземпляр PriceStore.
+
+    Аргументы:
+        db_path (str, опционально): Путь к базе. По умолчанию берется из настройки PRICE_STORE_PATH.
+
+    Возвращает:
+        PriceStore: Хранилище истории цен.
+    """
+    if db_path is None:
+        from django.conf import settings
+        db_path = settings.PRICE_STORE_PATH
+    db_path = str(db_path)
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _stores[db_path] = PriceStore(db_path)
+        return store
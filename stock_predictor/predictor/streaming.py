@@ -0,0 +1,205 @@
+import threading
+
+import numpy as np
+
+from .forecasting import FORECAST_METHODS, HORIZON_DAYS, MA_WINDOW, TREND_WINDOW
+
+
+class IncrementalForecaster:
+    """
+    Потоковый прогноз с постоянным временем обновления.
+
+    Хранит только кольцевой буфер последних цен окна метода (30 для скользящего
+    среднего, 90 для тренда) и текущие суммы Σy и Σx·y, поэтому добавление бара
+    или обновление текущего бара внутри дня стоит O(1). Суммы пересчитываются
+    по буферу после каждых window обновлений (новых баров и замен последнего бара),
+    чтобы ошибка округления не накапливалась; это добавляет амортизированно O(1).
+
+    Прогноз не побитово равен moving_average() по той же истории: суммы обновляются
+    в другом порядке, поэтому расхождение составляет порядка 1e-13..1e-11 для цен
+    около 100 (относительная погрешность не больше ~1e-12). Сравнивайте результаты
+    через numpy.allclose.
+
+    Атрибуты:
+        method (str): Метод прогнозирования из FORECAST_METHODS.
+        horizon (int): Горизонт прогноза в днях.
+        count (int): Количество полученных баров.
+        last_date (object): Дата последнего бара (если передавалась).
+    """
+
+    def __init__(self, method='moving_average', horizon=HORIZON_DAYS):
+        if method not in FORECAST_METHODS:
+            raise ValueError(f'Неизвестный метод прогнозирования: {method}')
+        self.method = method
+        self.horizon = horizon
+        self.count = 0
+        self.last_date = None
+
+        self._window = {'moving_average': MA_WINDOW, 'recent_trend': TREND_WINDOW}.get(method, 1)
+        self._buffer = [0.0] * self._window
+        self._head = 0          # Позиция самой старой цены в буфере
+        self._size = 0          # Количество цен в буфере
+        self._sum_y = 0.0
+        self._sum_xy = 0.0      # Σ x·y, где x - номер цены в окне (0 - самая старая)
+        self._since_resync = 0
+
+    @classmethod
+    def from_history(cls, prices, method='moving_average', horizon=HORIZON_DAYS, last_date=None):
+        """
+        Создает прогнозатор по уже известной истории цен.
+
+        Аргументы:
+            prices (numpy.ndarray): Исторические цены формы (n,) или (n, 1).
+            method (str, опционально): Метод прогнозирования.
+            horizon (int, опционально): Горизонт прогноза в днях.
+            last_date (object, опционально): Дата последней цены истории.
+
+        Возвращает:
+            IncrementalForecaster: Прогнозатор, готовый принимать новые бары.
+        """
+        forecaster = cls(method, horizon)
+        values = np.asarray(prices, dtype=float).ravel()
+        for price in values[-forecaster._window:]:
+            forecaster._push(float(price))
+        forecaster.count = len(values)
+        forecaster.last_date = last_date
+        forecaster._resync()
+        return forecaster
+
+    def append(self, price, date=None):
+        """
+        Добавляет бар и возвращает обновленный прогноз.
+
+        Если date совпадает с датой последнего бара, бар считается обновлением
+        текущего дня (новый тик) и заменяет последнюю цену, а не добавляется.
+
+        Аргументы:
+            price (float): Цена закрытия (или последняя цена внутри дня).
+            date (object, опционально): Дата бара.
+
+        Возвращает:
+            float: Прогнозируемая цена.
+
+        Пример:
+            >>> forecaster = IncrementalForecaster('recent_trend')
+            >>> forecaster.append(101.5, date(2025, 1, 2))
+        """
+        price = float(price)
+        if date is not None and date == self.last_date and self._size:
+            return self.replace_last(price)
+
+        self._push(price)
+        self.count += 1
+        self.last_date = date
+        self._count_update()
+        return self.forecast
+
+    def replace_last(self, price):
+        """
+        Заменяет цену последнего бара (обновление внутри дня) и возвращает прогноз.
+        """
+        price = float(price)
+        position = (self._head + self._size - 1) % self._window
+        delta = price - self._buffer[position]
+        self._buffer[position] = price
+        self._sum_y += delta
+        self._sum_xy += (self._size - 1) * delta
+        self._count_update()
+        return self.forecast
+
+    def consume(self, bars):
+        """
+        Обрабатывает поток баров и выдает прогноз после каждого из них.
+
+        Аргументы:
+            bars (iterable): Цены или кортежи (дата, цена), например генератор тиков.
+
+        Возвращает:
+            generator: Прогноз после каждого бара.
+        """
+        for bar in bars:
+            if isinstance(bar, tuple):
+                date, price = bar
+                yield self.append(price, date)
+            else:
+                yield self.append(bar)
+
+    @property
+    def forecast(self):
+        """
+        Текущий прогноз (NaN, пока не получено ни одного бара).
+        """
+        if not self._size:
+            return float('nan')
+        last_price = self._buffer[(self._head + self._size - 1) % self._window]
+
+        if self.method == 'moving_average':
+            return self._sum_y / self._size
+
+        if self.method == 'recent_trend' and self.count > TREND_WINDOW:
+            width = self._size
+            sum_x = width * (width - 1) / 2
+            sum_xx = (width - 1) * width * (2 * width - 1) / 6
+            slope = (width * self._sum_xy - sum_x * self._sum_y) / (width * sum_xx - sum_x ** 2)
+            intercept = (self._sum_y - slope * sum_x) / width
+            return intercept + slope * (width + self.horizon)
+
+        return last_price
+
+    def _push(self, price):
+        if self._size < self._window:
+            self._buffer[(self._head + self._size) % self._window] = price
+            self._sum_xy += self._size * price
+            self._sum_y += price
+            self._size += 1
+            return
+
+        # Окно заполнено: самая старая цена уходит, остальные сдвигаются на одну позицию влево
+        oldest = self._buffer[self._head]
+        self._buffer[self._head] = price
+        self._head = (self._head + 1) % self._window
+        self._sum_xy += -(self._sum_y - oldest) + (self._window - 1) * price
+        self._sum_y += price - oldest
+
+    def _count_update(self):
+        # Каждое инкрементальное изменение сумм приближает очередной точный пересчет
+        self._since_resync += 1
+        if self._since_resync >= self._window:
+            self._resync()
+
+    def _resync(self):
+        # Точный пересчет сумм по буферу в хронологическом порядке
+        values = [self._buffer[(self._head + i) % self._window] for i in range(self._size)]
+        self._sum_y = sum(values)
+        self._sum_xy = sum(i * value for i, value in enumerate(values))
+        self._since_resync = 0
+
+
+_forecasters = {}
+_forecasters_lock = threading.Lock()
+
+
+def get_forecaster(ticker, method='moving_average'):
+    """
+    Возвращает потоковый прогнозатор тикера, инициализированный историей из get_stock_data().
+
+    Аргументы:
+        ticker (str): Тикер акции.
+        method (str, опционально): Метод прогнозирования.
+
+    Возвращает:
+        IncrementalForecaster: Прогнозатор, общий для процесса. Вызовы append() для
+        одного прогнозатора из разных потоков нужно синхронизировать снаружи.
+    """
+    from .services import get_stock_data
+
+    key = (ticker, method)
+    with _forecasters_lock:
+        forecaster = _forecasters.get(key)
+    if forecaster is None:
+        prices, dates = get_stock_data(ticker)
+        forecaster = IncrementalForecaster.from_history(
+            prices, method, last_date=dates[-1].date() if len(dates) else None)
+        with _forecasters_lock:
+            forecaster = _forecasters.setdefault(key, forecaster)
+    return forecaster
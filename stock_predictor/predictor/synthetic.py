@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_history(n_days, seed=0, start_price=100.0, end=None, tz='America/New_York'):
+    """
+    Генерирует синтетическую историю дневных баров (геометрическое броуновское движение).
+
+    Используется в бенчмарках и офлайн-тестах вместо реальных данных yfinance.
+
+    Аргументы:
+        n_days (int): Количество торговых дней.
+        seed (int, опционально): Зерно генератора случайных чисел. По умолчанию 0.
+        start_price (float, опционально): Начальная цена. По умолчанию 100.0.
+        end (str | pandas.Timestamp, опционально): Дата последнего бара. По умолчанию сегодня.
+        tz (str, опционально): Часовой пояс дат, как у yfinance. По умолчанию 'America/New_York'.
+
+    Возвращает:
+        pandas.DataFrame: Бары OHLCV с индексом pandas.DatetimeIndex.
+
+    Пример:
+        >>> frame = synthetic_history(252, seed=42)
+    """
+    rng = np.random.default_rng(seed)
+    closes = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n_days)))
+    opens = np.concatenate(([start_price], closes[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.01, n_days)) * closes
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize()
+    if end.tz is not None:
+        end = end.tz_localize(None)
+    dates = pd.bdate_range(end=end, periods=n_days).tz_localize(tz)
+    return pd.DataFrame({
+        'Open': opens,
+        'High': np.maximum(opens, closes) + spread,
+        'Low': np.minimum(opens, closes) - spread,
+        'Close': closes,
+        'Volume': rng.integers(10 ** 5, 10 ** 7, n_days).astype(float),
+    }, index=dates)
+
+
+def synthetic_prices(n_days, seed=0, start_price=100.0):
+    """
+    Возвращает синтетическую историю в формате get_stock_data().
+
+    Аргументы:
+        n_days (int): Количество торговых дней.
+        seed (int, опционально): Зерно генератора случайных чисел.
+        start_price (float, опционально): Начальная цена.
+
+    Возвращает:
+        tuple: Кортеж (prices, dates) - массив цен формы (n, 1) и pandas.DatetimeIndex.
+    """
+    frame = synthetic_history(n_days, seed=seed, start_price=start_price)
+    return frame['Close'].to_numpy().reshape(-1, 1), frame.index
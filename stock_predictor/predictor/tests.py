@@ -1,12 +1,588 @@
-from django.test import TestCase
-
-# Модуль для написания unit-тестов приложения
-# Рекомендуется добавлять тесты для:
-# - Проверки корректности получения данных акций
-# - Тестирования алгоритмов прогнозирования
-# - Проверки представлений и маршрутов
-# Пример теста:
-# class StockPredictionTestCase(TestCase):
-#     def test_get_stock_data(self):
-#         prices, dates = get_stock_data('AAPL')
-#         self.assertGreater(len(prices), 0)
\ No newline at end of file
+from datetime import datetime, timezone as dt_timezone
+import time
+from concurrent.futures import Future
+from io import StringIO
+from os import path
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from . import model_cache, services
+from .backtesting import backtest, rolling_forecasts
+from .benchmarks import isolated_environment
+from .forecasting import FORECAST_METHODS, batch_forecast, batch_forecast_grid, fit_trend, forecast_grid, stack_prices
+from .metrics import MetricsRegistry
+from .model_cache import ModelRegistry
+from .plot_cache import get_plot_cache, plot_key
+from .plot_worker import PlotWorkerPool
+from .precompute import precompute_chunk
+from .providers import (InMemoryProvider, ProviderError, RateLimiter, TransientProviderError, get_provider,
+                        set_provider)
+from .resampling import DOWNSAMPLE_METHODS, downsample, resample_ohlc
+from .services import get_stock_data, moving_average
+from .shared_prices import build_price_matrix
+from .streaming import IncrementalForecaster
+from .synthetic import synthetic_history
+
+# Модуль unit-тестов приложения. Сеть не используется: данные подставляются
+# фейковыми провайдерами (InMemoryProvider) и временными хранилищами.
+
+
+def _unix(year, month, day, tz='UTC'):
+    # Время начала местного дня в секундах Unix
+    return int(datetime(year, month, day, tzinfo=ZoneInfo(tz)).astimezone(dt_timezone.utc).timestamp())
+
+
+def _bars(closes):
+    # Матрица OHLCV (n, 5) с ценой закрытия closes
+    closes = np.asarray(closes, dtype=float)
+    return np.column_stack([closes, closes + 1, closes - 1, closes, np.ones_like(closes)])
+
+
+class ResampleOHLCTestCase(SimpleTestCase):
+    def test_weekly_bars_use_exchange_timezone(self):
+        # Понедельник 00:00 JST - еще воскресенье по UTC: без учета часового пояса
+        # пятница и понедельник попали бы в одну неделю
+        timestamps = np.array([_unix(2025, 1, 3, 'Asia/Tokyo'), _unix(2025, 1, 6, 'Asia/Tokyo')], dtype=np.int64)
+        weekly_ts, weekly_bars = resample_ohlc(timestamps, _bars([10, 20]), 'weekly', tz='Asia/Tokyo')
+        self.assertEqual(list(weekly_ts), list(timestamps))
+        self.assertEqual(list(weekly_bars[:, 3]), [10, 20])
+
+    def test_monthly_bars_use_exchange_timezone(self):
+        timestamps = np.array([_unix(2025, 1, 31, 'Asia/Tokyo'), _unix(2025, 2, 1, 'Asia/Tokyo'),
+                               _unix(2025, 2, 3, 'Asia/Tokyo')], dtype=np.int64)
+        monthly_ts, monthly_bars = resample_ohlc(timestamps, _bars([1, 2, 3]), 'monthly', tz='Asia/Tokyo')
+        self.assertEqual(len(monthly_ts), 2)
+        self.assertEqual(list(monthly_bars[:, 0]), [1, 2])
+        self.assertEqual(list(monthly_bars[:, 3]), [1, 3])
+
+    def test_weekly_bars_aggregate_ohlcv(self):
+        # Неделя с понедельника 6 января по пятницу 10 января (Нью-Йорк)
+        timestamps = np.array([_unix(2025, 1, day, 'America/New_York') for day in (6, 7, 8, 9, 10, 13)],
+                              dtype=np.int64)
+        closes = [10, 12, 9, 11, 13, 14]
+        weekly_ts, weekly_bars = resample_ohlc(timestamps, _bars(closes), 'weekly', tz='America/New_York')
+        self.assertEqual(list(weekly_ts), [timestamps[4], timestamps[5]])
+        np.testing.assert_array_equal(weekly_bars[0], [10, 14, 8, 13, 5])
+
+
+class DownsampleTestCase(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.y = 100 + np.cumsum(rng.normal(0, 1, 5000))
+        self.x = np.arange(len(self.y)) * 86400
+
+    def test_result_never_exceeds_n_out(self):
+        for method in DOWNSAMPLE_METHODS:
+            for n_out in list(range(1, 40)) + [100, 1000]:
+                with self.subTest(method=method, n_out=n_out):
+                    indices = downsample(self.x, self.y, n_out, method)
+                    self.assertLessEqual(len(indices), n_out)
+                    self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_extremes_are_preserved(self):
+        for method in ('minmax_lttb', 'minmax'):
+            indices = downsample(self.x, self.y, 500, method)
+            self.assertIn(int(self.y.argmin()), indices)
+            self.assertIn(int(self.y.argmax()), indices)
+
+    def test_short_series_is_returned_unchanged(self):
+        np.testing.assert_array_equal(downsample(self.x[:10], self.y[:10], 50), np.arange(10))
+
+
+class ModelRegistryTestCase(SimpleTestCase):
+    def test_changed_window_with_same_end_date_is_refitted(self):
+        # Обновление незакрытого дня: дата та же, последняя цена другая. Другой процесс
+        # не получает invalidate(), поэтому новое окно должно давать новый ключ
+        registry = ModelRegistry()
+        window = np.linspace(100, 110, 90)
+        updated = window.copy()
+        updated[-1] = 120
+        first = registry.get_or_fit('AAPL', 'recent_trend', '2025-01-03', 90, lambda: fit_trend(window), data=window)
+        second = registry.get_or_fit('AAPL', 'recent_trend', '2025-01-03', 90, lambda: fit_trend(updated),
+                                     data=updated)
+        self.assertNotAlmostEqual(first[0], second[0])
+        self.assertEqual(registry.stats()['misses'], 2)
+
+    def test_same_window_is_served_from_cache(self):
+        registry = ModelRegistry()
+        window = np.linspace(100, 110, 90)
+        for _ in range(3):
+            registry.get_or_fit('AAPL', 'recent_trend', '2025-01-03', 90, lambda: fit_trend(window), data=window)
+        self.assertEqual(registry.stats()['misses'], 1)
+        self.assertEqual(registry.stats()['hits'], 2)
+
+
+class FailingProvider(InMemoryProvider):
+    """
+    Фейковый провайдер, первые failures запросов которого завершаются ошибкой error.
+
+    По умолчанию ошибка временная и повторяется бесконечно.
+    """
+
+    def __init__(self, frames, failures=None, error=None, **options):
+        super().__init__(frames, **options)
+        self.failures = failures
+        self.error = error or TransientProviderError('сеть недоступна')
+
+    def _fetch(self, ticker, period, start):
+        frame = super()._fetch(ticker, period, start)
+        if self.failures is None or len(self.calls) <= self.failures:
+            raise self.error
+        return frame
+
+
+class FakeClock:
+    """
+    Подменные часы: sleep() не ждет, а сдвигает время и запоминает паузы.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class ProviderRetryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.frames = {'TEST': synthetic_history(30, seed=1)}
+        self.clock = FakeClock()
+
+    def provider(self, **options):
+        return FailingProvider(self.frames, clock=self.clock, sleep=self.clock.sleep, **options)
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        provider = self.provider(failures=2, retries=3, backoff=0.5, max_backoff=30.0)
+        frame = provider.history('TEST', period='1y')
+        self.assertEqual(len(frame), 30)
+        self.assertEqual(len(provider.calls), 3)
+        self.assertEqual(provider.stats()['retries'], 2)
+        self.assertEqual(provider.stats()['failures'], 0)
+        # Пауза перед повтором attempt не превышает base * 2 ** attempt (full jitter)
+        self.assertEqual(len(self.clock.slept), 2)
+        for attempt, delay in enumerate(self.clock.slept):
+            self.assertTrue(0 <= delay <= 0.5 * 2 ** attempt)
+
+    def test_retries_are_exhausted(self):
+        provider = self.provider(retries=2)
+        with self.assertRaises(TransientProviderError):
+            provider.history('TEST', period='1y')
+        self.assertEqual(len(provider.calls), 3)
+        self.assertEqual(provider.stats()['failures'], 1)
+        self.assertEqual(len(self.clock.slept), 2)
+
+    def test_retry_after_is_respected(self):
+        provider = self.provider(failures=1, retries=1, backoff=0.01,
+                                 error=TransientProviderError('429', retry_after=5.0))
+        provider.history('TEST', period='1y')
+        self.assertEqual(self.clock.slept, [5.0])
+
+    def test_permanent_errors_are_not_retried(self):
+        provider = self.provider(failures=1, retries=3, error=ProviderError('неизвестный тикер'))
+        with self.assertRaises(ProviderError):
+            provider.history('TEST', period='1y')
+        self.assertEqual(len(provider.calls), 1)
+        self.assertEqual(self.clock.slept, [])
+        self.assertEqual(provider.stats()['failures'], 1)
+
+    def test_provider_requests_are_rate_limited(self):
+        provider = self.provider(failures=0, rate=10, burst=2)
+        for _ in range(5):
+            provider.history('TEST', period='1y')
+        self.assertEqual(len(provider.calls), 5)
+        # Первые два запроса проходят сразу, остальные ждут по 0.1 с
+        self.assertAlmostEqual(sum(self.clock.slept), 0.3)
+        self.assertAlmostEqual(provider.stats()['throttled_seconds'], 0.3)
+
+
+class RateLimiterTestCase(SimpleTestCase):
+    def test_token_bucket(self):
+        clock = FakeClock()
+        limiter = RateLimiter(2, burst=3, clock=clock, sleep=clock.sleep)
+        # Всплеск до burst проходит без ожидания, затем токены выдаются с частотой rate
+        self.assertEqual([limiter.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+        # За время простоя корзина наполняется, но не больше burst
+        clock.now += 60
+        self.assertEqual([limiter.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(limiter.acquire(), 0.5)
+
+
+class StockDataStoreTestCase(SimpleTestCase):
+    """
+    get_stock_data() поверх временного PriceStore и InMemoryProvider (см. isolated_environment).
+    """
+
+    def setUp(self):
+        self.full = synthetic_history(400, seed=7)
+        # В хранилище сначала попадает история без последних пяти дней
+        self.frames = {'TEST': self.full.iloc[:-5]}
+
+    def test_cold_fetch_loads_period_and_stores_it(self):
+        with isolated_environment(self.frames):
+            prices, dates = get_stock_data('TEST', years=1)
+            provider = get_provider()
+            self.assertEqual(provider.calls, [('TEST', '1y', None)])
+            expected = self.frames['TEST'].loc[self.frames['TEST'].index >= dates[0], 'Close'].to_numpy()
+            np.testing.assert_allclose(prices.ravel(), expected)
+            self.assertEqual(dates[-1], self.frames['TEST'].index[-1])
+
+    def test_store_covering_range_skips_provider(self):
+        with isolated_environment(self.frames):
+            first, _ = get_stock_data('TEST', years=1)
+            second, _ = get_stock_data('TEST', years=1)
+            self.assertEqual(len(get_provider().calls), 1)
+            np.testing.assert_array_equal(first, second)
+
+    def test_stale_store_is_topped_up_incrementally(self):
+        with isolated_environment(self.frames):
+            get_stock_data('TEST', years=1)
+            provider = get_provider()
+            provider.frames['TEST'] = self.full
+            with override_settings(PRICE_STORE_REFRESH_INTERVAL=0):
+                prices, dates = get_stock_data('TEST', years=1)
+            ticker, period, start = provider.calls[-1]
+            # Дозагрузка начинается с последнего сохраненного дня, а не со всего периода
+            self.assertEqual(start, self.frames['TEST'].index[-1].date())
+            self.assertEqual(dates[-1], self.full.index[-1])
+            self.assertAlmostEqual(float(prices[-1][0]), float(self.full['Close'].iloc[-1]))
+
+    def test_provider_failure_falls_back_to_stored_history(self):
+        with isolated_environment(self.frames):
+            stored, stored_dates = get_stock_data('TEST', years=1)
+            failing = FailingProvider(self.frames, retries=0)
+            set_provider(failing)
+            with override_settings(PRICE_STORE_REFRESH_INTERVAL=0):
+                prices, dates = get_stock_data('TEST', years=1)
+            self.assertEqual(len(failing.calls), 1)
+            np.testing.assert_array_equal(prices, stored)
+            self.assertEqual(dates[-1], stored_dates[-1])
+
+    def test_failed_full_reload_falls_back_to_shorter_history(self):
+        with isolated_environment(self.frames):
+            stored, stored_dates = get_stock_data('TEST', years=1)
+            failing = FailingProvider(self.frames, retries=0)
+            set_provider(failing)
+            # Запрошено два года, а сохранен один: нужна полная загрузка, но провайдер недоступен
+            prices, dates = get_stock_data('TEST', years=2)
+            self.assertEqual(failing.calls, [('TEST', '2y', None)])
+            # Отдается все сохраненное: однолетнее окно - хвост ответа
+            np.testing.assert_array_equal(prices[-len(stored):], stored)
+            self.assertEqual(dates[-1], stored_dates[-1])
+
+    def test_failed_cold_fetch_raises(self):
+        with isolated_environment(self.frames):
+            set_provider(FailingProvider(self.frames, retries=0))
+            with self.assertRaises(TransientProviderError):
+                get_stock_data('TEST', years=1)
+
+
+class SharedPriceMatrixTestCase(SimpleTestCase):
+    """
+    get_stock_data() читает общую матрицу цен, только пока она совпадает с хранилищем.
+    """
+
+    def setUp(self):
+        self.full = synthetic_history(400, seed=5)
+        self.frames = {'TEST': self.full.iloc[:-5]}
+
+    def build_matrix(self, directory):
+        shared_dir = path.join(directory, 'shared')
+        build_price_matrix(['TEST'], shared_dir)
+        return override_settings(SHARED_PRICES_DIR=shared_dir)
+
+    def test_current_matrix_is_used(self):
+        with isolated_environment(self.frames) as directory:
+            stored, stored_ts = get_stock_data('TEST', years=1, as_arrays=True)
+            with self.build_matrix(directory):
+                prices, timestamps = get_stock_data('TEST', years=1, as_arrays=True)
+            self.assertIsInstance(timestamps, np.memmap)
+            # По умолчанию матрица хранит float64: значения совпадают с хранилищем точно
+            self.assertEqual(prices.dtype, np.float64)
+            np.testing.assert_array_equal(timestamps, stored_ts)
+            np.testing.assert_array_equal(prices, stored)
+
+    def test_pandas_callers_read_the_store(self):
+        # Страница и API не зависят от наличия матрицы: прогнозы и ключи графиков те же
+        with isolated_environment(self.frames) as directory:
+            stored, stored_dates = get_stock_data('TEST', years=1)
+            with self.build_matrix(directory):
+                prices, dates = get_stock_data('TEST', years=1)
+            self.assertNotIsInstance(prices.base, np.memmap)
+            self.assertTrue(prices.flags.writeable)
+            np.testing.assert_array_equal(prices, stored)
+            self.assertTrue(dates.equals(stored_dates))
+
+    def test_matrix_behind_store_is_bypassed(self):
+        with isolated_environment(self.frames) as directory:
+            get_stock_data('TEST', years=1)
+            with self.build_matrix(directory):
+                get_provider().frames['TEST'] = self.full
+                with override_settings(PRICE_STORE_REFRESH_INTERVAL=0):
+                    prices, timestamps = get_stock_data('TEST', years=1, as_arrays=True)
+            self.assertNotIsInstance(timestamps, np.memmap)
+            self.assertEqual(timestamps[-1], int(self.full.index[-1].timestamp()))
+            self.assertAlmostEqual(float(prices[-1][0]), float(self.full['Close'].iloc[-1]))
+
+    def test_same_day_update_is_not_served_from_matrix(self):
+        # Незакрытый день: время последнего бара то же, цена закрытия другая
+        updated = self.frames['TEST'].copy()
+        updated.iloc[-1, updated.columns.get_loc('Close')] += 1
+        with isolated_environment(self.frames) as directory:
+            get_stock_data('TEST', years=1)
+            with self.build_matrix(directory):
+                get_provider().frames['TEST'] = updated
+                with override_settings(PRICE_STORE_REFRESH_INTERVAL=0):
+                    prices, timestamps = get_stock_data('TEST', years=1, as_arrays=True)
+            self.assertNotIsInstance(timestamps, np.memmap)
+            self.assertAlmostEqual(float(prices[-1][0]), float(updated['Close'].iloc[-1]))
+
+    def test_longer_period_than_matrix_is_read_from_store(self):
+        with isolated_environment(self.frames) as directory:
+            get_stock_data('TEST', years=1)
+            with self.build_matrix(directory):
+                prices, timestamps = get_stock_data('TEST', years=2, as_arrays=True)
+            self.assertNotIsInstance(timestamps, np.memmap)
+            self.assertEqual(len(prices), len(self.frames['TEST']))
+
+
+class IsolatedEnvironmentTestCase(SimpleTestCase):
+    def test_fetch_coalescing_and_model_registry_are_isolated(self):
+        previous_flight = services.history_flight
+        previous_registry = model_cache.get_model_registry()
+        with isolated_environment({'TEST': synthetic_history(300, seed=2)}) as directory:
+            self.assertIsNot(services.history_flight, previous_flight)
+            self.assertEqual(services.history_flight.lock_dir, path.join(directory, 'locks'))
+            registry = model_cache.get_model_registry()
+            self.assertIsNot(registry, previous_registry)
+            self.assertIsNone(registry.backend)
+            prices, dates = get_stock_data('TEST')
+            moving_average(prices, method='recent_trend', ticker='TEST', end_date=dates[-1])
+            self.assertEqual(services.history_flight.stats()['executed'], 1)
+            self.assertEqual(registry.stats()['misses'], 1)
+        self.assertIs(services.history_flight, previous_flight)
+        self.assertIs(model_cache.get_model_registry(), previous_registry)
+
+
+class BatchForecastTestCase(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        # Истории разной длины: короче окна среднего, короче окна тренда и длинные
+        self.series = [(100 + np.cumsum(rng.normal(0, 1, length))).reshape(-1, 1)
+                       for length in (10, 45, 91, 252, 600)]
+
+    def test_batch_matches_per_ticker_moving_average(self):
+        forecasts = batch_forecast(stack_prices(self.series))
+        for method in FORECAST_METHODS:
+            expected = [moving_average(prices, method=method) for prices in self.series]
+            with self.subTest(method=method):
+                np.testing.assert_allclose(forecasts[method], expected, rtol=1e-10)
+
+    def test_batch_grid_matches_per_ticker_grid(self):
+        horizons = (1, 5, 30, 90)
+        grid = batch_forecast_grid(stack_prices(self.series), horizons=horizons)
+        for row, prices in enumerate(self.series):
+            expected = forecast_grid(prices, horizons=horizons)
+            for method in FORECAST_METHODS:
+                with self.subTest(row=row, method=method):
+                    np.testing.assert_allclose([grid[method][h][row] for h in horizons],
+                                               [expected[method][h] for h in horizons], rtol=1e-10)
+
+    def test_precomputed_price_comes_from_the_grid(self):
+        frames = {f'T{i}': synthetic_history(length, seed=i) for i, length in enumerate((60, 300))}
+        with isolated_environment(frames):
+            rows, errors = precompute_chunk(list(frames), FORECAST_METHODS, with_plots=False)
+            self.assertEqual(errors, {})
+            for row in rows:
+                with self.subTest(ticker=row['ticker'], method=row['method']):
+                    # Один источник числа: прогноз строки и горизонт 30 ее сетки совпадают
+                    self.assertEqual(row['predicted_price'], row['grid'][row['method']]['30'])
+                    prices, _ = get_stock_data(row['ticker'])
+                    self.assertAlmostEqual(row['predicted_price'], moving_average(prices, method=row['method']),
+                                           places=8)
+
+    def test_trend_matches_polyfit(self):
+        forecasts = batch_forecast(stack_prices(self.series), methods=['recent_trend'])
+        for row, prices in enumerate(self.series):
+            window = prices.ravel()[-90:]
+            if len(prices) > 90:
+                slope, intercept = np.polyfit(np.arange(90), window, 1)
+                expected = intercept + slope * (90 + 30)
+            else:
+                expected = window[-1]
+            self.assertAlmostEqual(forecasts['recent_trend'][row], expected, places=8)
+
+
+class IncrementalForecasterTestCase(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.prices = 100 + np.cumsum(rng.normal(0, 1, 400))
+        self.ticks = 100 + rng.normal(0, 1, 1000)
+
+    def test_streaming_matches_batch(self):
+        for method in FORECAST_METHODS:
+            forecaster = IncrementalForecaster.from_history(self.prices[:100], method)
+            for price in self.prices[100:]:
+                forecaster.append(price)
+            expected = batch_forecast(self.prices.reshape(1, -1), methods=[method])[method][0]
+            with self.subTest(method=method):
+                # Суммы обновляются в другом порядке: совпадение с точностью до ~1e-12
+                self.assertTrue(np.allclose(forecaster.forecast, expected, rtol=1e-10, atol=0))
+
+    def test_intraday_replacements_resync(self):
+        # Многократная замена последнего бара внутри дня не накапливает ошибку округления
+        for method in ('moving_average', 'recent_trend'):
+            forecaster = IncrementalForecaster.from_history(self.prices, method, last_date='2025-01-02')
+            for price in self.ticks:
+                forecaster.append(price, '2025-01-02')
+            history = self.prices.copy()
+            history[-1] = self.ticks[-1]
+            expected = batch_forecast(history.reshape(1, -1), methods=[method])[method][0]
+            with self.subTest(method=method):
+                self.assertTrue(np.allclose(forecaster.forecast, expected, rtol=1e-10, atol=0))
+                self.assertLess(forecaster._since_resync, forecaster._window)
+
+
+class ChartFileTestCase(SimpleTestCase):
+    """
+    Заголовки кэширования chart_file: только у ответов 200 и 304.
+    """
+
+    def store_chart(self):
+        # Кладет график в кэш графиков временного окружения и возвращает его имя
+        cache = get_plot_cache()
+        name = cache.filename('TEST', plot_key('TEST', 'chart'), 'json')
+        temp_path = cache.temp_path(name)
+        with open(temp_path, 'w', encoding='utf-8') as chart:
+            chart.write('{"v":1}')
+        cache.commit(temp_path, name)
+        return name
+
+    def test_chart_is_cacheable(self):
+        with isolated_environment({}):
+            name = self.store_chart()
+            response = self.client.get(f'/chart/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"{name}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_if_none_match_returns_304(self):
+        with isolated_environment({}):
+            name = self.store_chart()
+            response = self.client.get(f'/chart/{name}', HTTP_IF_NONE_MATCH=f'"{name}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], f'"{name}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_missing_chart_is_not_cacheable(self):
+        with isolated_environment({}):
+            missing = self.store_chart().replace('.json', '.svg')
+            # Совпадающий If-None-Match не превращает отсутствующий график в 304
+            for headers in ({}, {'HTTP_IF_NONE_MATCH': f'"{missing}"'}):
+                with self.subTest(headers=headers):
+                    response = self.client.get(f'/chart/{missing}', **headers)
+                    self.assertEqual(response.status_code, 404)
+                    self.assertFalse(response.has_header('ETag'))
+                    self.assertNotIn('immutable', response.get('Cache-Control', ''))
+
+    def test_invalid_name_is_not_cacheable(self):
+        response = self.client.get('/chart/secret.json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertNotIn('immutable', response.get('Cache-Control', ''))
+
+
+class PlotStatusTestCase(SimpleTestCase):
+    """
+    Опрос графика, построенного в фоновом пуле: готовность, ошибка построения и экранирование тикера.
+    """
+
+    def setUp(self):
+        self.name = f'TEST_{plot_key("TEST", "status")}.png'
+
+    def test_failed_render_is_reported(self):
+        with isolated_environment({}):
+            pool = PlotWorkerPool(max_workers=1, max_queue=4)
+            future = Future()
+            future.set_exception(RuntimeError('matplotlib недоступен'))
+            pool._pending.add(self.name)
+            pool._on_done(self.name, time.perf_counter(), future)
+            self.assertTrue(pool.failed(self.name))
+            self.assertEqual(pool.stats()['failed'], 1)
+            status = self.client.get(f'/plot/{self.name}/status/').json()
+        self.assertEqual((status['ready'], status['failed']), (False, True))
+
+    def test_pending_render_is_not_failed(self):
+        with isolated_environment({}):
+            status = self.client.get(f'/plot/{self.name}/status/').json()
+        self.assertEqual((status['ready'], status['failed']), (False, False))
+
+    def test_ticker_is_not_interpolated_into_script(self):
+        ticker = '</script><script>alert(1)</script>'
+        html = render_to_string('predictor/result.html', {
+            'ticker': ticker, 'plot_status_url': f'/plot/{self.name}/status/'})
+        self.assertNotIn(ticker, html)
+        self.assertIn('data-ticker="&lt;/script&gt;&lt;script&gt;alert(1)&lt;/script&gt;"', html)
+
+
+class MetricsRenderTestCase(SimpleTestCase):
+    def test_metric_types(self):
+        metrics = MetricsRegistry()
+        metrics.observe('predictor_stage_seconds', 0.02, stage='fetch')
+        text = metrics.render({'predictor_fetch_calls_total': 3, 'predictor_plot_pool_queue_depth': 1})
+        self.assertIn('# TYPE predictor_stage_seconds histogram', text)
+        self.assertIn('# TYPE predictor_fetch_calls_total counter', text)
+        self.assertIn('# TYPE predictor_plot_pool_queue_depth gauge', text)
+        self.assertIn('predictor_stage_seconds_bucket{stage="fetch",le="0.025"} 1', text)
+
+    def test_metrics_view_exports_counters(self):
+        text = self.client.get('/metrics/').content.decode()
+        self.assertIn('# TYPE predictor_plot_pool_submitted_total counter', text)
+        self.assertIn('# TYPE predictor_model_cache_misses_total counter', text)
+        self.assertIn('# TYPE predictor_plot_pool_queue_depth gauge', text)
+        self.assertIn('# TYPE predictor_model_cache_entries gauge', text)
+
+
+class BacktestTestCase(SimpleTestCase):
+    def setUp(self):
+        self.prices = synthetic_history(600, seed=9)['Close'].to_numpy()
+
+    def test_no_change_forecast_has_no_direction(self):
+        report = backtest(self.prices)
+        # last_price всегда предсказывает нулевое изменение: 0% было бы ложной оценкой
+        self.assertTrue(np.isnan(report['last_price']['directional_accuracy']))
+        self.assertGreater(report['last_price']['samples'], 0)
+        self.assertFalse(np.isnan(report['moving_average']['directional_accuracy']))
+
+    def test_directional_accuracy_counts_only_predicted_moves(self):
+        horizon = 30
+        forecast = rolling_forecasts(self.prices, ['recent_trend'], horizon)['recent_trend']
+        origins = np.arange(90, len(self.prices) - horizon)
+        predicted = np.sign(forecast[origins] - self.prices[origins])
+        actual = np.sign(self.prices[origins + horizon] - self.prices[origins])
+        expected = np.mean(predicted[predicted != 0] == actual[predicted != 0]) * 100
+        report = backtest(self.prices, methods=['recent_trend'], horizon=horizon)
+        self.assertAlmostEqual(report['recent_trend']['directional_accuracy'], expected)
+
+    def test_command_reads_shared_matrix(self):
+        with isolated_environment({'TEST': synthetic_history(600, seed=9)}) as directory:
+            get_stock_data('TEST', years=3)
+            shared_dir = path.join(directory, 'shared')
+            build_price_matrix(['TEST'], shared_dir)
+            output = StringIO()
+            with override_settings(SHARED_PRICES_DIR=shared_dir):
+                call_command('backtest', 'TEST', '--years', '3', stdout=output)
+        lines = {line.split()[1]: line.split() for line in output.getvalue().splitlines()[1:]}
+        self.assertEqual(lines['last_price'][4], '-')
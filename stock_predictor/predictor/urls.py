@@ -9,7 +9,18 @@ urlpatterns = [
     # Обрабатывает главную страницу с формой ввода и результатами прогноза
     path('', views.predict_view, name='predict'),
 
-    # Пример добавления дополнительных маршрутов:
-    # path('history/', views.prediction_history, name='history'),
-    # path('api/predict/', views.api_predict, name='api_predict'),
+    # JSON API прогноза для одного или нескольких тикеров (асинхронное представление)
+    path('api/predict/', views.api_predict, name='api_predict'),
+
+    # Готовность графика, построенного в фоновом пуле (опрашивается страницей результата)
+    path('plot/<str:name>/status/', views.plot_status, name='plot_status'),
+
+    # Графики в режимах 'json' и 'svg' (сжатие gzip и ETag, см. PLOT_MODE)
+    path('chart/<str:name>', views.chart_file, name='chart_file'),
+
+    # Метрики задержек в текстовом формате Prometheus
+    path('metrics/', views.metrics_view, name='metrics'),
+
+    # История прогнозов с постраничной навигацией по ключу
+    path('history/', views.prediction_history, name='history'),
 ]
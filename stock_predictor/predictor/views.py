@@ -1,5 +1,50 @@
+import re
+import json
+import asyncio
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
 from django.shortcuts import render
-from .services import create_prediction_plot, get_stock_data, moving_average
+from asgiref.sync import sync_to_async
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+from .charts import CHART_CONTENT_TYPES
+from .forecasting import FORECAST_METHODS, GRID_HORIZONS
+from .plot_cache import get_plot_cache
+from .resampling import RESOLUTIONS, downsample_series
+from .plot_worker import get_plot_pool
+from .history import get_prediction_recorder, history_page
+from .metrics import registry, stage
+from .model_cache import get_model_registry
+from .precompute import get_precomputed_forecast
+from . import services
+from .services import create_prediction_plot, get_stock_data, moving_average, prediction_grid
+
+# Допустимый формат тикера (буквы, цифры и символы, встречающиеся у yfinance: BRK-B, ^GSPC, EURUSD=X)
+TICKER_PATTERN = re.compile(r'^[A-Z0-9.\-^=]{1,15}$')
+
+# Имя файла графика, выданное кэшем графиков (без путей)
+PLOT_NAME_PATTERN = re.compile(r'^[A-Za-z0-9.\-^=_]+_[0-9a-f]{16}\.(?:png|webp|svg|json)$')
+
+# Время кэширования графиков в браузере (секунды): имя файла адресуется по содержимому,
+# поэтому график с тем же именем никогда не меняется
+CHART_MAX_AGE = 365 * 24 * 60 * 60
+
+# Показатели пула графиков и реестра моделей, которые не являются счетчиками (метрики gauge)
+METRICS_GAUGES = frozenset({'queue_depth', 'queue_capacity', 'render_seconds_avg', 'render_seconds_max',
+                            'wait_seconds_avg', 'entries'})
+
+# Минимальное количество точек истории для прогноза
+MIN_DATA_POINTS = 30
+
+# Ограничения параметра horizons JSON API: количество горизонтов и максимальный горизонт в днях
+MAX_GRID_HORIZONS = 10
+MAX_GRID_HORIZON_DAYS = 365
 
 
 def predict_view(request):
@@ -9,7 +54,8 @@ def predict_view(request):
     Обрабатывает GET и POST запросы:
     - GET: Отображает форму ввода тикера акции
     - POST: Обрабатывает введенный тикер, получает данные,
-            вычисляет прогноз и отображает результаты
+            вычисляет прогноз и отображает результаты. Для тикеров из
+            PRECOMPUTE_TICKERS прогноз берется из таблицы PrecomputedForecast
 
     Аргументы:
         request (HttpRequest): Объект HTTP запроса от Django.
@@ -29,30 +75,452 @@ def predict_view(request):
         ticker = request.POST.get('ticker', 'AAPL').upper()
 
         try:
+            # Популярные тикеры отдаем из заранее рассчитанной таблицы без загрузки данных
+            precomputed = get_precomputed_forecast(ticker, 'moving_average')
+            if precomputed is not None:
+                context = {**precomputed.summary(), **plot_context(precomputed.plot_url)}
+                if precomputed.grid:
+                    context['forecast_grid'] = grid_table(precomputed.grid, precomputed.current_price,
+                                                          'moving_average')
+                with stage('render_template', ticker):
+                    return render(request, 'predictor/result.html', context)
+
             # Получаем данные
-            prices, dates = get_stock_data(ticker)
+            with stage('fetch', ticker):
+                prices, dates = get_stock_data(ticker)
 
-            if len(prices) < 30:
+            if len(prices) < MIN_DATA_POINTS:
                 return render(request, 'predictor/error.html', {
                     'error': f'Недостаточно данных для акции {ticker}'})
 
             # Прогноз
-            current_price = float(prices[-1][0])
-            future_price = moving_average(prices, method='moving_average')
-
-            # Создаем график
-            plot_url = create_prediction_plot(ticker, prices, dates, future_price, 'moving_average')
-
-            return render(request, 'predictor/result.html', {
-                'ticker': ticker,
-                'current_price': round(current_price, 2),
-                'future_price': round(future_price, 2),
-                'plot_url': plot_url,
-                'change_percent': round(((future_price - current_price) / current_price * 100), 2),
-                'historical_data_points': len(prices),
-                'first_date': f'{dates[0].strftime("%Y-%m-%d")}',
-                'last_date':  f'{dates[-1].strftime("%Y-%m-%d")}'})
+            with stage('forecast', ticker):
+                future_price = moving_average(prices, method='moving_average')
+                grid = prediction_grid(prices, ticker=ticker, end_date=dates[-1])
+
+            context = forecast_summary(ticker, prices, dates, future_price)
+            context['forecast_grid'] = grid_table(grid, prices[-1][0], 'moving_average')
+
+            # Создаем график: в фоновом пуле процессов (страница опрашивает его готовность) или сразу
+            # Графики 'json' и 'svg' строятся без matplotlib за миллисекунды - фоновый пул не нужен
+            with stage('plot', ticker):
+                if settings.PLOT_ASYNC and settings.PLOT_MODE == 'image':
+                    plot = get_plot_pool().submit(ticker, prices, dates, future_price, 'moving_average')
+                    if plot is None:
+                        context['plot_unavailable'] = True
+                    elif plot['ready']:
+                        context['plot_url'] = plot['url']
+                    else:
+                        context['plot_status_url'] = reverse('plot_status', args=[plot['name']])
+                else:
+                    context.update(plot_context(create_prediction_plot(ticker, prices, dates, future_price,
+                                                                       'moving_average')))
+
+            # Сохраняем прогноз в историю (пакетная запись в фоне)
+            if settings.PREDICTION_HISTORY_ENABLED:
+                plot_url = (context.get('plot_url') or context.get('chart_data_url')
+                            or context.get('plot_status_url') or '')
+                get_prediction_recorder().record(ticker, 'moving_average', prices, dates, future_price,
+                                                 plot_key=_plot_name_from(plot_url))
+
+            with stage('render_template', ticker):
+                return render(request, 'predictor/result.html', context)
 
         except Exception as e:
             return render(request, 'predictor/error.html', {'error': f'Ошибка: {str(e)}'})
     return render(request, 'predictor/form.html')
+
+
+def plot_status(request, name):
+    """
+    Сообщает, построен ли график, поставленный в фоновую очередь, или его построение не удалось.
+
+    Аргументы:
+        request (HttpRequest): Объект HTTP запроса от Django.
+        name (str): Имя файла графика, полученное при постановке в очередь.
+
+    Возвращает:
+        JsonResponse: {'ready': bool, 'failed': bool, 'url': URL графика}. При failed=True
+        страница прекращает опрос и сообщает, что график недоступен.
+
+    Пример маршрута:
+        http://127.0.0.1:8000/plot/AAPL_3f2a9c0e1b7d4a65.png/status/
+    """
+    if not PLOT_NAME_PATTERN.match(name):
+        return JsonResponse({'error': 'Некорректное имя графика'}, status=400)
+    cache = get_plot_cache()
+    ready = cache.lookup(name) is not None
+    return JsonResponse({'ready': ready, 'failed': not ready and get_plot_pool().failed(name), 'url': cache.url(name)})
+
+
+def plot_context(plot_url):
+    """
+    Возвращает переменные шаблона результата для графика по его URL.
+
+    Данные графика в режиме 'json' отрисовываются в браузере (chart_data_url),
+    изображения и SVG показываются тегом img (plot_url).
+    """
+    if plot_url.endswith('.json'):
+        return {'chart_data_url': plot_url}
+    return {'plot_url': plot_url}
+
+
+@gzip_page
+def chart_file(request, name):
+    """
+    Отдает график в режиме 'json' или 'svg' со сжатием gzip и ETag.
+
+    Имя файла адресуется по содержимому, поэтому оно же служит ETag: повторный
+    запрос с If-None-Match получает ответ 304 без чтения файла, а заголовок
+    Cache-Control: immutable позволяет браузеру вовсе не повторять запрос.
+    Заголовки кэширования получают только ответы 200 и 304: ответы 400 и 404
+    не кэшируются, иначе график, построенный позже, браузер бы уже не запросил.
+
+    Аргументы:
+        request (HttpRequest): Объект HTTP запроса от Django.
+        name (str): Имя файла графика из кэша графиков.
+
+    Возвращает:
+        HttpResponse: Содержимое графика (application/json или image/svg+xml), 304, 400 или 404.
+
+    Пример маршрута:
+        http://127.0.0.1:8000/chart/AAPL_3f2a9c0e1b7d4a65.json
+    """
+    extension = name.rsplit('.', 1)[-1]
+    if not PLOT_NAME_PATTERN.match(name) or extension not in CHART_CONTENT_TYPES:
+        return JsonResponse({'error': 'Некорректное имя графика'}, status=400)
+    # lookup() отмечает график как недавно использованный; файл может быть вытеснен и между вызовами
+    cache = get_plot_cache()
+    chart_etag = quote_etag(name)
+    try:
+        if cache.lookup(name) is None:
+            raise FileNotFoundError(name)
+        response = get_conditional_response(request, etag=chart_etag)
+        if response is None:
+            with open(cache.full_path(name), 'rb') as chart:
+                response = HttpResponse(chart.read(),
+                                        content_type=f'{CHART_CONTENT_TYPES[extension]}; charset=utf-8')
+    except FileNotFoundError:
+        return JsonResponse({'error': 'График не найден'}, status=404)
+    if response.status_code in (200, 304):
+        response['ETag'] = chart_etag
+        patch_cache_control(response, max_age=CHART_MAX_AGE, immutable=True)
+    return response
+
+
+def prediction_history(request):
+    """
+    Постраничный просмотр истории прогнозов.
+
+    Использует навигацию по ключу (created_at, id): ссылка "Дальше" содержит
+    курсор последней показанной записи, поэтому страницы открываются одинаково
+    быстро при любом объеме таблицы.
+
+    Параметры запроса:
+        ticker (str, опционально): Фильтр по тикеру.
+        since, until (str, опционально): Диапазон времени в формате ISO 8601.
+        cursor (str, опционально): Курсор следующей страницы.
+
+    Возвращает:
+        HttpResponse: Страница predictor/history.html.
+
+    Пример маршрута:
+        http://127.0.0.1:8000/history/?ticker=AAPL
+    """
+    ticker = request.GET.get('ticker', '').strip().upper()
+    since = _parse_query_datetime(request.GET.get('since'))
+    until = _parse_query_datetime(request.GET.get('until'))
+
+    predictions, next_cursor = history_page(ticker=ticker or None, since=since, until=until,
+                                            cursor=request.GET.get('cursor'),
+                                            page_size=settings.HISTORY_PAGE_SIZE)
+
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
+
+    return render(request, 'predictor/history.html', {
+        'predictions': predictions,
+        'ticker': ticker,
+        'next_query': next_query})
+
+
+def _parse_query_datetime(value):
+    # Дата и время из параметра запроса (ISO 8601); без часового пояса считается временем сервера
+    try:
+        parsed = parse_datetime(value) if value else None
+    except ValueError:
+        return None
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _plot_name_from(plot_url):
+    # Имя файла графика из его URL или URL статуса ('/media/plots/X.png', '/plot/X.png/status')
+    parts = [part for part in plot_url.split('/') if part]
+    if parts and parts[-1] == 'status':
+        parts.pop()
+    return parts[-1] if parts else ''
+
+
+def metrics_view(request):
+    """
+    Отдает метрики процесса в текстовом формате Prometheus.
+
+    Включает гистограммы времени запросов и этапов прогноза (в том числе по тикерам),
+    счетчики объединения загрузок и состояние фонового пула графиков.
+
+    Аргументы:
+        request (HttpRequest): Объект HTTP запроса от Django.
+
+    Возвращает:
+        HttpResponse: Текст метрик (text/plain; version=0.0.4).
+
+    Пример маршрута:
+        http://127.0.0.1:8000/metrics/
+    """
+    # Объединение загрузок читается через модуль: isolated_environment() подменяет его на время замеров
+    values = {f'predictor_fetch_{name}_total': value for name, value in services.history_flight.stats().items()}
+    # Счетчики задач пула и обращений к реестру моделей только растут - экспортируются
+    # как counter (суффикс _total), размеры очереди и реестра и времена - как gauge
+    for prefix, stats in (('predictor_plot_pool', get_plot_pool().stats()),
+                          ('predictor_model_cache', get_model_registry().stats())):
+        values.update({f'{prefix}_{name}{"" if name in METRICS_GAUGES else "_total"}': value
+                       for name, value in stats.items()})
+    return HttpResponse(registry.render(values), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def forecast_summary(ticker, prices, dates, future_price):
+    """
+    Формирует сводку прогноза для шаблона результата и JSON API.
+
+    Аргументы:
+        ticker (str): Тикер акции.
+        prices (numpy.ndarray): Исторические цены формы (n, 1).
+        dates (pandas.DatetimeIndex): Даты цен.
+        future_price (float): Прогнозируемая цена.
+
+    Возвращает:
+        dict: Текущая и прогнозная цены, изменение в процентах и диапазон дат истории.
+    """
+    current_price = float(prices[-1][0])
+    future_price = float(future_price)
+    return {
+        'ticker': ticker,
+        'current_price': round(current_price, 2),
+        'future_price': round(future_price, 2),
+        'change_percent': round(((future_price - current_price) / current_price * 100), 2),
+        'historical_data_points': len(prices),
+        'first_date': f'{dates[0].strftime("%Y-%m-%d")}',
+        'last_date':  f'{dates[-1].strftime("%Y-%m-%d")}'}
+
+
+def grid_table(grid, current_price, selected_method):
+    """
+    Формирует таблицу сетки прогнозов (методы x горизонты) для шаблона результата.
+
+    Аргументы:
+        grid (dict): Сетка {метод: {горизонт: цена}} из prediction_grid(); горизонты
+            могут быть строками (сетка из JSON-поля PrecomputedForecast).
+        current_price (float): Текущая цена.
+        selected_method (str): Метод основного прогноза (строка выделяется в таблице).
+
+    Возвращает:
+        dict: {'horizons': [...], 'rows': [{'method', 'selected', 'cells': [{'price', 'change_percent'}]}]}.
+    """
+    current_price = float(current_price)
+    horizons = sorted({int(horizon) for prices_by_horizon in grid.values() for horizon in prices_by_horizon})
+    rows = []
+    for method, prices_by_horizon in grid.items():
+        by_day = {int(horizon): float(price) for horizon, price in prices_by_horizon.items()}
+        rows.append({
+            'method': method,
+            'selected': method == selected_method,
+            'cells': [{'price': round(by_day[horizon], 2),
+                       'change_percent': round((by_day[horizon] - current_price) / current_price * 100, 2)}
+                      for horizon in horizons],
+        })
+    return {'horizons': horizons, 'rows': rows}
+
+
+def parse_horizons(value):
+    """
+    Разбирает параметр horizons JSON API: список или строку дней через запятую.
+
+    Некорректное значение (не целые числа, горизонт вне 1..MAX_GRID_HORIZON_DAYS,
+    больше MAX_GRID_HORIZONS значений) вызывает ValueError с текстом для ответа 400.
+
+    Аргументы:
+        value (str | list | None): Значение параметра. Пустое значение - горизонты по умолчанию.
+
+    Возвращает:
+        tuple: Отсортированные уникальные горизонты в днях.
+    """
+    if value in (None, '', []):
+        return GRID_HORIZONS
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    if not isinstance(value, list):
+        raise ValueError('horizons должен быть строкой или списком')
+    try:
+        horizons = tuple(sorted({int(str(horizon).strip()) for horizon in value}))
+    except ValueError:
+        raise ValueError('horizons должен содержать целые числа дней')
+    if not horizons or len(horizons) > MAX_GRID_HORIZONS:
+        raise ValueError(f'horizons: от 1 до {MAX_GRID_HORIZONS} значений')
+    if horizons[0] < 1 or horizons[-1] > MAX_GRID_HORIZON_DAYS:
+        raise ValueError(f'horizons должны быть от 1 до {MAX_GRID_HORIZON_DAYS} дней')
+    return horizons
+
+
+def history_payload(prices, dates, points):
+    """
+    Формирует историю цен для JSON API, прореженную до points точек.
+
+    Аргументы:
+        prices (numpy.ndarray): Цены формы (n, 1).
+        dates (pandas.DatetimeIndex): Даты цен.
+        points (int): Максимальное количество точек.
+
+    Возвращает:
+        dict: {'dates': [...], 'prices': [...], 'source_points': n} - даты в формате ГГГГ-ММ-ДД.
+    """
+    plot_prices, plot_dates = downsample_series(prices, dates, points, settings.PLOT_DOWNSAMPLE_METHOD)
+    return {
+        'dates': [date.strftime('%Y-%m-%d') for date in plot_dates],
+        'prices': [round(float(price), 4) for price in plot_prices.ravel()],
+        'source_points': len(prices),
+    }
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+async def api_predict(request):
+    """
+    Асинхронный JSON API прогноза для одного или нескольких тикеров.
+
+    Данные по тикерам загружаются параллельно в пуле потоков, поэтому цикл событий
+    ASGI-сервера не блокируется вызовами yfinance и matplotlib. По умолчанию
+    график не строится; его можно запросить параметром plot.
+
+    Параметры запроса (GET) или тела JSON (POST):
+        tickers (str | list): Тикеры через запятую или списком, например 'AAPL,MSFT'.
+        method (str, опционально): Метод прогнозирования. По умолчанию 'moving_average'.
+        plot (bool, опционально): Построить график для каждого тикера. По умолчанию False.
+        years (int, опционально): Глубина истории в годах (до API_MAX_YEARS). По умолчанию 1.
+        points (int, опционально): Вернуть историю цен, прореженную до этого количества точек
+            (до API_MAX_POINTS) с сохранением минимума и максимума.
+        resolution (str, опционально): Разрешение возвращаемой истории: 'daily', 'weekly'
+            или 'monthly'. По умолчанию 'daily'. Прогноз всегда считается по дневным ценам.
+        grid (bool, опционально): Добавить сетку прогнозов всех методов по горизонтам
+            ('grid': {метод: {горизонт: цена}}). По умолчанию False.
+        horizons (str | list, опционально): Горизонты сетки в днях, например '1,5,30,90'
+            (не более 10 значений, до 365 дней). Указание horizons включает grid.
+
+    Возвращает:
+        JsonResponse: {'method': ..., 'results': [...]} или {'error': ...} со статусом 400.
+            Ошибка по отдельному тикеру возвращается в его элементе results.
+
+    Пример маршрута:
+        http://127.0.0.1:8000/api/predict/?tickers=AAPL,MSFT&method=recent_trend
+        http://127.0.0.1:8000/api/predict/?tickers=AAPL&years=30&resolution=weekly&points=500
+        http://127.0.0.1:8000/api/predict/?tickers=AAPL,MSFT&horizons=1,5,30,90
+    """
+    if request.method == 'POST':
+        try:
+            params = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Тело запроса должно быть JSON'}, status=400)
+        if not isinstance(params, dict):
+            return JsonResponse({'error': 'Тело запроса должно быть JSON-объектом'}, status=400)
+    else:
+        params = request.GET.dict()
+
+    tickers = params.get('tickers', params.get('ticker', ''))
+    if isinstance(tickers, str):
+        tickers = tickers.split(',')
+    if not isinstance(tickers, list):
+        return JsonResponse({'error': 'tickers должен быть строкой или списком'}, status=400)
+    tickers = list(dict.fromkeys(str(ticker).strip().upper() for ticker in tickers if str(ticker).strip()))
+
+    method = params.get('method', 'moving_average')
+    with_plot = str(params.get('plot', '')).lower() in ('1', 'true', 'yes')
+    resolution = params.get('resolution', 'daily')
+    try:
+        years = int(params.get('years', 1))
+        points = int(params['points']) if params.get('points') not in (None, '') else None
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'years и points должны быть целыми числами'}, status=400)
+    try:
+        horizons = parse_horizons(params.get('horizons'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    with_grid = (str(params.get('grid', '')).lower() in ('1', 'true', 'yes')
+                 or params.get('horizons') not in (None, '', []))
+
+    if not tickers:
+        return JsonResponse({'error': 'Не указан ни один тикер'}, status=400)
+    if len(tickers) > settings.API_MAX_TICKERS:
+        return JsonResponse({'error': f'Не более {settings.API_MAX_TICKERS} тикеров за запрос'}, status=400)
+    if method not in FORECAST_METHODS:
+        return JsonResponse({'error': f'Неизвестный метод: {method}'}, status=400)
+    if resolution not in RESOLUTIONS:
+        return JsonResponse({'error': f'Неизвестное разрешение: {resolution}'}, status=400)
+    if not 1 <= years <= settings.API_MAX_YEARS:
+        return JsonResponse({'error': f'years должен быть от 1 до {settings.API_MAX_YEARS}'}, status=400)
+    if points is not None and not 3 <= points <= settings.API_MAX_POINTS:
+        return JsonResponse({'error': f'points должен быть от 3 до {settings.API_MAX_POINTS}'}, status=400)
+
+    options = {'years': years, 'points': points, 'resolution': resolution,
+               'horizons': horizons if with_grid else None}
+    semaphore = asyncio.Semaphore(settings.API_FETCH_CONCURRENCY)
+    results = await asyncio.gather(*(_api_predict_one(ticker, method, with_plot, semaphore, **options)
+                                     for ticker in tickers))
+    return JsonResponse({'method': method, 'results': results}, json_dumps_params={'ensure_ascii': False})
+
+
+async def _api_predict_one(ticker, method, with_plot, semaphore, years=1, points=None, resolution='daily',
+                           horizons=None):
+    # Прогноз для одного тикера; блокирующие вызовы выполняются в пуле потоков
+    if not TICKER_PATTERN.match(ticker):
+        return {'ticker': ticker, 'error': 'Некорректный тикер'}
+
+    try:
+        async with semaphore:
+            with stage('fetch', ticker):
+                prices, dates = await sync_to_async(get_stock_data, thread_sensitive=False)(ticker, years)
+                if points is not None and resolution != 'daily':
+                    history_prices, history_dates = await sync_to_async(get_stock_data, thread_sensitive=False)(
+                        ticker, years, resolution=resolution)
+                else:
+                    history_prices, history_dates = prices, dates
+        if len(prices) < MIN_DATA_POINTS:
+            return {'ticker': ticker, 'error': f'Недостаточно данных для акции {ticker}'}
+
+        with stage('forecast', ticker):
+            future_price = moving_average(prices, method=method, ticker=ticker, end_date=dates[-1])
+            grid = (prediction_grid(prices, horizons=horizons, ticker=ticker, end_date=dates[-1])
+                    if horizons is not None else None)
+        result = {**forecast_summary(ticker, prices, dates, future_price), 'method': method}
+        if grid is not None:
+            result['grid'] = {name: {str(horizon): round(price, 4) for horizon, price in prices_by_horizon.items()}
+                              for name, prices_by_horizon in grid.items()}
+        if points is not None:
+            result['history'] = history_payload(history_prices, history_dates, points)
+
+        if with_plot:
+            # Построение в режиме 'legacy' сериализуется блокировкой pyplot внутри create_prediction_plot,
+            # поэтому общий поток sync_to_async (thread_sensitive) не занимается и не блокирует другие запросы
+            with stage('plot', ticker):
+                result['plot_url'] = await sync_to_async(create_prediction_plot, thread_sensitive=False)(
+                    ticker, prices, dates, future_price, method)
+
+        if settings.PREDICTION_HISTORY_ENABLED:
+            get_prediction_recorder().record(ticker, method, prices, dates, future_price,
+                                             plot_key=_plot_name_from(result.get('plot_url', '')))
+        return result
+    except Exception as e:
+        return {'ticker': ticker, 'error': f'Ошибка: {str(e)}'}
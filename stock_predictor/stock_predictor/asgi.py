@@ -3,6 +3,8 @@ from django.core.asgi import get_asgi_application
 
 # Настройка ASGI для проекта stock_predictor
 # ASGI (Asynchronous Server Gateway Interface) используется для асинхронных серверов типа Daphne или Uvicorn
+# Асинхронное представление api/predict/ выполняет загрузку данных и построение графиков в пуле потоков,
+# поэтому при запуске через ASGI цикл событий не блокируется
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stock_predictor.settings')
 
@@ -1,4 +1,5 @@
-from os import path
+from os import path, environ, cpu_count as os_cpu_count
+from tempfile import gettempdir
 from pathlib import Path
 
 # Базовые пути проекта
@@ -28,6 +29,7 @@ INSTALLED_APPS = [
 # Промежуточное ПО (middleware)
 # Обрабатывает запросы и ответы в определенном порядке
 MIDDLEWARE = [
+    'predictor.metrics.TimingMiddleware',                               # Время обработки запросов
     'django.middleware.security.SecurityMiddleware',                    # Безопасность
     'django.contrib.sessions.middleware.SessionMiddleware',             # Сессии
     'django.middleware.common.CommonMiddleware',                        # Общие функции
@@ -64,6 +66,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',                         # Движок SQLite
         'NAME': BASE_DIR / 'db.sqlite3',                                # Путь к файлу базы данных
+        'OPTIONS': {
+            'timeout': 20,                                              # Ожидание блокировки записи (секунды)
+        },
     }
 }
 
@@ -95,5 +100,113 @@ STATIC_URL = 'static/'
 
 MEDIA_ROOT = path.join(BASE_DIR, 'media')
 
+# Кэш графиков в MEDIA_ROOT/plots: лимит суммарного размера (байты) и времени без обращений (секунды)
+PLOT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PLOT_CACHE_MAX_AGE = 7 * 24 * 60 * 60
+
+# Версия оформления графиков. Входит в ключ кэша: при изменении стиля увеличьте ее,
+# чтобы старые изображения не отдавались повторно
+PLOT_STYLE_VERSION = 'dark-v1'
+
+# Построение графиков: 'fast' - переиспользуемая фигура без pyplot (потокобезопасно),
+# 'legacy' - исходный способ через pyplot с 300 dpi
+PLOT_RENDERER = 'fast'
+
+# Режим графика прогноза: 'image' - изображение matplotlib (PLOT_RENDERER, PLOT_FORMAT),
+# 'json' - данные графика для отрисовки в браузере, 'svg' - компактный SVG без matplotlib.
+# Графики 'json' и 'svg' отдаются по /chart/<имя> со сжатием gzip и ETag
+PLOT_MODE = 'image'
+
+# Разрешение и формат графиков в режиме 'fast' ('png', 'webp' или 'svg')
+PLOT_DPI = 100
+PLOT_FORMAT = 'png'
+
+# Максимум точек истории на графике (None - без прореживания) и метод прореживания:
+# 'minmax_lttb', 'lttb' или 'minmax' (см. predictor/resampling.py)
+PLOT_MAX_POINTS = 1000
+PLOT_DOWNSAMPLE_METHOD = 'minmax_lttb'
+
+# Построение графиков в фоновом пуле процессов: страница результата открывается сразу,
+# а график подгружается, когда будет готов. PLOT_QUEUE_SIZE - максимум графиков
+# в очереди и в работе; при переполнении страница показывается без графика
+PLOT_ASYNC = True
+PLOT_WORKERS = 2
+PLOT_QUEUE_SIZE = 32
+PLOT_WORKER_START_METHOD = 'spawn'
+
+# Локальное хранилище истории цен (отдельная база SQLite, не связанная с моделями Django)
+PRICE_STORE_PATH = BASE_DIR / 'prices.sqlite3'
+
+# Время (в секундах), в течение которого сохраненная история считается актуальной
+# и повторные запросы обслуживаются без обращения к провайдеру данных
+PRICE_STORE_REFRESH_INTERVAL = 15 * 60
+
+# Общая матрица цен в отображенной памяти (строится командой build_price_matrix).
+# get_stock_data(..., as_arrays=True) (например, команда backtest) читает из нее дневную
+# историю тикеров, строки которых совпадают с хранилищем после обновления; None отключает матрицу
+SHARED_PRICES_DIR = BASE_DIR / 'shared_prices'
+
+# Провайдер рыночных данных. Для работы без сети: 'predictor.providers.FileProvider'
+# (файлы CSV/Parquet в PRICE_FILES_DIR) или 'predictor.providers.HTTPJSONProvider'
+# (локальный сервер из команды fake_market_server по адресу PRICE_HTTP_URL)
+PRICE_PROVIDER = 'predictor.providers.YFinanceProvider'
+
+# Параметры провайдера: одновременные запросы в пакетной загрузке, ограничение частоты
+# (запросов в секунду и размер всплеска) и повторы временных ошибок с разбросом задержки
+PRICE_PROVIDER_OPTIONS = {
+    'max_workers': 8,
+    'rate': 5,
+    'burst': 10,
+    'retries': 3,
+}
+PRICE_FILES_DIR = BASE_DIR / 'price_files'
+PRICE_HTTP_URL = 'http://127.0.0.1:8765'
+
+# Директория файлов блокировки для объединения одновременных загрузок одного тикера
+# между процессами-воркерами (gunicorn). None - объединение только между потоками
+FETCH_LOCK_DIR = path.join(gettempdir(), 'stock_predictor_locks')
+
+# JSON API прогноза: максимум тикеров в одном запросе и одновременных загрузок данных
+API_MAX_TICKERS = 50
+API_FETCH_CONCURRENCY = 8
+# Максимальная глубина истории (лет) и количество точек истории в ответе API
+API_MAX_YEARS = 30
+API_MAX_POINTS = 5000
+
+# История прогнозов: пакетная запись в фоне (размер пакета и максимальная задержка в секундах)
+PREDICTION_HISTORY_ENABLED = True
+PREDICTION_HISTORY_BATCH_SIZE = 200
+PREDICTION_HISTORY_FLUSH_INTERVAL = 2.0
+
+# Количество записей на странице истории прогнозов
+HISTORY_PAGE_SIZE = 50
+
+# Прогрев приложения при запуске (загрузка pandas, yfinance, sklearn, matplotlib и шрифтов).
+# Включайте для серверов с предварительной загрузкой: PREDICTOR_WARMUP=1 gunicorn --preload ...
+PREDICTOR_WARMUP = environ.get('PREDICTOR_WARMUP') == '1'
+
+# Профилирование медленных запросов: доля запросов под cProfile и порог в миллисекундах,
+# выше которого статистика сохраняется в PROFILE_DIR. None отключает профилирование.
+# У асинхронного API профилируется только поток цикла событий (см. TimingMiddleware)
+PROFILE_SLOW_REQUESTS_MS = None
+PROFILE_SAMPLE_RATE = 0.01
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Реестр обученных моделей: записей в памяти процесса, псевдоним общего кэша из CACHES
+# (None - только память процесса) и время жизни записей общего кэша в секундах
+MODEL_CACHE_SIZE = 10000
+MODEL_CACHE_BACKEND = None
+MODEL_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Заранее рассчитанные прогнозы (команда precompute_forecasts): тикеры через запятую
+# в переменной окружения, максимальный возраст расчета в секундах и количество процессов
+PRECOMPUTE_TICKERS = [ticker.strip().upper() for ticker in environ.get('PRECOMPUTE_TICKERS', '').split(',')
+                      if ticker.strip()]
+PRECOMPUTE_MAX_AGE = 36 * 60 * 60
+PRECOMPUTE_WORKERS = max(1, (os_cpu_count() or 2) - 1)
+
+# Файл базовой линии команды benchmark (результаты зависят от машины)
+BENCHMARK_BASELINE_PATH = BASE_DIR / 'benchmarks' / 'baseline.json'
+
 # Тип поля для автоматического создания первичных ключей
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'